@@ -0,0 +1,3 @@
+from . import synthetic
+from . import run_benchmark
+from .run_benchmark import run_benchmark, compare_benchmark
@@ -0,0 +1,28 @@
+import argparse
+import json
+
+from .run_benchmark import run_benchmark, compare_benchmark
+
+if (__name__ == '__main__'):
+
+	parser = argparse.ArgumentParser(description='Benchmark building construction, estimation and batch paths.')
+	parser.add_argument('--scale', type=int, nargs='+', default=[1, 1000], help='Numbers of buildings')
+	parser.add_argument('--max_object', type=int, default=1000, help='Maximum number of buildings for per-object benchmarks')
+	parser.add_argument('--n_repeat', type=int, default=3, help='Number of repetitions')
+	parser.add_argument('--max_workers', type=int, default=None, help='Workers of the process-pool runner. Skipped if not given')
+	parser.add_argument('--import_budget', type=float, default=1.0, help='Budget of the package import time in seconds')
+	parser.add_argument('--output', type=str, default='bench.json', help='Output JSON file')
+	parser.add_argument('--compare', type=str, default=None, help='JSON file of a previous run to compare with')
+	args = parser.parse_args()
+
+	result = run_benchmark(args.scale, args.max_object, args.n_repeat, args.max_workers, args.import_budget)
+
+	with open(args.output, 'w', encoding='utf-8') as f: json.dump(result, f, indent=1)
+
+	for i in result['record']: print('{:<28} {:>8} {:>12}'.format(i['name'], i['n_building'], 'skipped' if (i['seconds'] is None) else '{:.4f} s'.format(i['seconds'])))
+
+	if (args.compare is not None):
+
+		with open(args.compare, encoding='utf-8') as f: result_base = json.load(f)
+
+		print(compare_benchmark(result, result_base).to_string(index=False))
@@ -0,0 +1,138 @@
+"""
+Load test of the local estimation service on localhost.
+
+Run from src/:
+
+	python -m benchmark.load_test --n_request 2000 --concurrency 64
+	python -m benchmark.load_test --port 8765 --n_request 2000
+
+Without --port, a service is started in this process on a free port. Every connection sends its
+requests one after another on a keep-alive connection.
+"""
+
+import numpy as np
+import argparse
+import asyncio
+import json
+import time
+
+from dependency.algorithm_bers.service import EstimationService
+
+from .synthetic import generate_portfolio, to_building_spec
+
+async def run_load_test(list_spec, host='127.0.0.1', port=8765, n_request=1000, concurrency=64):
+
+	"""
+	This method is used to send estimation requests to the service and measure throughput and latency.
+	===========================================================================================
+
+	Arguments:
+
+		list_spec (list): Building specifications, sent in turn
+
+		host (str): Host of the service. Default is 127.0.0.1
+
+		port (int): Port of the service. Default is 8765
+
+		n_request (int): Number of requests. Default is 1000
+
+		concurrency (int): Number of concurrent connections. Default is 64
+
+	Output:
+
+		result (dict): Throughput, latency quantiles in seconds and number of errors
+	"""
+
+	list_body    = [json.dumps(_to_json(i), ensure_ascii=False).encode('utf-8') for i in list_spec]
+	list_latency = []
+	n_error      = 0
+	iterator     = iter(range(n_request))
+
+	async def run_connection():
+
+		nonlocal n_error
+
+		reader, writer = await asyncio.open_connection(host, port)
+
+		for i in iterator:
+
+			body = list_body[i % len(list_body)]
+
+			time_start = time.perf_counter()
+			writer.write('POST /estimate HTTP/1.1\r\nHost: {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n\r\n'.format(host, len(body)).encode('latin-1') + body)
+			await writer.drain()
+
+			status = int((await reader.readline()).split()[1])
+			length = 0
+			while True:
+
+				line = await reader.readline()
+				if (line in (b'\r\n', b'')): break
+				if (line.lower().startswith(b'content-length')): length = int(line.split(b':')[1])
+
+			record = json.loads(await reader.readexactly(length))
+			list_latency.append(time.perf_counter() - time_start)
+
+			if (status != 200) or ('error' in record): n_error += 1
+
+		writer.close()
+
+	time_start = time.perf_counter()
+	await asyncio.gather(*[run_connection() for _ in range(concurrency)])
+	seconds = time.perf_counter() - time_start
+
+	latency = np.array(list_latency)
+
+	return {
+		'n_request'           : n_request,
+		'concurrency'         : concurrency,
+		'seconds'             : seconds,
+		'requests_per_second' : n_request / seconds,
+		'latency_p50'         : float(np.quantile(latency, 0.5)),
+		'latency_p95'         : float(np.quantile(latency, 0.95)),
+		'latency_p99'         : float(np.quantile(latency, 0.99)),
+		'n_error'             : n_error,
+	}
+
+async def _main(args):
+
+	df_building, df_es, df_elevator, df_escalator = generate_portfolio(min(args.n_request, 1000), seed=args.seed)
+	list_spec = to_building_spec(df_building, df_es, df_elevator, df_escalator)
+
+	service = None
+	port    = args.port
+
+	if (port is None):
+
+		service = EstimationService(args.max_batch_size, args.max_wait, args.max_workers, load_geocoder=False)
+		port    = await service.serve('127.0.0.1', 0)
+
+	try: result = await run_load_test(list_spec, '127.0.0.1', port, args.n_request, args.concurrency)
+	finally:
+
+		if (service is not None): await service.stop()
+
+	if (service is not None): result['n_batch'] = service.n_batch
+
+	print(json.dumps(result, indent=1))
+
+def _to_json(spec):
+
+	# Energy sections as records and numpy values as Python values
+	spec = dict(spec, energysection=spec['energysection'].to_dict('records'))
+
+	return json.loads(json.dumps(spec, default=lambda x: x.item() if isinstance(x, np.generic) else x.tolist()))
+
+if (__name__ == '__main__'):
+
+	parser = argparse.ArgumentParser(description='Load test of the local estimation service.')
+	parser.add_argument('--port', type=int, default=None, help='Port of a running service. Default starts one in this process')
+	parser.add_argument('--n_request', type=int, default=1000, help='Number of requests')
+	parser.add_argument('--concurrency', type=int, default=64, help='Number of concurrent connections')
+	parser.add_argument('--max_batch_size', type=int, default=256, help='Maximum number of requests per batch of the in-process service')
+	parser.add_argument('--max_wait', type=float, default=0.005, help='Maximum wait in seconds of the in-process service')
+	parser.add_argument('--max_workers', type=int, default=None, help='Number of worker processes of the in-process service')
+	parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic portfolio')
+	args = parser.parse_args()
+
+	asyncio.run(_main(args))
@@ -0,0 +1,212 @@
+"""
+Benchmarks of building construction, estimation and the batch entry points.
+
+Run from src/:
+
+	python -m benchmark --scale 1 1000 100000 --output bench.json
+	python -m benchmark --scale 1000 --output new.json --compare bench.json
+
+Per-object paths (Building.__init__, create_elevator, estimate(), ...) are timed on at most
+--max_object buildings of each scale. Batch paths run on the whole scale.
+"""
+
+import numpy as np
+import pandas as pd
+import subprocess
+import platform
+import tempfile
+import datetime
+import time
+import sys
+import os
+
+import dependency.algorithm_bers as algorithm_bers
+
+from .synthetic import generate_portfolio, generate_coordinate, to_building_spec
+
+__path__ = os.path.dirname(__file__).replace('\\', '/').replace('C:/', '/') + '/'
+
+# Modules that address-only estimation must not import
+LIST_MODULE_GIS = ['geopandas', 'shapely', 'pyproj', 'pyogrio', 'fiona']
+
+def run_benchmark(list_scale=(1, 1000), max_object=1000, n_repeat=3, max_workers=None, import_budget=1.0, seed=0):
+
+	"""
+	This method is used to run every benchmark at every scale.
+	===========================================================================================
+
+	Arguments:
+
+		list_scale (list): Numbers of buildings
+
+		max_object (int): Maximum number of buildings for per-object benchmarks
+
+		n_repeat (int): Number of repetitions. The fastest one is kept
+
+		max_workers (int): Number of workers of the process-pool runner. None skips the runner
+
+		import_budget (float): Budget of the package import time in seconds
+
+		seed (int): Seed of the synthetic portfolio
+
+	Output:
+
+		result (dict): Environment and one record per benchmark and scale
+	"""
+
+	list_record = [_benchmark_import(import_budget)]
+
+	for n_building in list_scale:
+
+		df_building, df_es, df_elevator, df_escalator = generate_portfolio(n_building, seed=seed)
+		list_spec = to_building_spec(df_building, df_es, df_elevator, df_escalator)
+		n_object  = min(n_building, max_object)
+
+		# =========================================================================================
+		#
+		# Per-object paths
+		#
+		# =========================================================================================
+
+		list_building = []
+		list_record.append(_timeit('building_init_address', n_building, n_object, n_repeat, lambda: list_building.__setitem__(slice(None), [_create_building(i) for i in list_spec[:n_object]])))
+
+		lons, lats = _get_coordinate(n_object, seed)
+		if (lons is not None):
+
+			list_spec_coordinate = [dict(i, building_coordinate=(x, y)) for i, x, y in zip(list_spec[:n_object], lons, lats)]
+			list_record.append(_timeit('building_init_coordinate', n_building, n_object, n_repeat, lambda: [_create_building(i) for i in list_spec_coordinate]))
+
+		else:
+
+			list_record.append(_skip('building_init_coordinate', n_building, 'Town layer is not available.'))
+
+		list_record.append(_timeit('create_elevator', n_building, n_object, n_repeat, lambda: [_create_facility(b, s) for b, s in zip(list_building, list_spec[:n_object])]))
+		list_record.append(_timeit('estimate', n_building, n_object, n_repeat, lambda: [(b.invalidate(), b.estimate()) for b in list_building]))
+		list_record.append(_timeit('estimate_incremental', n_building, n_object, n_repeat, lambda: [_estimate_incremental(b) for b in list_building]))
+		list_record.append(_timeit('calc_e_n', n_building, n_object, n_repeat, lambda: [b._calc_e_n(s['energysection'][s['energysection']['Section_Type']=='exclusive']) for b, s in zip(list_building, list_spec[:n_object])]))
+
+		# =========================================================================================
+		#
+		# Batch paths
+		#
+		# =========================================================================================
+
+		list_record.append(_timeit('estimate_portfolio', n_building, n_building, n_repeat, lambda: algorithm_bers.estimate_portfolio(df_building, df_es, df_elevator, df_escalator)))
+
+		df_building_id = df_building.set_index('building_id', drop=False)
+		list_record.append(_timeit('calc_e_n_portfolio', n_building, n_building, n_repeat, lambda: algorithm_bers.portfolio.calc_e_n_portfolio(df_building_id, df_es[df_es['Section_Type']=='exclusive'])))
+
+		with tempfile.TemporaryDirectory() as dir_temp:
+
+			df_es.to_csv(dir_temp + '/energysection.csv', index=False)
+			list_record.append(_timeit('iter_energysection', n_building, n_building, n_repeat, lambda: sum(1 for _ in algorithm_bers.iter_energysection(dir_temp + '/energysection.csv'))))
+
+		if (max_workers is not None):
+
+			list_record.append(_timeit('run_buildings', n_building, n_building, 1, lambda: sum(1 for _ in algorithm_bers.run_buildings(list_spec, max_workers=max_workers, load_geocoder=False))))
+
+	return {
+		'timestamp' : datetime.datetime.now().isoformat(timespec='seconds'),
+		'commit'    : _get_commit(),
+		'python'    : platform.python_version(),
+		'numpy'     : np.__version__,
+		'pandas'    : pd.__version__,
+		'platform'  : platform.platform(),
+		'record'    : list_record,
+	}
+
+def compare_benchmark(result, result_base, threshold=1.2):
+
+	"""
+	This method is used to compare two benchmark results.
+	===========================================================================================
+
+	Arguments:
+
+		result (dict): Benchmark result to check
+
+		result_base (dict): Benchmark result of the reference commit
+
+		threshold (float): Ratio of seconds above which a benchmark is a regression
+
+	Output:
+
+		df_compare (pandas.DataFrame): Seconds of both results, their ratio and the regression flag
+	"""
+
+	key     = ['name', 'n_building']
+	df      = pd.DataFrame(result['record'])
+	df_base = pd.DataFrame(result_base['record'])
+
+	df_compare = df_base[key + ['seconds']].merge(df[key + ['seconds']], on=key, suffixes=('_base', ''))
+	df_compare['ratio']      = df_compare['seconds'] / df_compare['seconds_base']
+	df_compare['regression'] = df_compare['ratio'] > threshold
+
+	return df_compare
+
+def _timeit(name, n_building, n_item, n_repeat, func):
+
+	list_seconds = []
+	for _ in range(n_repeat):
+
+		time_start = time.perf_counter()
+		func()
+		list_seconds.append(time.perf_counter() - time_start)
+
+	seconds = min(list_seconds)
+
+	return {'name': name, 'n_building': n_building, 'n_item': n_item, 'seconds': seconds, 'seconds_per_item': seconds / max(n_item, 1)}
+
+def _skip(name, n_building, reason):
+
+	return {'name': name, 'n_building': n_building, 'n_item': 0, 'seconds': None, 'seconds_per_item': None, 'skipped': reason}
+
+def _benchmark_import(import_budget):
+
+	# Import in a fresh interpreter and report GIS modules loaded on the address-only path
+	code = 'import sys, time; t = time.perf_counter(); import dependency.algorithm_bers; ' \
+		'print(time.perf_counter() - t); print(",".join(i for i in {} if i in sys.modules))'.format(LIST_MODULE_GIS)
+
+	output  = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=__path__ + '..').stdout.split('\n')
+	seconds = float(output[0])
+
+	return {
+		'name'             : 'import',
+		'n_building'       : 0,
+		'n_item'           : 1,
+		'seconds'          : seconds,
+		'seconds_per_item' : seconds,
+		'budget'           : import_budget,
+		'within_budget'    : seconds <= import_budget,
+		'module_gis'       : [i for i in output[1].split(',') if (i != '')],
+	}
+
+def _create_building(spec):
+
+	return algorithm_bers.Building(**{k: v for k, v in spec.items() if (k not in ('elevator', 'escalator'))})
+
+def _create_facility(building, spec):
+
+	# Reset so that repetitions do not accumulate facilities
+	building.elevator, building.escalator   = [], []
+	building.n_elevator, building.n_escalator = 0, 0
+
+	for i in spec['elevator']: building.create_elevator(**i)
+	for i in spec['escalator']: building.create_escalator(**i)
+
+def _estimate_incremental(building):
+
+	# One usage field changes between two estimations
+	building.n_hotelroom = building.n_hotelroom + 1
+	building.estimate()
+
+def _get_coordinate(n_point, seed):
+
+	try: return generate_coordinate(n_point, seed)
+	except Exception: return None, None
+
+def _get_commit():
+
+	try: return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True, cwd=__path__).stdout.strip()
+	except Exception: return None
@@ -0,0 +1,215 @@
+"""
+Synthetic buildings, energy sections and vertical transport fleets for benchmarks.
+
+Abbreviation:
+ - a: Area
+ - es: Energy Section
+ - cz: Climate Zone
+ - n: Number
+"""
+
+import numpy as np
+import pandas as pd
+
+from dependency.algorithm_bers.reference_data import get_registry
+
+LIST_BUILDING_TYPE = ['B1', 'B2', 'B3', 'D1', 'F1', 'H1', 'H2']
+LIST_ES_ELEVATOR   = ['B1', 'B3', 'J1', 'H1', 'NB13', 'F1', 'D5', 'J4']
+LIST_ES_EXCLUSIVE  = ['N1-1-1', 'N1-2-1', 'N1-5', 'N3-1-1', 'N3-2-1', 'N4-1', 'N5', 'N6', 'N2-1-1', 'N2-2', 'N2-1-3', 'N7', 'N8', 'N9']
+
+def generate_portfolio(n_building, n_es_comm=6, n_es_exc=2, n_elevator=3, n_escalator=1, seed=0):
+
+	"""
+	This method is used to generate a synthetic portfolio in the columnar layout of estimate_portfolio().
+	===========================================================================================
+
+	Arguments:
+
+		n_building (int): Number of buildings
+
+		n_es_comm (int): Number of common sections per building
+
+		n_es_exc (int): Number of exclusive sections per building
+
+		n_elevator (int): Maximum number of elevators per building
+
+		n_escalator (int): Maximum number of escalators per building
+
+		seed (int): Seed of the random generator
+
+	Output:
+
+		df_building, df_es, df_elevator, df_escalator (pandas.DataFrame): Portfolio tables keyed by building_id
+	"""
+
+	rng      = np.random.default_rng(seed)
+	registry = get_registry()
+
+	# =========================================================================================
+	#
+	# Buildings
+	#
+	# =========================================================================================
+
+	list_town = sorted(registry.dict_climatezone_town.keys())
+	idx_town  = rng.integers(0, len(list_town), n_building)
+
+	df_building = pd.DataFrame({
+		'building_id'                     : np.array(['b{:07d}'.format(i) for i in range(n_building)]),
+		'building_type'                   : rng.choice(LIST_BUILDING_TYPE, n_building),
+		'building_address_county'         : [list_town[i][0] for i in idx_town],
+		'building_address_town'           : [list_town[i][1] for i in idx_town],
+		'building_n_stories_above_ground' : rng.integers(2, 50, n_building),
+		'building_n_stories_below_ground' : rng.integers(0, 6, n_building),
+		'n_hotelroom'                     : rng.integers(20, 600, n_building),
+		'coef_usage_hotelroom'            : rng.uniform(0.4, 0.9, n_building),
+		'n_hospitalbed'                   : rng.integers(20, 800, n_building),
+		'coef_usage_hospitalbed'          : rng.uniform(0.5, 0.95, n_building),
+		'a_dining'                        : rng.uniform(50.0, 2000.0, n_building),
+		'n_dining_meal_per_day'           : rng.integers(1, 4, n_building),
+		'coef_power_cabinetrack'          : rng.uniform(0.1, 0.6, n_building),
+	})
+	cz = np.array([registry.dict_climatezone_town[list_town[i]] for i in idx_town])
+
+	# =========================================================================================
+	#
+	# Energy sections
+	#
+	# =========================================================================================
+
+	# Common sections with an AC type defined in every EUI table for the building's climate zone
+	dict_valid = _get_valid_es_comm()
+
+	list_es = []
+	for i in range(n_building):
+
+		valid = dict_valid[cz[i]]
+		idx   = rng.choice(len(valid), min(n_es_comm, len(valid)), replace=False)
+
+		for j in idx: list_es.append((df_building['building_id'].values[i], 'common', valid[j][0], valid[j][1]))
+		for j in rng.choice(LIST_ES_EXCLUSIVE, n_es_exc, replace=False): list_es.append((df_building['building_id'].values[i], 'exclusive', j, None))
+
+	df_es = pd.DataFrame(list_es, columns=['building_id', 'Section_Type', 'Section_ID', 'AC_Type'])
+	df_es.insert(3, 'Area', rng.uniform(30.0, 3000.0, df_es.shape[0]).round(2))
+
+	# =========================================================================================
+	#
+	# Elevators and escalators
+	#
+	# =========================================================================================
+
+	n_per_building = rng.integers(0, n_elevator + 1, n_building)
+	id_elevator    = np.repeat(df_building['building_id'].values, n_per_building)
+	n_unit         = id_elevator.shape[0]
+
+	df_elevator = pd.DataFrame({
+		'building_id'              : id_elevator,
+		'elevator_bottom_floor'    : -rng.integers(0, 5, n_unit),
+		'elevator_top_floor'       : rng.integers(2, 50, n_unit),
+		'elevator_es'              : [list(rng.choice(LIST_ES_ELEVATOR, 3)) for _ in range(n_unit)],
+		'coef_people_per_elevator' : rng.integers(6, 24, n_unit),
+		'coef_load_per_elevator'   : rng.integers(450, 1600, n_unit),
+		'coef_speed'               : rng.choice([45, 60, 90, 105, 120, 150, 180, 240], n_unit),
+	})
+
+	n_per_building = rng.integers(0, n_escalator + 1, n_building)
+	id_escalator   = np.repeat(df_building['building_id'].values, n_per_building)
+	n_unit         = id_escalator.shape[0]
+
+	df_escalator = pd.DataFrame({
+		'building_id'              : id_escalator,
+		'escalator_elevate_height' : rng.uniform(2.5, 7.0, n_unit).round(1),
+		'escalator_width'          : rng.choice([0.6, 0.8, 1.0], n_unit),
+		'escalator_es'             : [list(rng.choice(LIST_ES_ELEVATOR, 2)) for _ in range(n_unit)],
+	})
+
+	return df_building, df_es, df_elevator, df_escalator
+
+def generate_coordinate(n_point, seed=0):
+
+	"""
+	This method is used to generate coordinates inside the towns of the town layer.
+	===========================================================================================
+
+	Arguments:
+
+		n_point (int): Number of coordinates
+
+		seed (int): Seed of the random generator
+
+	Output:
+
+		lons, lats (numpy.ndarray): Longitudes and latitudes
+	"""
+
+	import shapely
+
+	from dependency.algorithm_bers.geocoder import get_geocoder
+
+	rng      = np.random.default_rng(seed)
+	geocoder = get_geocoder()
+
+	lon_min, lat_min, lon_max, lat_max = shapely.total_bounds(geocoder.geometry)
+	lons, lats = np.empty(0), np.empty(0)
+
+	# Rejection sampling over the extent of the layer
+	while (lons.shape[0] < n_point):
+
+		lon  = rng.uniform(lon_min, lon_max, 4 * n_point)
+		lat  = rng.uniform(lat_min, lat_max, 4 * n_point)
+		mask = geocoder.locate_index(lon, lat) >= 0
+		lons = np.concatenate([lons, lon[mask]])
+		lats = np.concatenate([lats, lat[mask]])
+
+	return lons[:n_point], lats[:n_point]
+
+def to_building_spec(df_building, df_es, df_elevator, df_escalator, estimation_system='BERSe'):
+
+	"""
+	This method is used to convert a columnar portfolio into Building specifications for the runner.
+	===========================================================================================
+
+	Arguments:
+
+		df_building, df_es, df_elevator, df_escalator (pandas.DataFrame): Portfolio tables keyed by building_id
+
+		estimation_system (str): Estimation system of every building
+
+	Output:
+
+		list_spec (list): One dict of Building arguments per building
+	"""
+
+	dict_es        = {k: v.drop(columns='building_id') for k, v in df_es.groupby('building_id', sort=False)}
+	dict_elevator  = {k: v.drop(columns='building_id').to_dict('records') for k, v in df_elevator.groupby('building_id', sort=False)}
+	dict_escalator = {k: v.drop(columns='building_id').to_dict('records') for k, v in df_escalator.groupby('building_id', sort=False)}
+
+	list_spec = []
+	for row in df_building.to_dict('records'):
+
+		row['estimation_system'] = estimation_system
+		row['energysection']     = dict_es.get(row['building_id'])
+		row['elevator']          = dict_elevator.get(row['building_id'], [])
+		row['escalator']         = dict_escalator.get(row['building_id'], [])
+		list_spec.append(row)
+
+	return list_spec
+
+def _get_valid_es_comm():
+
+	# (Section_ID, AC_Type) pairs with AEUI defined in every EUI table, by climate zone
+	registry   = get_registry()
+	dict_valid = {}
+
+	for cz in ('N', 'C', 'S'):
+
+		dict_valid[cz] = []
+
+		for ac_type in ('continue', 'interval'):
+
+			idx_aeui = registry.index_aeui.get_loc('AEUI_{}_{}'.format(cz, ac_type.upper()))
+			mask     = np.all([~np.isnan(i[:, idx_aeui]) for i in registry.dict_aeui.values()], axis=0)
+
+			dict_valid[cz] += [(i, ac_type) for i in registry.index_eui_criteria[mask]]
+
+	return dict_valid
@@ -1,2 +1,55 @@
+import importlib
+
 from . import building_basic
-from .building_basic import *
\ No newline at end of file
+from .building_basic import *
+from . import portfolio
+from .portfolio import estimate_portfolio
+from . import runner
+from .runner import run_buildings
+from . import ingestion
+from .ingestion import iter_energysection, iter_energysection_batch
+from . import instrumentation
+from .instrumentation import enable_instrumentation, disable_instrumentation, get_instrumentation, reset_instrumentation
+from . import facility_fleet
+from .facility_fleet import VerticalTransportFleet
+from . import scenario
+from .scenario import sweep_scenarios
+from . import uncertainty
+from .uncertainty import estimate_uncertainty, estimate_uncertainty_portfolio
+from . import results_store
+from .results_store import ResultsWriter, write_results, read_results
+from . import building_table
+from .building_table import BuildingTable
+from . import score
+from .score import calc_eui_scale, calc_eui_adjusted, calc_score, calc_eui_target, solve_target_ec
+from . import ingestion_meter
+from .ingestion_meter import aggregate_meter, join_meter
+from . import reference_data
+from .reference_data import register_estimation_system, use_estimation_system, get_estimation_system
+
+# Attributes of the modules loading asyncio or sqlite3, imported on first use
+DICT_LAZY = {
+	'service'               : ('service', None),
+	'EstimationService'     : ('service', 'EstimationService'),
+	'GeocodeCache'          : ('geocoder_cache', 'GeocodeCache'),
+	'enable_geocode_cache'  : ('geocoder_cache', 'enable_geocode_cache'),
+	'disable_geocode_cache' : ('geocoder_cache', 'disable_geocode_cache'),
+}
+
+def __getattr__(name):
+
+	# Error handling
+	# Attribute is not defined
+	if (name not in DICT_LAZY): raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+	module, attribute = DICT_LAZY[name]
+	module            = importlib.import_module('.' + module, __name__)
+	value             = module if (attribute is None) else getattr(module, attribute)
+
+	globals()[name] = value
+
+	return value
+
+def __dir__():
+
+	return sorted(set(globals()) | set(DICT_LAZY))
@@ -11,11 +11,36 @@ Abbreviation:
 
 import numpy as np
 import pandas as pd
-import geopandas as gpd
 import os
 
+from .reference_data import get_registry, _with_estimation_system
+from .geocoder_cache import get_locator
+from .facility_fleet import VerticalTransportFleet, match_facility_ec_elevator, match_facility_power_escalator
+from .score import calc_eui_scale, calc_eui_adjusted, calc_score, solve_target_ec
+from . import instrumentation
+
 __path__ = os.path.dirname(__file__).replace('\\', '/').replace('C:/', '/') + '/'
 
+# Attributes each stage of Building.estimate() depends on. Besides these, eui_scale depends on the
+# common sections, and e_n on the exclusive sections and the usage fields of exclusive sections.
+DICT_STAGE_INPUT = {
+	'locate'    : ['estimation_system', 'building_coordinate', 'building_address_county', 'building_address_town'],
+	'eui_scale' : ['estimation_system', 'building_cz'],
+	'e_n'       : ['estimation_system'],
+	'e_t'       : ['estimation_system', 'elevator', 'escalator', 'n_elevator', 'n_escalator'],
+}
+
+# Columns of energy sections used by the stages
+LIST_ES_INPUT = ['Section_ID', 'Area', 'AC_Type']
+
+# Arguments of Building stored under another attribute name
+DICT_ARGUMENT_ATTRIBUTE = {
+	'coef_usage_swimmingpool' : 'coef_usage_r_swimmingpool',
+	'coef_usage_spapool'      : 'coef_usage_r_spapool',
+	'coef_usage_hospitalbed'  : 'coef_usage_r_hospitalbed',
+	'coef_usage_hotelroom'    : 'coef_usage_r_hotelroom',
+}
+
 class Building():
 
 	"""
@@ -24,6 +49,7 @@ class Building():
 
 	#__path__ = os.path.dirname(__file__).replace('\\', '/').replace('C:/', '/') + '/'
 
+	@instrumentation.instrumented
 	def __init__(self, **kwargs):
 
 		"""
@@ -32,9 +58,12 @@ class Building():
 
 		Arguments:
 
-			estimation_system (str): The estimation system used to estimate the EUI score of a building.
+			estimation_system (str): The estimation system used to estimate the EUI score of a building. It selects the
+				version of the reference tables (see reference_data.register_estimation_system()), e.g. BERSe.
 
 			building_type (str): The type of a building.
+
+			energysection (pandas.DataFrame or str): Energy sections of the building, or the path of a CSV file.
 		"""
 
 		# Initialize the building object
@@ -103,71 +132,88 @@ class Building():
 
 		# =========================================================================================
 
+		# Inputs of each stage at its last computation, for incremental re-estimation
+		self._dict_fingerprint = {}
+
 		# Climate zone and urban coefficient
-		if (self.building_coordinate is not None): self.building_address_county, self.building_address_town = self._get_address_coordinate(*self.building_coordinate)
-		
-		self.building_cz = self._get_climatezone(self.building_address_county, self.building_address_town)
-		self.building_uc = self._get_urbanregion(self.building_address_county, self.building_address_town)
+		self._locate()
 
 		# =========================================================================================
 		
 		# Elevator
 
-	def estimate(self):
+	@instrumentation.instrumented
+	@_with_estimation_system
+	def estimate(self, df_es=None):
 
 		"""
 		This method is used to estimate the EUI score of a building
+		===========================================================================================
+
+		Arguments:
+
+			df_es (pandas.DataFrame): Energy sections with Section_Type, Section_ID, Area and AC_Type. Default is energysection of the building
+
+		Only the stages whose inputs changed since the last call are recomputed (see DICT_STAGE_INPUT).
+		Call invalidate() to recompute every stage.
+
+		If instrumentation is enabled, the stage wall times, file reads, bytes parsed and lookup cache
+		hits/misses of the building are kept in instrumentation (dict).
 		"""
 
+		# Location changed since the last computation. It is timed as the locate stage
+		if (self._is_dirty('locate')): self._locate()
+
+		lap = instrumentation.laps()
+
 		# =========================================================================================
 		# 
 		# Calculate EUI score scale
 		# 
 		# =========================================================================================
 
-		# Read the files for EUI score: EUI median, maximum, and minimum
-		df_eui_m                        = pd.read_csv(__path__ + '../data/eui_criteria/eui_criteria.m.csv')
-		df_eui_max                      = pd.read_csv(__path__ + '../data/eui_criteria/eui_criteria.max.csv')
-		df_eui_min                      = pd.read_csv(__path__ + '../data/eui_criteria/eui_criteria.m.csv')
+		# Read section tables
+		if (df_es is None): df_es      = self.energysection
+		if (isinstance(df_es, str)): df_es = self._read_energysection(df_es)
 
-		df_eui_m['Energy_Section_ID']   = df_eui_m['Energy_Section'].str.split('. ').str[0]
-		df_eui_max['Energy_Section_ID'] = df_eui_max['Energy_Section'].str.split('. ').str[0]
-		df_eui_min['Energy_Section_ID'] = df_eui_min['Energy_Section'].str.split('. ').str[0]
+		# Error handling
+		# Energy sections are not defined
+		if (df_es is None): raise ValueError('Energy sections are not defined.')
 
-		# Read section tables
-		df_es                          = pd.read_csv(__path__ + '../../../input/building_config/energysection.test.ver1.csv')
 		df_es_comm                     = df_es[df_es['Section_Type']=='common']
 		df_es_exc                      = df_es[df_es['Section_Type']=='exclusive']
 
-		# Extract EUI values from EUI score tables
-		df_es_comm_temp                = df_es_comm.copy()
-		df_es_comm_temp['eeui_m']      = df_es_comm.apply(lambda x: df_eui_m.loc[df_eui_m['Energy_Section_ID']==x['Section_ID'], 'EEUI'].values[0], axis=1)
-		df_es_comm_temp['leui_min']    = df_es_comm.apply(lambda x: df_eui_min.loc[df_eui_min['Energy_Section_ID']==x['Section_ID'], 'LEUI'].values[0], axis=1)
-		df_es_comm_temp['leui_m']      = df_es_comm.apply(lambda x: df_eui_m.loc[df_eui_m['Energy_Section_ID']==x['Section_ID'], 'LEUI'].values[0], axis=1)
-		df_es_comm_temp['leui_max']    = df_es_comm.apply(lambda x: df_eui_max.loc[df_eui_max['Energy_Section_ID']==x['Section_ID'], 'LEUI'].values[0], axis=1)
-		df_es_comm_temp['aeui_min']    = df_es_comm.apply(lambda x: df_eui_min.loc[df_eui_min['Energy_Section_ID']==x['Section_ID'], 'AEUI_{}_{}'.format(self.building_cz, x['AC_Type'].upper())].values[0], axis=1)
-		df_es_comm_temp['aeui_m']      = df_es_comm.apply(lambda x: df_eui_m.loc[df_eui_m['Energy_Section_ID']==x['Section_ID'], 'AEUI_{}_{}'.format(self.building_cz, x['AC_Type'].upper())].values[0], axis=1)
-		df_es_comm_temp['aeui_max']    = df_es_comm.apply(lambda x: df_eui_max.loc[df_eui_max['Energy_Section_ID']==x['Section_ID'], 'AEUI_{}_{}'.format(self.building_cz, x['AC_Type'].upper())].values[0], axis=1)
-		df_es_comm_temp['meaneui_m']   = df_es_comm.apply(lambda x: df_eui_m.loc[df_eui_m['Energy_Section_ID']==x['Section_ID'], 'EUI_Mean'].values[0], axis=1)
-		df_es_comm_temp['totaleui_m']  = df_es_comm.apply(lambda x: df_eui_m.loc[df_eui_m['Energy_Section_ID']==x['Section_ID'], 'TotalEUI'].values[0], axis=1)
-		df_es_comm = df_es_comm_temp.copy()
-		del df_es_comm_temp
+		fingerprint = self._get_fingerprint('eui_scale', df_es_comm)
+		if (self._dict_fingerprint.get('eui_scale') != fingerprint):
 
-		# Error handling
-		# aeui_min, aeui_m, or aeui_max include NaN
-		if (df_es_comm[['aeui_min', 'aeui_m', 'aeui_max']].isna().values.any()): raise ValueError('aeui_min, aeui_m, or aeui_max include NaN.')
-
-		# Calculate area and EUIs
-		self.est_a_es_comm   = df_es_comm['Area'].sum().round(2)
-		self.est_a_es_exc    = df_es_exc['Area'].sum().round(2)
-		self.est_aeui_min    = (df_es_comm['Area'].dot(df_es_comm['aeui_min'])) / self.est_a_es_comm
-		self.est_aeui_m      = (df_es_comm['Area'].dot(df_es_comm['aeui_m'])) / self.est_a_es_comm
-		self.est_aeui_max    = (df_es_comm['Area'].dot(df_es_comm['aeui_max'])) / self.est_a_es_comm
-		self.est_leui_min    = (df_es_comm['Area'].dot(df_es_comm['leui_min'])) / self.est_a_es_comm
-		self.est_leui_m      = (df_es_comm['Area'].dot(df_es_comm['leui_m'])) / self.est_a_es_comm
-		self.est_leui_max    = (df_es_comm['Area'].dot(df_es_comm['leui_max'])) / self.est_a_es_comm
-		self.est_eeui_m      = (df_es_comm['Area'].dot(df_es_comm['eeui_m'])) / self.est_a_es_comm
-		self.est_e_n         = self._calc_e_n(df_es_exc)
+			# Attach EUI values from EUI score tables with one keyed join on Energy_Section_ID
+			df_es_comm                     = get_registry().join_eui_criteria(df_es_comm, self.building_cz)
+
+			# Error handling
+			# aeui_min, aeui_m, or aeui_max include NaN
+			if (df_es_comm[['aeui_min', 'aeui_m', 'aeui_max']].isna().values.any()): raise ValueError('aeui_min, aeui_m, or aeui_max include NaN.')
+
+			# Calculate area and EUIs
+			self.est_a_es_comm   = df_es_comm['Area'].sum().round(2)
+			self.est_aeui_min    = (df_es_comm['Area'].dot(df_es_comm['aeui_min'])) / self.est_a_es_comm
+			self.est_aeui_m      = (df_es_comm['Area'].dot(df_es_comm['aeui_m'])) / self.est_a_es_comm
+			self.est_aeui_max    = (df_es_comm['Area'].dot(df_es_comm['aeui_max'])) / self.est_a_es_comm
+			self.est_leui_min    = (df_es_comm['Area'].dot(df_es_comm['leui_min'])) / self.est_a_es_comm
+			self.est_leui_m      = (df_es_comm['Area'].dot(df_es_comm['leui_m'])) / self.est_a_es_comm
+			self.est_leui_max    = (df_es_comm['Area'].dot(df_es_comm['leui_max'])) / self.est_a_es_comm
+			self.est_eeui_m      = (df_es_comm['Area'].dot(df_es_comm['eeui_m'])) / self.est_a_es_comm
+
+			self._dict_fingerprint['eui_scale'] = fingerprint
+
+		fingerprint = self._get_fingerprint('e_n', df_es_exc)
+		if (self._dict_fingerprint.get('e_n') != fingerprint):
+
+			self.est_a_es_exc    = df_es_exc['Area'].sum().round(2)
+			self.est_e_n         = self._calc_e_n(df_es_exc)
+
+			self._dict_fingerprint['e_n'] = fingerprint
+
+		lap('eui_scale')
 
 		# =========================================================================================
 		# 
@@ -181,12 +227,16 @@ class Building():
 		if (self.n_escalator != len(self.escalator)): raise ValueError('n_escalator is not equal to the length of escalator list.')
 
 		# Get coefficient for special EC
-		self.est_e_t         = \
-			np.nansum([i.coef_usage_r * i.coef_facility_ec * i.coef_eff * i.coef_usage_h for i in self.elevator]) + \
-			np.nansum([i.coef_usage_r * i.coef_facility_power * i.coef_eff * i.coef_usage_h for i in self.escalator])
-		
-		#self.est_e_p        = 
+		if (self._is_dirty('e_t')):
+
+			self.est_e_t         = np.nansum(VerticalTransportFleet.from_facility(self.elevator, self.escalator).calc_e_t_unit())
+
+			self._dict_fingerprint['e_t'] = self._get_fingerprint('e_t')
 		
+		# Energy consumption of other special uses
+		self.est_e_p         = float(self.ec_other) if (self.ec_other is not None) else 0.0
+
+		lap('adjusted_ec')
 
 		# =========================================================================================
 		# 
@@ -194,7 +244,15 @@ class Building():
 		# 
 		# =========================================================================================
 
+		# EUI scale adjusted by the urban coefficient. The remaining stages are closed-form and always recomputed
+		self.est_eui_min     = calc_eui_scale(self.building_uc, self.est_aeui_min, self.est_leui_min, self.est_eeui_m)
+		self.est_eui_m       = calc_eui_scale(self.building_uc, self.est_aeui_m, self.est_leui_m, self.est_eeui_m)
+		self.est_eui_max     = calc_eui_scale(self.building_uc, self.est_aeui_max, self.est_leui_max, self.est_eeui_m)
+
+		# Adjusted EUI of common sections (EUI*). NaN without the annual energy consumption
+		self.est_eui         = calc_eui_adjusted(self.ec_annual if (self.ec_annual is not None) else np.nan, self.est_e_p, self.est_e_n, self.est_e_t, self.est_a_es_comm)
 
+		lap('bias_correction')
 
 		# =========================================================================================
 		# 
@@ -202,6 +260,52 @@ class Building():
 		# 
 		# =========================================================================================
 
+		# 100 at est_eui_min, 50 at est_eui_m, 0 at est_eui_max
+		self.est_score       = calc_score(self.est_eui, self.est_eui_min, self.est_eui_m, self.est_eui_max)
+
+		lap('score')
+
+	def invalidate(self):
+
+		"""
+		This method is used to make the next estimate() recompute every stage.
+		===========================================================================================
+
+		Arguments:
+
+			None
+
+		Output:
+
+			None
+		"""
+
+		self._dict_fingerprint = {'locate': self._dict_fingerprint.get('locate')}
+
+		return
+
+	def solve_target_ec(self, list_target, dict_grade=None):
+
+		"""
+		This method is used to get the annual energy consumption reaching each target score, from the last estimate().
+		===========================================================================================
+
+		Arguments:
+
+			list_target (list): Target scores, or grades if dict_grade is given
+
+			dict_grade (dict): Minimum score of each grade. Default is None (targets are scores)
+
+		Output:
+
+			df_target (pandas.DataFrame): One row per target with eui_target, ec_target, ec_reduction and ec_reduction_ratio
+		"""
+
+		df_target = solve_target_ec(pd.DataFrame([{k: v for k, v in vars(self).items() if k.startswith('est_')}]), list_target, dict_grade)
+
+		return df_target.droplevel(0)
+
+	@_with_estimation_system
 	def create_elevator(self, **kwargs):
 
 		"""
@@ -226,6 +330,7 @@ class Building():
 
 		return
 
+	@_with_estimation_system
 	def create_escalator(self, **kwargs):
 
 		"""
@@ -250,6 +355,50 @@ class Building():
 
 		return
 
+	@_with_estimation_system
+	def _locate(self):
+
+		with instrumentation.stage('locate'):
+
+			if (self.building_coordinate is not None): self.building_address_county, self.building_address_town = self._get_address_coordinate(*self.building_coordinate)
+
+			self.building_cz = self._get_climatezone(self.building_address_county, self.building_address_town)
+			self.building_uc = self._get_urbanregion(self.building_address_county, self.building_address_town)
+
+		self._dict_fingerprint['locate'] = self._get_fingerprint('locate')
+
+		return
+
+	def _is_dirty(self, stage):
+
+		return self._dict_fingerprint.get(stage) != self._get_fingerprint(stage)
+
+	def _get_fingerprint(self, stage, df_es=None):
+
+		list_input = DICT_STAGE_INPUT[stage] + (get_registry().list_es_exclusive_field if (stage == 'e_n') else [])
+
+		# Values of the inputs of a stage. Sections are fingerprinted by content, facilities by their attributes
+		# (an identity would be reused by a new facility replacing a freed one)
+		fingerprint = tuple(
+			_get_facility_fingerprint(value) if (isinstance(value, (FacilityElevator, FacilityEscalator))) else value
+			for value in (getattr(self, i) for i in list_input)
+			for value in (value if (isinstance(value, list)) else [value])
+		)
+
+		if (df_es is not None): fingerprint += (pd.util.hash_pandas_object(df_es[[i for i in LIST_ES_INPUT if (i in df_es)]], index=False).values.tobytes(),)
+
+		return fingerprint
+
+	def _read_energysection(self, path_file):
+
+		# A path is read again only if the file changed
+		stat = os.stat(path_file)
+		key  = (path_file, stat.st_mtime_ns, stat.st_size)
+
+		if (self.__dict__.get('_energysection_file', (None, None))[0] != key): self._energysection_file = (key, _read_energysection(path_file))
+
+		return self._energysection_file[1]
+
 	def _get_address_coordinate(self, lon, lat):
 
 		"""
@@ -269,12 +418,8 @@ class Building():
 			town (str): Town of the building
 		"""
 
-		# Read the shapefile
-		df_town = gpd.read_file(__path__ + '../data/gis_layer/layer_taiwan_town/TOWN_MOI_1120317.shp', encoding='utf-8')
-
-		# Get the county and town by latitude and longitude
-		county = df_town.loc[df_town['geometry'].contains(gpd.points_from_xy([lon], [lat])[0]), 'COUNTYNAME'].values[0]
-		town   = df_town.loc[df_town['geometry'].contains(gpd.points_from_xy([lon], [lat])[0]), 'TOWNNAME'].values[0]
+		# Get the county and town by latitude and longitude from the geocode cache or the shared town index
+		county, town, _ = get_locator().locate_point(lon, lat)
 
 		return county, town
 	
@@ -295,11 +440,8 @@ class Building():
 			climatezone (str): Climate zone of the building. N, C, or S.
 		"""
 
-		# Read the file for climate zone
-		df_town_climatezone = pd.read_csv(__path__ + '../data/coef_climatezone/coef_climatezone.csv')
-
 		# Get the climate zone
-		climatezone         = df_town_climatezone.loc[(df_town_climatezone['COUNTYNAME']==county)&(df_town_climatezone['TOWNNAME']==town), 'Climate_Zone'].values[0]
+		climatezone = get_registry().get_climatezone(county, town)
 
 		return climatezone
 
@@ -320,16 +462,8 @@ class Building():
 			urbanregion (str): Urban region of the building. N, C, or S.
 		"""
 
-		# Read the file for urban region
-		df_town_urbanregion = pd.read_csv(__path__ + '../data/coef_urbanregion/coef_urbanregion.csv')
-
-		# Get the urban region
-		urbanregion         = df_town_urbanregion.loc[(df_town_urbanregion['COUNTYNAME']==county)&(df_town_urbanregion['TOWNNAME']==town), 'Urban_Region'].values[0]
-
-		if (urbanregion == 'A'): urbanregion = 1.0
-		elif (urbanregion == 'B'): urbanregion = 0.95
-		elif (urbanregion == 'C'): urbanregion = 0.8
-		else: urbanregion = 0.7
+		# Get the urban region: A = 1.0, B = 0.95, C = 0.8, others = 0.7
+		urbanregion = get_registry().get_urbanregion(county, town)
 
 		return urbanregion
 	
@@ -348,148 +482,23 @@ class Building():
 			en (float): Energy consumption of exclusive sections
 		"""
 
-		# Define masking function
-		mask_section = lambda x: df_es_exc['Section_ID']==x
-
-		# Deep copy
-		df_es_exc_temp = df_es_exc.copy()
-
-		# =========================================================================================
-		# 
-		# Class 1: EUI + area
-		# 
-		# =========================================================================================
-		
-		# N1-1-1
-		if (mask_section('N1-1-1').any()): df_es_exc_temp.loc[mask_section('N1-1-1'), 'en'] = 330 * df_es_exc.loc[mask_section('N1-1-1'), 'Area'].values[0]
-
-		# N1-1-2
-		if (mask_section('N1-1-2').any()): df_es_exc_temp.loc[mask_section('N1-1-2'), 'en'] = 250 * df_es_exc.loc[mask_section('N1-1-2'), 'Area'].values[0]
-
-		# N1-2-1
-		if (mask_section('N1-2-1').any()): df_es_exc_temp.loc[mask_section('N1-2-1'), 'en'] = 665 * df_es_exc.loc[mask_section('N1-2-1'), 'Area'].values[0]
-
-		# N1-2-2
-		if (mask_section('N1-2-2').any()): df_es_exc_temp.loc[mask_section('N1-2-2'), 'en'] = 530 * df_es_exc.loc[mask_section('N1-2-2'), 'Area'].values[0]
-
-		# N1-3-1
-		if (mask_section('N1-3-1').any()): df_es_exc_temp.loc[mask_section('N1-3-1'), 'en'] = 1318 * df_es_exc.loc[mask_section('N1-3-1'), 'Area'].values[0]
-
-		# N1-3-2
-		if (mask_section('N1-3-2').any()): df_es_exc_temp.loc[mask_section('N1-3-2'), 'en'] = 900 * df_es_exc.loc[mask_section('N1-3-2'), 'Area'].values[0]
-
-		# N1-4-1
-		if (mask_section('N1-4-1').any()): df_es_exc_temp.loc[mask_section('N1-4-1'), 'en'] = 989 * df_es_exc.loc[mask_section('N1-4-1'), 'Area'].values[0]
-
-		# N1-4-2
-		if (mask_section('N1-4-2').any()): df_es_exc_temp.loc[mask_section('N1-4-2'), 'en'] = 675 * df_es_exc.loc[mask_section('N1-4-2'), 'Area'].values[0]
-
-		# N1-5
-		if (mask_section('N1-5').any()): df_es_exc_temp.loc[mask_section('N1-5'), 'en'] = 387 * df_es_exc.loc[mask_section('N1-5'), 'Area'].values[0]
-
-		# N1-6
-		if (mask_section('N1-6').any()): df_es_exc_temp.loc[mask_section('N1-6'), 'en'] = 1500 * df_es_exc.loc[mask_section('N1-6'), 'Area'].values[0]
-
-		# N1-7
-		if (mask_section('N1-7').any()): df_es_exc_temp.loc[mask_section('N1-7'), 'en'] = 530 * df_es_exc.loc[mask_section('N1-7'), 'Area'].values[0]
-
-		# N3-1-1
-		if (mask_section('N3-1-1').any()): df_es_exc_temp.loc[mask_section('N3-1-1'), 'en'] = 26.7 * df_es_exc.loc[mask_section('N3-1-1'), 'Area'].values[0]
-
-		# N3-1-2
-		if (mask_section('N3-1-2').any()): df_es_exc_temp.loc[mask_section('N3-1-2'), 'en'] = 35.3 * df_es_exc.loc[mask_section('N3-1-2'), 'Area'].values[0]
-
-		# N3-2-1
-		if (mask_section('N3-2-1').any()): df_es_exc_temp.loc[mask_section('N3-2-1'), 'en'] = 21.3 * df_es_exc.loc[mask_section('N3-2-1'), 'Area'].values[0]
-
-		# N3-2-2
-		if (mask_section('N3-2-2').any()): df_es_exc_temp.loc[mask_section('N3-2-2'), 'en'] = 29.9 * df_es_exc.loc[mask_section('N3-2-2'), 'Area'].values[0]
-
-		# N3-3-1
-		if (mask_section('N3-3-1').any()): df_es_exc_temp.loc[mask_section('N3-3-1'), 'en'] = 41.9 * df_es_exc.loc[mask_section('N3-3-1'), 'Area'].values[0]
-
-		# N4-1
-		if (mask_section('N4-1').any()): df_es_exc_temp.loc[mask_section('N4-1'), 'en'] = 3.2 * df_es_exc.loc[mask_section('N4-1'), 'Area'].values[0]
+		# Usage fields of the building referred by the exclusive section table
+		df_usage = pd.DataFrame([{i: getattr(self, i) for i in get_registry().list_es_exclusive_field}])
 
-		# N4-2
-		if (mask_section('N4-2').any()): df_es_exc_temp.loc[mask_section('N4-2'), 'en'] = 6.1 * df_es_exc.loc[mask_section('N4-2'), 'Area'].values[0]
-
-		# N4-3
-		if (mask_section('N4-3').any()): df_es_exc_temp.loc[mask_section('N4-3'), 'en'] = 80.0 * df_es_exc.loc[mask_section('N4-3'), 'Area'].values[0]
-
-		# N5
-		if (mask_section('N5').any()): df_es_exc_temp.loc[mask_section('N5'), 'en'] = 545 * df_es_exc.loc[mask_section('N5'), 'Area'].values[0]
-
-		# N6
-		if (mask_section('N6').any()): df_es_exc_temp.loc[mask_section('N6'), 'en'] = 910 * df_es_exc.loc[mask_section('N6'), 'Area'].values[0]
-
-		# =========================================================================================
-		# 
-		# Class 2: usage
-		# 
-		# =========================================================================================
-
-		# N2-1-1
-		if (mask_section('N2-1-1').any()): df_es_exc_temp.loc[mask_section('N2-1-1'), 'en'] = self.n_hotelroom * 5.85 * 365 * self.coef_usage_r_hotelroom * 2.0
-		
-		# N2-1-2
-		if (mask_section('N2-1-2').any()): df_es_exc_temp.loc[mask_section('N2-1-2'), 'en'] = self.n_hotelroom * 3.85 * 365 * self.coef_usage_r_hotelroom * 1.5
-
-		# N2-2
-		if (mask_section('N2-2').any()): df_es_exc_temp.loc[mask_section('N2-2'), 'en'] = self.n_hospitalbed * 0.93 * 365 * self.coef_usage_r_hospitalbed * 1.5
-
-		# =========================================================================================
-		# 
-		# Class 3: usage + area
-		# 
-		# =========================================================================================
-
-		# N2-1-3
-		if (mask_section('N2-1-3').any()): df_es_exc_temp.loc[mask_section('N2-1-3'), 'en'] = self.a_dining * 0.09 * self.n_dining_meal_per_day * 365 * 0.7 * 1.5
-
-		# =========================================================================================
-		# 
-		# Class 4: EUI + usage + area
-		# 
-		# =========================================================================================
-
-		# N7
-		if (mask_section('N7').any()): df_es_exc_temp.loc[mask_section('N7'), 'en'] = 0.124 * df_es_exc.loc[mask_section('N7'), 'Area'].values[0] * self.get_coef_usage_h('N7') * 1.5 
-
-		# N8
-		if (mask_section('N8').any()): df_es_exc_temp.loc[mask_section('N8'), 'en'] = (2630 * self.coef_power_cabinetrack + 51) * df_es_exc.loc[mask_section('N8'), 'Area'].values[0]
-
-		# =========================================================================================
-		# 
-		# Class 5: other
-		# 
-		# =========================================================================================
-
-		# N9, N10, N12
-		if (mask_section('N9').any()): df_es_exc_temp.loc[mask_section('N9'), 'en'] = 0
-		if (mask_section('N10').any()): df_es_exc_temp.loc[mask_section('N10'), 'en'] = 0
-		if (mask_section('N12').any()): df_es_exc_temp.loc[mask_section('N12'), 'en'] = 0
-
-		# N11: raise error. Please use the other es
-		if (mask_section('N11').any()): raise ValueError('Please avoid using N11. Use the other es instead.')
-
-		# =========================================================================================
-		#
-		# Summation
-		#
-		# =========================================================================================
-
-		# Rename variables
-		df_es_exc = df_es_exc_temp.copy()
-		del df_es_exc_temp
-
-		# Calculate en
-		en = df_es_exc['en'].sum()
+		# Calculate en. Sections without coefficients are ignored.
+		en = np.nansum(calc_en_section(df_es_exc, df_usage))
 
 		return en
 
 class FacilityElevator():
 
+	# Fixed attributes without a per-object __dict__, for buildings with many units
+	__slots__ = (
+		'building_type', 'elevator_bottom_floor', 'elevator_top_floor', 'elevator_floor_offset', 'elevator_es', 'coef_eff',
+		'coef_people_per_elevator', 'coef_load_per_elevator', 'coef_speed', 'elevator_n_stories_total', 'coef_usage_r',
+		'coef_facility_ec', 'coef_usage_h',
+	)
+
 	def __init__(self, **kwargs):
 
 		"""
@@ -526,7 +535,7 @@ class FacilityElevator():
 		self.coef_facility_ec           = self._get_coef_facility_ec_elevator()
 
 		# Energy consumption of elevator
-		self.coef_usage_h               = np.nanmax([get_coef_usage_h(i) for i in self.elevator_es])
+		self.coef_usage_h               = np.nanmax(get_coef_usage_h_array(self.elevator_es))
 	
 	def _get_coef_facility_usage_r_elevator(self):
 
@@ -543,11 +552,8 @@ class FacilityElevator():
 			coef_usage_r_elevator (float): Coefficient of usage ratio of elevator
 		"""
 
-		# Read the file for coefficient of usage ratio of elevator
-		df_coef = pd.read_csv(__path__ + '../data/coef_facility/coef_facility_usage_elevator_escalator.csv')
-
 		# Get the coefficient of usage ratio of elevator
-		coef_usage_r_elevator  = df_coef.loc[df_coef['Section_ID']==self.building_type, 'Or'].values[0]
+		coef_usage_r_elevator  = get_registry().get_coef_facility_usage(self.building_type, 'Or')
 
 		return coef_usage_r_elevator
 	
@@ -566,28 +572,20 @@ class FacilityElevator():
 			coef_ec_elevator (float): Coefficient of EC of elevator
 		"""
 
-		# Read the file for coefficient of EC of elevator
-		df_coef = pd.read_csv(__path__ + '../data/coef_facility/coef_facility_ec_elevator.csv')
-
-		# Get the coefficient of EC of elevator
-		df_coef = df_coef.loc[\
-			(df_coef['Stories_min']<=self.elevator_n_stories_total) &
-			(df_coef['Stories_max']>=self.elevator_n_stories_total)
-		]
-
-		# Create a key for sorting
-		df_coef['key_sorting'] = \
-			(np.array(df_coef['n_People'])-self.coef_people_per_elevator)**2 + \
-			1e-2*(np.array(df_coef['n_Load'])-self.coef_load_per_elevator)**2 + \
-			0.5*(np.array(df_coef['Speed'])-self.coef_speed)**2
-
-		# Get the coefficient of EC of elevator
-		coef_ec_elevator = df_coef.loc[df_coef['key_sorting']==df_coef['key_sorting'].min(), 'FLE'].values[0]
+		# Get the coefficient of EC of elevator: the nearest (people, load, speed) row within the story range
+		coef_ec_elevator = match_facility_ec_elevator(self.elevator_n_stories_total, self.coef_people_per_elevator, self.coef_load_per_elevator, self.coef_speed)[0]
 
 		return coef_ec_elevator
 
 class FacilityEscalator():
 
+	# Fixed attributes without a per-object __dict__, for buildings with many units
+	__slots__ = (
+		'building_type', 'escalator_bottom_floor', 'escalator_top_floor', 'escalator_floor_offset', 'escalator_elevate_height',
+		'escalator_width', 'escalator_es', 'coef_eff', 'coef_people_per_escalator', 'coef_load_per_escalator', 'coef_speed',
+		'escalator_n_stories_total', 'coef_usage_r', 'coef_facility_power', 'coef_usage_h',
+	)
+
 	def __init__(self, **kwargs):
 
 		"""
@@ -601,6 +599,9 @@ class FacilityEscalator():
 
 		# Initialize the escalator object
 		self.building_type                   = kwargs.get('building_type', None)
+		self.escalator_bottom_floor          = kwargs.get('escalator_bottom_floor', None)
+		self.escalator_top_floor             = kwargs.get('escalator_top_floor', None)
+		self.escalator_floor_offset          = kwargs.get('escalator_floor_offset', 0)
 		self.escalator_elevate_height        = kwargs.get('escalator_elevate_height', None)
 		self.escalator_width                 = kwargs.get('escalator_width', None)
 		self.escalator_es                    = kwargs.get('escalator_es', [])
@@ -616,14 +617,15 @@ class FacilityEscalator():
 		# =========================================================================================
 
 		# Basic information
-		self.escalator_n_stories_total  = self.escalator_top_floor - self.escalator_bottom_floor + self.escalator_floor_offset
+		self.escalator_n_stories_total  = None if (self.escalator_top_floor is None) or (self.escalator_bottom_floor is None) else \
+			self.escalator_top_floor - self.escalator_bottom_floor + self.escalator_floor_offset
 
 		# Coefficient of usage ratio of escalator
 		self.coef_usage_r               = self._get_coef_facility_usage_r_escalator()
 		self.coef_facility_power        = self._get_coef_facility_power_escalator()
 
 		# Energy consumption of escalator
-		self.coef_usage_h               = np.nanmax([get_coef_usage_h(i) for i in self.escalator_es])
+		self.coef_usage_h               = np.nanmax(get_coef_usage_h_array(self.escalator_es))
 
 	def _get_coef_facility_usage_r_escalator(self):
 
@@ -640,11 +642,8 @@ class FacilityEscalator():
 			coef_usage_r_escalator (float): Coefficient of usage ratio of escalator
 		"""
 
-		# Read the file for coefficient of usage ratio of scalator
-		df_coef = pd.read_csv(__path__ + '../data/coef_facility/coef_facility_usage_elevator_escalator.csv')
-
 		# Get the coefficient of usage ratio of escalator
-		coef_usage_r_escalator = df_coef.loc[df_coef['Section_ID']==self.building_type, 'Osr'].values[0]
+		coef_usage_r_escalator = get_registry().get_coef_facility_usage(self.building_type, 'Osr')
 
 		return coef_usage_r_escalator
 	
@@ -663,20 +662,8 @@ class FacilityEscalator():
 			coef_ec_escalator (float): Coefficient of power of escalator
 		"""
 
-		# Read the file for coefficient of EC of escalator
-		df_coef = pd.read_csv(__path__ + '../data/coef_facility/coef_facility_power_escalator.csv')
-
-		# Get the coefficient of EC of escalator
-		df_coef = df_coef.loc[\
-			(df_coef['Elevate_min']<=self.escalator_elevate_height)&\
-			(df_coef['Elevate_max']>self.escalator_elevate_height)
-		]
-
-		# Create a key for sorting
-		df_coef['key_sorting'] = (np.array(df_coef['Width'])-self.escalator_width)
-
-		# Get the coefficient of power of escalator
-		coef_ec_escalator = df_coef.loc[df_coef['key_sorting']==df_coef['key_sorting'].min(), 'Power'].values[0]
+		# Get the coefficient of power of escalator: the row with the smallest width key within the elevate height range
+		coef_ec_escalator = match_facility_power_escalator(self.escalator_elevate_height, self.escalator_width)[0]
 
 		return coef_ec_escalator
 
@@ -704,6 +691,42 @@ class FacilityHotel():
 
 		pass
 
+def calc_en_section(df_es_exc, df_usage, column_id=None):
+
+	"""
+	This method is used to calculate the energy consumption of each exclusive section.
+	===========================================================================================
+
+	The coefficients come from coef_es_exclusive.csv:
+
+		en = (EUI * Usage + Offset) * Quantity * Days * Factor
+
+	 - Class 1: EUI + area            (Quantity is Area)
+	 - Class 2: usage                 (Usage and Quantity are usage fields of the building)
+	 - Class 3: usage + area          (Quantity is an area field of the building)
+	 - Class 4: EUI + usage + area    (Usage is YOH or a usage field, Quantity is Area)
+	 - Class 5: other                 (EUI is 0)
+
+	Arguments:
+
+		df_es_exc (pandas.DataFrame): Exclusive sections with Section_ID and Area
+
+		df_usage (pandas.DataFrame): Usage fields of the buildings, named as the Building attributes.
+			One row for a single building, or indexed by building ID
+
+		column_id (str): Column of df_es_exc with the building ID. Default is None for a single building
+
+	Output:
+
+		en (numpy.ndarray): Energy consumption of each exclusive section. NaN for undefined sections
+	"""
+
+	term = _get_en_term(df_es_exc, df_usage, column_id)
+
+	en = (term['eui'] * term['usage'] + term['offset']) * term['quantity'] * term['days'] * term['factor']
+
+	return en
+
 def get_coef_usage_h(es, es_sub=1):
 
 	"""
@@ -721,27 +744,98 @@ def get_coef_usage_h(es, es_sub=1):
 		coef_usage_h (float): YOH of the given es
 	"""
 
-	# Read the file for YOH
-	df_coef = pd.read_csv(__path__ + '../data/coef_es_operation/coef_es_operation.csv')
+	# Get YOH from the registry
+	coef_usage_h = get_registry().get_coef_usage_h(es, es_sub)
 
-	# Modify es if the section is special
-	if (es == 'N7'):
-		
-		es = 'L6-1'
+	return coef_usage_h
 
-	# Get YOH from the dataframe
-	if (es != 'J4'):
-		
-		df_coef = df_coef.loc[df_coef['Energy_Section'].str.split('. ').str[0]==es, 'YOH']
-	
-	else:
-		
-		df_coef = df_coef.loc[(df_coef['Energy_Section'].str.split('. ').str[0]==es)&(df_coef['Sub-section'].str.split('. ').str[0]==str(es_sub)), 'YOH']
-	
-	# Raise error if no YOH is found (the given es is not defined)
-	if (df_coef.empty): raise ValueError('YOH is not defined for es {}.'.format(es))
+def get_coef_usage_h_array(es, es_sub=1):
+
+	"""
+	This method is used to get YOH (operation hours per year) of many es at once.
+	===========================================================================================
+
+	Arguments:
+
+		es (array-like): Energy sections
+
+		es_sub (str): Sub-energy section. Default is 1 and only available for J4
+
+	Output:
+
+		coef_usage_h (numpy.ndarray): YOH of each given es
+	"""
+
+	# Get YOH from the registry
+	coef_usage_h = get_registry().get_coef_usage_h_array(es, es_sub)
+
+	return coef_usage_h
+
+def _get_en_term(df_es_exc, df_usage, column_id=None):
+
+	# Terms of en = (EUI * Usage + Offset) * Quantity * Days * Factor for each exclusive section, with the
+	# usage field feeding Usage (None if there is none) and Quantity ('Area' for the section area)
+	registry = get_registry()
+
+	# N11: raise error. Please use the other es
+	if (df_es_exc['Section_ID']=='N11').any(): raise ValueError('Please avoid using N11. Use the other es instead.')
+
+	df_coef = registry.df_es_exclusive.reindex(df_es_exc['Section_ID'].values)
+
+	# Row of df_usage for each section
+	idx_building = np.zeros(df_es_exc.shape[0], dtype=np.int64) if (column_id is None) else df_usage.index.get_indexer(df_es_exc[column_id])
+
+	usage          = np.ones(df_es_exc.shape[0])
+	quantity       = df_es_exc['Area'].to_numpy(dtype=float).copy()
+	field_usage    = np.full(df_es_exc.shape[0], None, dtype=object)
+	field_quantity = np.full(df_es_exc.shape[0], 'Area', dtype=object)
+
+	# Gather usage and quantity by field
+	for column, values, fields in (('Usage', usage, field_usage), ('Quantity', quantity, field_quantity)):
+
+		for field in df_coef[column].dropna().unique():
+
+			if (field == 'Area'): continue
+
+			mask = (df_coef[column]==field).to_numpy()
+
+			if (field == 'YOH'):
+
+				values[mask] = get_coef_usage_h_array(df_es_exc['Section_ID'].values[mask])
+
+				continue
+
+			values[mask] = df_usage[field].to_numpy(dtype=float, na_value=np.nan)[idx_building[mask]] if (field in df_usage) else np.nan
+			fields[mask] = field
+
+			# Error handling
+			# Usage field of the building is not defined
+			if np.isnan(values[mask]).any(): raise ValueError('{} is not defined for es {}.'.format(field, df_es_exc['Section_ID'].values[mask][0]))
+
+	return {
+		'eui'            : df_coef['EUI'].to_numpy(dtype=float),
+		'usage'          : usage,
+		'offset'         : df_coef['Offset'].to_numpy(dtype=float),
+		'quantity'       : quantity,
+		'days'           : df_coef['Days'].to_numpy(dtype=float),
+		'factor'         : df_coef['Factor'].to_numpy(dtype=float),
+		'field_usage'    : field_usage,
+		'field_quantity' : field_quantity,
+	}
+
+def _get_facility_fingerprint(facility):
+
+	# Inputs and derived coefficients of a facility, with lists as tuples
+	return (type(facility).__name__,) + tuple(
+		tuple(value) if (isinstance(value, list)) else value
+		for value in (getattr(facility, i, None) for i in type(facility).__slots__)
+	)
+
+def _read_energysection(path_file):
+
+	df_es = pd.read_csv(path_file)
 
-	# Get YOH
-	coef_usage_h =  df_coef.values[0]
+	instrumentation.count('file_reads')
+	instrumentation.count('bytes_parsed', os.path.getsize(path_file))
 
-	return coef_usage_h
\ No newline at end of file
+	return df_es
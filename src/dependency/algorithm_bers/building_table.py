@@ -0,0 +1,434 @@
+"""
+Compact struct-of-arrays representation of many buildings.
+
+A BuildingTable holds one column per Building argument instead of one object per building. Text
+fields (building type, county, town, section IDs, AC types) are categorical codes, counts and floors
+are float32 (exact for integers below 2**24), and other numbers stay float64 so that estimates do
+not change. Energy sections and facilities are tables keyed by the position of their building, and
+the sections served by each facility are one row per (unit, section) instead of a list per unit.
+
+	table = BuildingTable.from_buildings(list_building)
+	df_result = table.estimate()
+	building = table.to_building(0)
+
+Abbreviation:
+ - a: Area
+ - coef: Coefficient
+ - es: Energy Section
+ - n: Number
+ - ec: Energy Consumption
+ - wc: Water Consumption
+"""
+
+import numpy as np
+import pandas as pd
+
+from .reference_data import get_estimation_system
+from .building_basic import Building, DICT_ARGUMENT_ATTRIBUTE, _read_energysection
+from .portfolio import estimate_portfolio
+
+# Columns of buildings (arguments of Building) and their types
+DICT_BUILDING_DTYPE = {
+	'estimation_system'               : 'category',
+	'building_type'                   : 'category',
+	'building_address_county'         : 'category',
+	'building_address_town'           : 'category',
+	'building_lon'                    : 'float64',
+	'building_lat'                    : 'float64',
+	'building_n_stories_above_ground' : 'float32',
+	'building_n_stories_below_ground' : 'float32',
+	'floor_offset'                    : 'float32',
+	'ec_annual'                       : 'float64',
+	'ec_other'                        : 'float64',
+	'wc_annual_rainfall'              : 'float64',
+	'a_recreation'                    : 'float64',
+	'a_dining'                        : 'float64',
+	'a_watercooledac'                 : 'float64',
+	'a_exhibition'                    : 'float64',
+	'coef_power_cabinetrack'          : 'float64',
+	'ec_heating_normal'               : 'float64',
+	'ec_heating_recreation'           : 'float64',
+	'height_watertower'               : 'float64',
+	'volume_swimmingpool'             : 'float64',
+	'volume_spapool'                  : 'float64',
+	'coef_usage_swimmingpool'         : 'float64',
+	'coef_usage_spapool'              : 'float64',
+	'coef_usage_hospitalbed'          : 'float64',
+	'coef_usage_hotelroom'            : 'float64',
+	'coef_usage_d_exhibition'         : 'float64',
+	'n_hospitalbed'                   : 'float32',
+	'n_hotelroom'                     : 'float32',
+	'n_dining_meal_per_day'           : 'float32',
+}
+
+# Columns of energy sections and their types
+DICT_ES_DTYPE = {
+	'Section_Type' : 'category',
+	'Section_ID'   : 'category',
+	'Area'         : 'float64',
+	'AC_Type'      : 'category',
+}
+
+# Columns of facilities (arguments of FacilityElevator/FacilityEscalator) and their types
+DICT_ELEVATOR_DTYPE = {
+	'elevator_bottom_floor'    : 'float32',
+	'elevator_top_floor'       : 'float32',
+	'elevator_floor_offset'    : 'float32',
+	'coef_eff'                 : 'float64',
+	'coef_people_per_elevator' : 'float32',
+	'coef_load_per_elevator'   : 'float32',
+	'coef_speed'               : 'float64',
+}
+
+DICT_ESCALATOR_DTYPE = {
+	'escalator_bottom_floor'    : 'float32',
+	'escalator_top_floor'       : 'float32',
+	'escalator_floor_offset'    : 'float32',
+	'escalator_elevate_height'  : 'float64',
+	'escalator_width'           : 'float64',
+	'coef_eff'                  : 'float64',
+	'coef_people_per_escalator' : 'float32',
+	'coef_load_per_escalator'   : 'float32',
+	'coef_speed'                : 'float64',
+}
+
+DICT_FACILITY = {
+	'elevator'  : (DICT_ELEVATOR_DTYPE, 'elevator_es'),
+	'escalator' : (DICT_ESCALATOR_DTYPE, 'escalator_es'),
+}
+
+class BuildingTable():
+
+	"""
+	This class is used to hold many buildings as columns with a small fixed cost per building.
+	"""
+
+	def __init__(self, df_building, df_es, df_elevator, df_escalator, df_facility_es):
+
+		"""
+		This method is used to initialize a table from its compact columns. Use from_portfolio() or from_buildings().
+		===========================================================================================
+
+		Arguments:
+
+			df_building (pandas.DataFrame): One row per building, indexed by building ID, with the columns of DICT_BUILDING_DTYPE
+
+			df_es (pandas.DataFrame): Energy sections with building_index (position of the building) and the columns of DICT_ES_DTYPE
+
+			df_elevator (pandas.DataFrame): Elevators with building_index and the columns of DICT_ELEVATOR_DTYPE
+
+			df_escalator (pandas.DataFrame): Escalators with building_index and the columns of DICT_ESCALATOR_DTYPE
+
+			df_facility_es (pandas.DataFrame): Sections served by facilities with facility, unit (position in its table) and Section_ID
+		"""
+
+		self.df_building    = df_building
+		self.df_es          = df_es
+		self.df_elevator    = df_elevator
+		self.df_escalator   = df_escalator
+		self.df_facility_es = df_facility_es
+
+		# Rows of each building in the tables sorted by building_index
+		self._dict_bound = {name: _get_bound(df['building_index'].to_numpy(), len(df_building)) for name, df in (('es', df_es), ('elevator', df_elevator), ('escalator', df_escalator))}
+		self._dict_bound['facility_es'] = {}
+
+		for facility in DICT_FACILITY:
+
+			# Rows of a facility are contiguous and sorted by unit
+			position = np.flatnonzero((df_facility_es['facility']==facility).to_numpy())
+			self._dict_bound['facility_es'][facility] = _get_bound(df_facility_es['unit'].to_numpy()[position], len(getattr(self, 'df_{}'.format(facility)))) + (position[0] if (len(position) > 0) else 0)
+
+	def __len__(self):
+
+		return len(self.df_building)
+
+	@classmethod
+	def from_portfolio(cls, df_building, df_es, df_elevator=None, df_escalator=None, column_id='building_id'):
+
+		"""
+		This method is used to create a table from the tables of estimate_portfolio().
+		===========================================================================================
+
+		Arguments:
+
+			df_building (pandas.DataFrame): One row per building with column_id and the arguments of Building
+
+			df_es (pandas.DataFrame): Energy sections with column_id, Section_Type, Section_ID, Area and AC_Type
+
+			df_elevator (pandas.DataFrame): One row per elevator with column_id and the arguments of FacilityElevator
+
+			df_escalator (pandas.DataFrame): One row per escalator with column_id and the arguments of FacilityEscalator
+
+			column_id (str): Column of the building ID. Default is building_id
+
+		Output:
+
+			table (BuildingTable): Buildings with compact columns
+		"""
+
+		# Error handling
+		# Building ID is not unique
+		if (df_building[column_id].duplicated().any()): raise ValueError('{} of df_building is not unique.'.format(column_id))
+
+		index_building = pd.Index(df_building[column_id], name='building_id')
+
+		df_building_compact = _to_compact(df_building, DICT_BUILDING_DTYPE)
+		df_building_compact.index = index_building
+
+		df_es_compact, _ = _to_compact_child(df_es, DICT_ES_DTYPE, index_building, column_id, 'Energy sections')
+
+		dict_facility, list_facility_es = {'elevator': df_elevator, 'escalator': df_escalator}, []
+		for facility, (dict_dtype, column_es) in DICT_FACILITY.items():
+
+			df_facility = dict_facility[facility]
+			if (df_facility is None): df_facility = pd.DataFrame({column_id: pd.Series([], dtype=object)})
+
+			dict_facility[facility], order = _to_compact_child(df_facility, dict_dtype, index_building, column_id, '{}s'.format(facility.capitalize()))
+
+			# One row per (unit, section) in the order of the units
+			list_es = [list(i) for i in df_facility[column_es].iloc[order]] if (column_es in df_facility) else [[] for _ in range(len(df_facility))]
+			list_facility_es.append(pd.DataFrame({
+				'facility'   : facility,
+				'unit'       : np.repeat(np.arange(len(list_es), dtype=np.int32), [len(i) for i in list_es]),
+				'Section_ID' : [i for es in list_es for i in es],
+			}))
+
+		df_facility_es = pd.concat(list_facility_es, ignore_index=True)
+		df_facility_es['facility']   = pd.Categorical(df_facility_es['facility'], categories=list(DICT_FACILITY))
+		df_facility_es['Section_ID'] = pd.Categorical(df_facility_es['Section_ID'].to_numpy(dtype=object))
+
+		return cls(df_building_compact, df_es_compact, dict_facility['elevator'], dict_facility['escalator'], df_facility_es)
+
+	@classmethod
+	def from_buildings(cls, list_building, list_building_id=None):
+
+		"""
+		This method is used to create a table from Building objects.
+		===========================================================================================
+
+		Arguments:
+
+			list_building (list): Building objects with energysection, elevators and escalators
+
+			list_building_id (list): ID of each building. Default is the position in list_building
+
+		Output:
+
+			table (BuildingTable): Buildings with compact columns
+		"""
+
+		if (list_building_id is None): list_building_id = range(len(list_building))
+
+		list_row, list_es, list_elevator, list_escalator = [], [], [], []
+
+		for building_id, building in zip(list_building_id, list_building):
+
+			row = {'building_id': building_id}
+			row.update({column: getattr(building, DICT_ARGUMENT_ATTRIBUTE.get(column, column), None) for column in DICT_BUILDING_DTYPE if (column not in ('building_lon', 'building_lat'))})
+			if (building.building_coordinate is not None): row['building_lon'], row['building_lat'] = building.building_coordinate
+			list_row.append(row)
+
+			df_es = _read_energysection(building.energysection) if (isinstance(building.energysection, str)) else building.energysection
+			if (df_es is not None): list_es.append(df_es[[i for i in DICT_ES_DTYPE if (i in df_es)]].assign(building_id=building_id))
+
+			for list_unit, list_facility, facility in ((list_elevator, building.elevator, 'elevator'), (list_escalator, building.escalator, 'escalator')):
+
+				dict_dtype, column_es = DICT_FACILITY[facility]
+				list_unit += [dict({column: getattr(i, column) for column in dict_dtype}, building_id=building_id, **{column_es: getattr(i, column_es)}) for i in list_facility]
+
+		df_es = pd.concat(list_es, ignore_index=True) if (len(list_es) > 0) else pd.DataFrame({'building_id': pd.Series([], dtype=object)})
+
+		return cls.from_portfolio(
+			pd.DataFrame(list_row),
+			df_es,
+			pd.DataFrame(list_elevator) if (len(list_elevator) > 0) else None,
+			pd.DataFrame(list_escalator) if (len(list_escalator) > 0) else None,
+		)
+
+	def to_portfolio(self):
+
+		"""
+		This method is used to convert the table into the tables of estimate_portfolio().
+		===========================================================================================
+
+		Arguments:
+
+			None
+
+		Output:
+
+			df_building, df_es, df_elevator, df_escalator (pandas.DataFrame): Portfolio tables keyed by building_id
+		"""
+
+		building_id = self.df_building.index.to_numpy()
+
+		df_building = _to_wide(self.df_building).reset_index()
+		df_es       = _to_wide(self.df_es.drop(columns='building_index'))
+		df_es.insert(0, 'building_id', building_id[self.df_es['building_index'].to_numpy()])
+
+		list_facility = []
+		for facility, (_, column_es) in DICT_FACILITY.items():
+
+			df_unit = getattr(self, 'df_{}'.format(facility))
+			if (len(df_unit) == 0):
+
+				list_facility.append(None)
+
+				continue
+
+			df_facility = _to_wide(df_unit.drop(columns='building_index'))
+			df_facility.insert(0, 'building_id', building_id[df_unit['building_index'].to_numpy()])
+			df_facility[column_es] = self._get_facility_es(facility, np.arange(len(df_unit)))
+			list_facility.append(df_facility)
+
+		return (df_building, df_es, *list_facility)
+
+	def to_building(self, i):
+
+		"""
+		This method is used to create the Building object of one building of the table.
+		===========================================================================================
+
+		Arguments:
+
+			i (int): Position of the building
+
+		Output:
+
+			building (Building): Building with its energysection, elevators and escalators. Its estimation_system is the
+				current one (see use_estimation_system()) if the table has none
+		"""
+
+		row    = self.df_building.iloc[i]
+		kwargs = {column: _to_value(row[column]) for column in DICT_BUILDING_DTYPE if (column not in ('building_lon', 'building_lat'))}
+		kwargs = {k: v for k, v in kwargs.items() if (v is not None)}
+
+		# Buildings without an estimation system use the current one, as in estimate()
+		kwargs.setdefault('estimation_system', get_estimation_system())
+
+		if (not np.isnan(row['building_lon'])) and (not np.isnan(row['building_lat'])): kwargs['building_coordinate'] = (float(row['building_lon']), float(row['building_lat']))
+
+		start, end = self._dict_bound['es'][i]
+		kwargs['energysection'] = _to_wide(self.df_es.iloc[start:end].drop(columns='building_index')).reset_index(drop=True)
+
+		building = Building(**kwargs)
+
+		for facility, (dict_dtype, column_es) in DICT_FACILITY.items():
+
+			df_unit    = getattr(self, 'df_{}'.format(facility))
+			start, end = self._dict_bound[facility][i]
+
+			for unit, list_es in zip(range(start, end), self._get_facility_es(facility, np.arange(start, end))):
+
+				kwargs_unit = {column: _to_value(df_unit[column].iat[unit]) for column in dict_dtype}
+				kwargs_unit = {k: v for k, v in kwargs_unit.items() if (v is not None)}
+				getattr(building, 'create_{}'.format(facility))(**kwargs_unit, **{column_es: list_es})
+
+		return building
+
+	def to_buildings(self):
+
+		"""
+		This method is used to create the Building objects of the table one at a time.
+		===========================================================================================
+
+		Arguments:
+
+			None
+
+		Output:
+
+			building (generator): Building objects in table order
+		"""
+
+		for i in range(len(self)): yield self.to_building(i)
+
+	def estimate(self):
+
+		"""
+		This method is used to estimate every building of the table with estimate_portfolio().
+		===========================================================================================
+
+		Arguments:
+
+			None
+
+		Output:
+
+			df_result (pandas.DataFrame): One row per building, as in estimate_portfolio()
+		"""
+
+		return estimate_portfolio(*self.to_portfolio())
+
+	def memory_usage(self):
+
+		"""
+		This method is used to get the memory held by the columns of the table.
+		===========================================================================================
+
+		Arguments:
+
+			None
+
+		Output:
+
+			n_byte (int): Number of bytes
+		"""
+
+		return int(sum(df.memory_usage(index=True, deep=True).sum() for df in (self.df_building, self.df_es, self.df_elevator, self.df_escalator, self.df_facility_es)))
+
+	def _get_facility_es(self, facility, array_unit):
+
+		# Sections served by each unit as lists
+		bound      = self._dict_bound['facility_es'][facility]
+		section_id = self.df_facility_es['Section_ID'].to_numpy(dtype=object)
+
+		return [list(section_id[slice(*bound[unit])]) for unit in array_unit]
+
+def _to_compact(df, dict_dtype):
+
+	# Columns in their compact types. Missing columns are all NaN
+	dict_column = {}
+
+	for column, dtype in dict_dtype.items():
+
+		if (dtype == 'category'): dict_column[column] = pd.Categorical(df[column].to_numpy(dtype=object) if (column in df) else np.full(len(df), None, dtype=object))
+		else: dict_column[column] = pd.to_numeric(df[column]).to_numpy(dtype=dtype, na_value=np.nan) if (column in df) else np.full(len(df), np.nan, dtype=dtype)
+
+	return pd.DataFrame(dict_column, index=pd.RangeIndex(len(df)))
+
+def _to_compact_child(df, dict_dtype, index_building, column_id, name):
+
+	building_index = index_building.get_indexer(df[column_id])
+
+	# Error handling
+	# Rows refer to an unknown building
+	if (building_index < 0).any(): raise ValueError('{} refer to unknown building {}.'.format(name, df[column_id].values[building_index < 0][0]))
+
+	# Rows of one building are contiguous, in their original order
+	order = np.argsort(building_index, kind='stable')
+
+	df_compact = _to_compact(df.iloc[order], dict_dtype)
+	df_compact.insert(0, 'building_index', building_index[order].astype(np.int32))
+
+	return df_compact, order
+
+def _to_wide(df):
+
+	# Categories back to objects and float32 back to float64, as the original tables
+	return df.astype({column: (object if (isinstance(dtype, pd.CategoricalDtype)) else 'float64') for column, dtype in df.dtypes.items() if (isinstance(dtype, pd.CategoricalDtype)) or (dtype == np.float32)})
+
+def _to_value(value):
+
+	if (value is None) or ((isinstance(value, float)) and (np.isnan(value))): return None
+	if (isinstance(value, np.floating)): return None if (np.isnan(value)) else float(value)
+
+	return value
+
+def _get_bound(array_index, n):
+
+	# (start, end) of the rows of each of n keys in an array sorted by key
+	start = np.searchsorted(array_index, np.arange(n), side='left')
+	end   = np.searchsorted(array_index, np.arange(n), side='right')
+
+	return np.stack([start, end], axis=1)
@@ -0,0 +1,319 @@
+"""
+Array-backed fleet of the elevators and escalators of one or many buildings.
+
+Every unit is matched against the coefficient tables at once: the story range (elevators) or the
+elevate height range (escalators) selects the candidate rows, and the sorting key of
+FacilityElevator/FacilityEscalator picks one of them. Ties go to the first row of the table.
+
+Abbreviation:
+ - coef: Coefficient
+ - eff: Efficiency
+ - es: Energy Section
+ - n: Number
+ - ec: Energy Consumption
+"""
+
+import numpy as np
+import pandas as pd
+import itertools
+
+from .reference_data import get_registry
+
+# Number of units matched at once, bounding the (unit, table row) arrays
+SIZE_BLOCK = 65536
+
+class VerticalTransportFleet():
+
+	"""
+	This class is used to hold the elevators and escalators of one or many buildings as arrays.
+	"""
+
+	def __init__(self, df_elevator=None, df_escalator=None, building_type=None, column_id='building_id'):
+
+		"""
+		This method is used to initialize a fleet and match every unit with the coefficient tables.
+		===========================================================================================
+
+		Arguments:
+
+			df_elevator (pandas.DataFrame): One row per elevator with column_id and the arguments of FacilityElevator
+
+			df_escalator (pandas.DataFrame): One row per escalator with column_id and the arguments of FacilityEscalator
+
+			building_type (pandas.Series or str): Building type by building ID, or of every unit.
+				Default is the building_type column of the tables
+
+			column_id (str): Column of the building ID. Default is building_id
+		"""
+
+		list_part = []
+
+		if (df_elevator is not None) and (not df_elevator.empty):
+
+			df_elevator = _fill_default(df_elevator, {'elevator_floor_offset': 0, 'coef_eff': 1.0})
+
+			list_part.append({
+				'building_id'    : df_elevator[column_id].to_numpy(),
+				'facility'       : np.full(df_elevator.shape[0], 'elevator', dtype=object),
+				'coef_usage_r'   : _get_coef_usage_r(_get_building_type(df_elevator, building_type, column_id), 'Or'),
+				'coef_facility'  : match_facility_ec_elevator(
+					_get_float(df_elevator, 'elevator_top_floor') - _get_float(df_elevator, 'elevator_bottom_floor') + _get_float(df_elevator, 'elevator_floor_offset'),
+					_get_float(df_elevator, 'coef_people_per_elevator'),
+					_get_float(df_elevator, 'coef_load_per_elevator'),
+					_get_float(df_elevator, 'coef_speed'),
+				),
+				'coef_eff'       : _get_float(df_elevator, 'coef_eff'),
+				'coef_usage_h'   : _get_coef_usage_h(df_elevator['elevator_es']),
+			})
+
+		if (df_escalator is not None) and (not df_escalator.empty):
+
+			df_escalator = _fill_default(df_escalator, {'coef_eff': 1.0})
+
+			list_part.append({
+				'building_id'    : df_escalator[column_id].to_numpy(),
+				'facility'       : np.full(df_escalator.shape[0], 'escalator', dtype=object),
+				'coef_usage_r'   : _get_coef_usage_r(_get_building_type(df_escalator, building_type, column_id), 'Osr'),
+				'coef_facility'  : match_facility_power_escalator(
+					_get_float(df_escalator, 'escalator_elevate_height'),
+					_get_float(df_escalator, 'escalator_width'),
+				),
+				'coef_eff'       : _get_float(df_escalator, 'coef_eff'),
+				'coef_usage_h'   : _get_coef_usage_h(df_escalator['escalator_es']),
+			})
+
+		self._set(list_part)
+
+	@classmethod
+	def from_facility(cls, list_elevator=(), list_escalator=(), building_id=None):
+
+		"""
+		This method is used to create a fleet from FacilityElevator and FacilityEscalator objects.
+		===========================================================================================
+
+		Arguments:
+
+			list_elevator (list): FacilityElevator objects
+
+			list_escalator (list): FacilityEscalator objects
+
+			building_id: ID of the building of every unit
+
+		Output:
+
+			fleet (VerticalTransportFleet): Fleet with the coefficients of the objects
+		"""
+
+		list_part = []
+
+		for list_facility, facility, attribute in ((list_elevator, 'elevator', 'coef_facility_ec'), (list_escalator, 'escalator', 'coef_facility_power')):
+
+			if (len(list_facility) == 0): continue
+
+			list_part.append({
+				'building_id'    : np.full(len(list_facility), building_id, dtype=object),
+				'facility'       : np.full(len(list_facility), facility, dtype=object),
+				'coef_usage_r'   : np.array([i.coef_usage_r for i in list_facility], dtype=float),
+				'coef_facility'  : np.array([getattr(i, attribute) for i in list_facility], dtype=float),
+				'coef_eff'       : np.array([i.coef_eff for i in list_facility], dtype=float),
+				'coef_usage_h'   : np.array([i.coef_usage_h for i in list_facility], dtype=float),
+			})
+
+		fleet = cls.__new__(cls)
+		fleet._set(list_part)
+
+		return fleet
+
+	def calc_e_t_unit(self):
+
+		"""
+		This method is used to calculate the energy consumption of every unit.
+		===========================================================================================
+
+		Arguments:
+
+			None
+
+		Output:
+
+			et (numpy.ndarray): Energy consumption of every unit, elevators first
+		"""
+
+		return self.coef_usage_r * self.coef_facility * self.coef_eff * self.coef_usage_h
+
+	def calc_e_t(self):
+
+		"""
+		This method is used to calculate the energy consumption of elevators and escalators by building.
+		===========================================================================================
+
+		Arguments:
+
+			None
+
+		Output:
+
+			et (pandas.Series): Energy consumption of elevators and escalators, by building ID.
+				NaN units are ignored, as np.nansum in Building.estimate()
+		"""
+
+		return pd.Series(self.calc_e_t_unit(), index=self.building_id).groupby(level=0).sum()
+
+	def _set(self, list_part):
+
+		for attribute, dtype in (('building_id', object), ('facility', object), ('coef_usage_r', float), ('coef_facility', float), ('coef_eff', float), ('coef_usage_h', float)):
+
+			setattr(self, attribute, np.concatenate([i[attribute] for i in list_part]) if (len(list_part) > 0) else np.empty(0, dtype=dtype))
+
+		self.n_unit = self.building_id.shape[0]
+
+def match_facility_ec_elevator(n_stories_total, n_people, n_load, speed):
+
+	"""
+	This method is used to get the coefficient of EC of many elevators at once.
+	===========================================================================================
+
+	Arguments:
+
+		n_stories_total (array-like): Number of stories served by each elevator
+
+		n_people (array-like): Number of people per elevator
+
+		n_load (array-like): Load per elevator
+
+		speed (array-like): Speed of each elevator
+
+	Output:
+
+		coef_ec_elevator (numpy.ndarray): Coefficient of EC (FLE) of each elevator
+	"""
+
+	df_coef = get_registry().df_facility_ec_elevator
+
+	n_stories_total, n_people, n_load, speed = (np.atleast_1d(np.asarray(i, dtype=float)) for i in (n_stories_total, n_people, n_load, speed))
+
+	stories_min, stories_max, coef_people, coef_load, coef_speed, coef_fle = \
+		(df_coef[i].to_numpy(dtype=float) for i in ('Stories_min', 'Stories_max', 'n_People', 'n_Load', 'Speed', 'FLE'))
+
+	coef_ec_elevator = np.empty(n_stories_total.shape[0])
+
+	for start in range(0, n_stories_total.shape[0], SIZE_BLOCK):
+
+		block = slice(start, start + SIZE_BLOCK)
+
+		# Rows whose story range covers each elevator
+		mask = (stories_min <= n_stories_total[block, None]) & (stories_max >= n_stories_total[block, None])
+
+		# Sorting key of FacilityElevator
+		key = \
+			(coef_people - n_people[block, None])**2 + \
+			1e-2*(coef_load - n_load[block, None])**2 + \
+			0.5*(coef_speed - speed[block, None])**2
+
+		idx_coef = _argmin_where(key, mask)
+
+		# Error handling
+		# No row of the table matches the elevator
+		if (idx_coef < 0).any(): raise ValueError('Coefficient of EC of elevator is not defined for {} stories.'.format(n_stories_total[block][idx_coef < 0][0]))
+
+		coef_ec_elevator[block] = coef_fle[idx_coef]
+
+	return coef_ec_elevator
+
+def match_facility_power_escalator(elevate_height, width):
+
+	"""
+	This method is used to get the coefficient of power of many escalators at once.
+	===========================================================================================
+
+	Arguments:
+
+		elevate_height (array-like): Elevate height of each escalator
+
+		width (array-like): Width of each escalator
+
+	Output:
+
+		coef_power_escalator (numpy.ndarray): Coefficient of power of each escalator
+	"""
+
+	df_coef = get_registry().df_facility_power_escalator
+
+	elevate_height, width = (np.atleast_1d(np.asarray(i, dtype=float)) for i in (elevate_height, width))
+
+	elevate_min, elevate_max, coef_width, coef_power = \
+		(df_coef[i].to_numpy(dtype=float) for i in ('Elevate_min', 'Elevate_max', 'Width', 'Power'))
+
+	coef_power_escalator = np.empty(elevate_height.shape[0])
+
+	for start in range(0, elevate_height.shape[0], SIZE_BLOCK):
+
+		block = slice(start, start + SIZE_BLOCK)
+
+		# Rows whose elevate height range covers each escalator
+		mask = (elevate_min <= elevate_height[block, None]) & (elevate_max > elevate_height[block, None])
+
+		# Sorting key of FacilityEscalator
+		key = coef_width - width[block, None]
+
+		idx_coef = _argmin_where(key, mask)
+
+		# Error handling
+		# No row of the table matches the escalator
+		if (idx_coef < 0).any(): raise ValueError('Coefficient of power of escalator is not defined for elevate height {}.'.format(elevate_height[block][idx_coef < 0][0]))
+
+		coef_power_escalator[block] = coef_power[idx_coef]
+
+	return coef_power_escalator
+
+def _argmin_where(key, mask):
+
+	# First row with the minimum key among the masked rows of each unit, -1 if there is none
+	key      = np.where(mask & ~np.isnan(key), key, np.inf)
+	idx_coef = key.argmin(axis=1)
+
+	return np.where(np.isfinite(key[np.arange(key.shape[0]), idx_coef]), idx_coef, -1)
+
+def _fill_default(df_facility, dict_default):
+
+	# Missing columns and NaN cells are treated as not given
+	df_facility = df_facility.copy()
+
+	for column, default in dict_default.items():
+
+		df_facility[column] = df_facility[column].fillna(default) if (column in df_facility) else default
+
+	return df_facility
+
+def _get_float(df_facility, column):
+
+	return df_facility[column].to_numpy(dtype=float, na_value=np.nan) if (column in df_facility) else np.full(df_facility.shape[0], np.nan)
+
+def _get_building_type(df_facility, building_type, column_id):
+
+	if (building_type is None): return df_facility['building_type'].to_numpy()
+	if (isinstance(building_type, str)): return np.full(df_facility.shape[0], building_type, dtype=object)
+
+	return df_facility[column_id].map(building_type).to_numpy()
+
+def _get_coef_usage_r(building_type, facility):
+
+	# One lookup per building type
+	registry         = get_registry()
+	type_unique, idx = np.unique(building_type.astype(str), return_inverse=True)
+
+	return np.array([registry.get_coef_facility_usage(i, facility) for i in type_unique], dtype=float)[idx]
+
+def _get_coef_usage_h(list_es):
+
+	# Maximum YOH over the sections of each unit, with one lookup for all sections
+	list_es  = list(list_es)
+	n_es     = np.array([len(i) for i in list_es])
+
+	# Error handling
+	# Energy sections of a unit are not defined
+	if (n_es == 0).any(): raise ValueError('Energy sections of facility are not defined.')
+
+	coef_usage_h = get_registry().get_coef_usage_h_array(list(itertools.chain.from_iterable(list_es)))
+
+	return np.fmax.reduceat(coef_usage_h, np.concatenate([[0], np.cumsum(n_es)[:-1]]))
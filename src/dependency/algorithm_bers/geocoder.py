@@ -0,0 +1,220 @@
+"""
+Coordinate to town geocoder backed by a spatial index of the town layer.
+
+geopandas and shapely are imported when a geocoder is created, so address-only estimation never
+loads the GIS libraries.
+
+Abbreviation:
+ - lon: Longitude
+ - lat: Latitude
+"""
+
+import numpy as np
+import hashlib
+import os
+
+from . import instrumentation
+
+__path__ = os.path.dirname(__file__).replace('\\', '/').replace('C:/', '/') + '/'
+
+PATH_LAYER_TOWN = __path__ + '../data/gis_layer/layer_taiwan_town/TOWN_MOI_1120317.shp'
+
+# Files of a shapefile layer
+LIST_LAYER_EXTENSION = ['.shp', '.shx', '.dbf', '.prj', '.cpg']
+
+class TownGeocoder():
+
+	"""
+	This class is used to locate the county, town and TOWNCODE of coordinates.
+	"""
+
+	def __init__(self, df_town=None, path_layer=None):
+
+		"""
+		This method is used to initialize a town geocoder.
+		===========================================================================================
+
+		Arguments:
+
+			df_town (geopandas.GeoDataFrame): Town layer with COUNTYNAME, TOWNNAME and TOWNCODE. Read from path_layer if not given.
+
+			path_layer (str): Path of the town layer. Default is TOWN_MOI_1120317.shp
+		"""
+
+		import shapely
+
+		self.path_layer = path_layer if (path_layer is not None) else PATH_LAYER_TOWN
+
+		# Read the shapefile
+		if (df_town is None):
+
+			import geopandas as gpd
+
+			df_town = gpd.read_file(self.path_layer, encoding='utf-8')
+
+			instrumentation.count('file_reads')
+			instrumentation.count('bytes_parsed', os.path.getsize(self.path_layer))
+
+		self.df_town  = df_town.reset_index(drop=True)
+		self.county   = self.df_town['COUNTYNAME'].to_numpy(dtype=object)
+		self.town     = self.df_town['TOWNNAME'].to_numpy(dtype=object)
+		self.towncode = self.df_town['TOWNCODE'].astype(str).to_numpy(dtype=object)
+
+		# Build the spatial index. Predicate queries on the tree use prepared geometries.
+		self.geometry = np.asarray(self.df_town.geometry.values, dtype=object)
+		self.tree     = shapely.STRtree(self.geometry)
+
+	def locate_index(self, lons, lats):
+
+		"""
+		This method is used to get the row index of the town containing each coordinate.
+		===========================================================================================
+
+		Arguments:
+
+			lons (array-like): Longitudes
+
+			lats (array-like): Latitudes
+
+		Output:
+
+			idx_town (numpy.ndarray): Row index in the town layer. -1 if no town contains the coordinate.
+		"""
+
+		import shapely
+
+		lons = np.atleast_1d(np.asarray(lons, dtype=float))
+		lats = np.atleast_1d(np.asarray(lats, dtype=float))
+
+		instrumentation.count('geocoder_points', lons.shape[0])
+
+		# Query the towns containing each point
+		idx_point, idx_tree = self.tree.query(shapely.points(lons, lats), predicate='within')
+
+		# Overlapping towns match a point several times. Keep the first town in layer order.
+		idx_town = np.full(lons.shape[0], np.iinfo(np.int64).max, dtype=np.int64)
+		np.minimum.at(idx_town, idx_point, idx_tree)
+		idx_town[idx_town==np.iinfo(np.int64).max] = -1
+
+		return idx_town
+
+	def locate(self, lons, lats):
+
+		"""
+		This method is used to get the county, town and TOWNCODE of many coordinates at once.
+		===========================================================================================
+
+		Arguments:
+
+			lons (array-like): Longitudes
+
+			lats (array-like): Latitudes
+
+		Output:
+
+			county (numpy.ndarray): County of each coordinate. None if not located.
+
+			town (numpy.ndarray): Town of each coordinate. None if not located.
+
+			towncode (numpy.ndarray): TOWNCODE of each coordinate. None if not located.
+		"""
+
+		idx_town = self.locate_index(lons, lats)
+
+		return _take(self.county, idx_town), _take(self.town, idx_town), _take(self.towncode, idx_town)
+
+	def locate_point(self, lon, lat):
+
+		"""
+		This method is used to get the county, town and TOWNCODE of one coordinate.
+		===========================================================================================
+
+		Arguments:
+
+			lon (float): Longitude of the building
+
+			lat (float): Latitude of the building
+
+		Output:
+
+			county (str): County of the building
+
+			town (str): Town of the building
+
+			towncode (str): TOWNCODE of the building
+		"""
+
+		idx_town = self.locate_index(lon, lat)[0]
+
+		# Raise error if the coordinate is outside of every town
+		if (idx_town < 0): raise ValueError('No town is found for coordinate ({}, {}).'.format(lon, lat))
+
+		return self.county[idx_town], self.town[idx_town], self.towncode[idx_town]
+
+def hash_town_layer(path_layer=None):
+
+	"""
+	This method is used to fingerprint the files of the town layer by name, size and modification time.
+	===========================================================================================
+
+	Arguments:
+
+		path_layer (str): Path of the town layer. Default is TOWN_MOI_1120317.shp
+
+	Output:
+
+		hash (str): SHA-256 of the fingerprints. The same value for a missing layer
+	"""
+
+	path_layer = path_layer if (path_layer is not None) else PATH_LAYER_TOWN
+	hasher     = hashlib.sha256()
+
+	for extension in LIST_LAYER_EXTENSION:
+
+		path_file = os.path.splitext(path_layer)[0] + extension
+		if (not os.path.exists(path_file)): continue
+
+		stat = os.stat(path_file)
+		hasher.update('{}:{}:{}'.format(extension, stat.st_size, stat.st_mtime_ns).encode())
+
+	return hasher.hexdigest()
+
+def _take(values, idx):
+
+	out = values[np.where(idx >= 0, idx, 0)] if (values.shape[0] > 0) else np.empty(idx.shape[0], dtype=object)
+	out[idx < 0] = None
+
+	return out
+
+_geocoder = None
+
+def get_geocoder():
+
+	"""
+	This method is used to get the process-wide town geocoder. The town layer is loaded on first use.
+	===========================================================================================
+
+	Arguments:
+
+		None
+
+	Output:
+
+		geocoder (TownGeocoder): Shared town geocoder
+	"""
+
+	global _geocoder
+
+	instrumentation.count('geocoder_miss' if (_geocoder is None) else 'geocoder_hit')
+
+	if (_geocoder is None):
+
+		import shapely
+
+		from .reference_cache import load_reference_data
+
+		# Use the compiled town layer when available
+		df_town   = load_reference_data()['df_town']
+		_geocoder = TownGeocoder() if (df_town is None) else TownGeocoder(df_town.assign(geometry=shapely.from_wkb(df_town['wkb'].values)))
+
+	return _geocoder
@@ -0,0 +1,387 @@
+"""
+Persistent on-disk cache of geocoded coordinates.
+
+Coordinates are rounded to a fixed number of decimals (5 decimals is about 1 m) and the rounded
+coordinate is located once; its county, town and TOWNCODE are kept in a local SQLite file. Repeat
+runs over the same buildings read the cache and never load the town layer. The cache is cleared
+when the town layer files change, and the least recently used entries are evicted beyond
+max_entries. Coordinates outside every town are cached too.
+
+	enable_geocode_cache('geocode.sqlite')
+	county, town, towncode = get_locator().locate(lons, lats)
+
+The cache is per process and may be shared by its threads. run_buildings() and EstimationService
+enable it in their workers when it is enabled in the parent process.
+
+Abbreviation:
+ - lon: Longitude
+ - lat: Latitude
+"""
+
+import numpy as np
+import threading
+import time
+import os
+
+from .geocoder import PATH_LAYER_TOWN, hash_town_layer
+from .geocoder_grid import get_town_locator
+from . import instrumentation
+
+__path__ = os.path.dirname(__file__).replace('\\', '/').replace('C:/', '/') + '/'
+
+PATH_CACHE_GEOCODE = __path__ + '../data/_compiled/geocode_cache.sqlite'
+
+# Number of coordinates per SQL statement batch
+SIZE_BATCH = 50000
+
+class GeocodeCache():
+
+	"""
+	This class is used to locate coordinates through a persistent SQLite cache.
+	"""
+
+	def __init__(self, path_cache=None, precision=5, max_entries=1000000, path_layer=None, geocoder=None):
+
+		"""
+		This method is used to open (or create) a geocode cache.
+		===========================================================================================
+
+		Arguments:
+
+			path_cache (str): Path of the SQLite file. Default is dependency/data/_compiled/geocode_cache.sqlite
+
+			precision (int): Number of decimals the coordinates are rounded to. Default is 5
+
+			max_entries (int): Maximum number of cached coordinates. Default is 1000000
+
+			path_layer (str): Path of the town layer, whose files invalidate the cache. Default is TOWN_MOI_1120317.shp
+
+			geocoder (TownGeocoder or TownGrid): Locator of coordinates not in the cache. Default is the shared town grid or geocoder, loaded on first miss
+		"""
+
+		# Error handling
+		# Cache size is not positive
+		if (max_entries < 1): raise ValueError('max_entries must be positive.')
+
+		self.path_cache  = path_cache if (path_cache is not None) else PATH_CACHE_GEOCODE
+		self.precision   = int(precision)
+		self.max_entries = int(max_entries)
+		self.path_layer  = path_layer if (path_layer is not None) else PATH_LAYER_TOWN
+		self.geocoder    = geocoder
+
+		if (os.path.dirname(self.path_cache) != ''): os.makedirs(os.path.dirname(self.path_cache), exist_ok=True)
+
+		# Imported on first use, as geopandas in the geocoder, so that locating by address does not load it
+		import sqlite3
+
+		# Several worker processes may share the file, and the threads of a process share the connection one at a time
+		self.lock       = threading.RLock()
+		self.connection = sqlite3.connect(self.path_cache, timeout=60, isolation_level=None, check_same_thread=False)
+		self.connection.execute('PRAGMA journal_mode=WAL')
+		self.connection.execute('PRAGMA synchronous=NORMAL')
+		self.connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+		self.connection.execute('CREATE TABLE IF NOT EXISTS geocode (lon INTEGER, lat INTEGER, county TEXT, town TEXT, towncode TEXT, last_used INTEGER, PRIMARY KEY (lon, lat)) WITHOUT ROWID')
+		self.connection.execute('CREATE INDEX IF NOT EXISTS geocode_last_used ON geocode (last_used)')
+		self.connection.execute('CREATE TEMP TABLE batch_key (i INTEGER PRIMARY KEY, lon INTEGER, lat INTEGER)')
+
+		# Entries located with another town layer or precision are dropped
+		key_layer = '{}:{}'.format(hash_town_layer(self.path_layer), self.precision)
+
+		with self.connection:
+
+			self.connection.execute('BEGIN IMMEDIATE')
+
+			row = self.connection.execute("SELECT value FROM meta WHERE key='layer'").fetchone()
+
+			if (row is None) or (row[0] != key_layer):
+
+				self.connection.execute('DELETE FROM geocode')
+				self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('layer', ?)", (key_layer,))
+
+	@property
+	def config(self):
+
+		"""
+		Arguments of the cache, to open it again in another process.
+		"""
+
+		return {'path_cache': self.path_cache, 'precision': self.precision, 'max_entries': self.max_entries, 'path_layer': self.path_layer}
+
+	def __len__(self):
+
+		with self.lock:
+
+			return self.connection.execute('SELECT COUNT(*) FROM geocode').fetchone()[0]
+
+	def lookup(self, lons, lats):
+
+		"""
+		This method is used to read the cached county, town and TOWNCODE of many coordinates at once.
+		===========================================================================================
+
+		Arguments:
+
+			lons (array-like): Longitudes
+
+			lats (array-like): Latitudes
+
+		Output:
+
+			county, town, towncode (numpy.ndarray): Cached values. None if not cached or not located.
+
+			mask_hit (numpy.ndarray): Whether each coordinate is cached
+		"""
+
+		key_lon, key_lat = self._get_key(lons, lats)
+
+		county, town, towncode = (np.full(key_lon.shape[0], None, dtype=object) for _ in range(3))
+		mask_hit = np.zeros(key_lon.shape[0], dtype=bool)
+
+		with self.lock, self.connection:
+
+			self.connection.execute('BEGIN')
+
+			for start in range(0, key_lon.shape[0], SIZE_BATCH):
+
+				# Join the batch with the cache in SQLite
+				self.connection.execute('DELETE FROM batch_key')
+				self.connection.executemany('INSERT INTO batch_key VALUES (?, ?, ?)', zip(range(start, start + SIZE_BATCH), key_lon[start:start + SIZE_BATCH].tolist(), key_lat[start:start + SIZE_BATCH].tolist()))
+
+				list_row = self.connection.execute('SELECT q.i, g.county, g.town, g.towncode FROM batch_key q JOIN geocode g ON (g.lon = q.lon) AND (g.lat = q.lat)').fetchall()
+				if (len(list_row) == 0): continue
+
+				idx, value_county, value_town, value_towncode = zip(*list_row)
+				idx = np.array(idx, dtype=np.int64)
+				county[idx], town[idx], towncode[idx], mask_hit[idx] = value_county, value_town, value_towncode, True
+
+				self.connection.execute('UPDATE geocode SET last_used = ? WHERE (lon, lat) IN (SELECT lon, lat FROM batch_key)', (time.time_ns(),))
+
+		instrumentation.count('geocode_cache_hit', int(mask_hit.sum()))
+		instrumentation.count('geocode_cache_miss', int((~mask_hit).sum()))
+
+		return county, town, towncode, mask_hit
+
+	def insert(self, lons, lats, county, town, towncode):
+
+		"""
+		This method is used to add the county, town and TOWNCODE of many coordinates to the cache.
+		===========================================================================================
+
+		Arguments:
+
+			lons (array-like): Longitudes
+
+			lats (array-like): Latitudes
+
+			county, town, towncode (array-like): Values of each coordinate. None if not located.
+
+		Output:
+
+			None
+		"""
+
+		key_lon, key_lat = self._get_key(lons, lats)
+		last_used        = time.time_ns()
+
+		with self.lock, self.connection:
+
+			self.connection.execute('BEGIN IMMEDIATE')
+			self.connection.executemany('INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?, ?)', zip(
+				key_lon.tolist(),
+				key_lat.tolist(),
+				_to_text(county),
+				_to_text(town),
+				_to_text(towncode),
+				[last_used] * key_lon.shape[0],
+			))
+
+			# Evict the least recently used entries
+			n_evict = self.connection.execute('SELECT COUNT(*) FROM geocode').fetchone()[0] - self.max_entries
+			if (n_evict > 0): self.connection.execute('DELETE FROM geocode WHERE (lon, lat) IN (SELECT lon, lat FROM geocode ORDER BY last_used LIMIT ?)', (n_evict,))
+
+		return
+
+	def locate(self, lons, lats):
+
+		"""
+		This method is used to get the county, town and TOWNCODE of many coordinates, locating only those not cached.
+		===========================================================================================
+
+		Arguments:
+
+			lons (array-like): Longitudes
+
+			lats (array-like): Latitudes
+
+		Output:
+
+			county (numpy.ndarray): County of each coordinate. None if not located.
+
+			town (numpy.ndarray): Town of each coordinate. None if not located.
+
+			towncode (numpy.ndarray): TOWNCODE of each coordinate. None if not located.
+		"""
+
+		# Threads locate one at a time, so that a coordinate is located once
+		with self.lock:
+
+			county, town, towncode, mask_hit = self.lookup(lons, lats)
+
+			if (not mask_hit.all()):
+
+				# Locate each distinct rounded coordinate once
+				key_lon, key_lat = self._get_key(lons, lats)
+				key_miss, idx    = np.unique(np.stack([key_lon[~mask_hit], key_lat[~mask_hit]], axis=1), axis=0, return_inverse=True)
+				lon_miss, lat_miss = key_miss[:, 0] / 10**self.precision, key_miss[:, 1] / 10**self.precision
+
+				if (self.geocoder is None): self.geocoder = get_town_locator()
+
+				county_miss, town_miss, towncode_miss = self.geocoder.locate(lon_miss, lat_miss)
+				self.insert(lon_miss, lat_miss, county_miss, town_miss, towncode_miss)
+
+				idx = idx.ravel()
+				county[~mask_hit], town[~mask_hit], towncode[~mask_hit] = county_miss[idx], town_miss[idx], towncode_miss[idx]
+
+		return county, town, towncode
+
+	def locate_point(self, lon, lat):
+
+		"""
+		This method is used to get the county, town and TOWNCODE of one coordinate.
+		===========================================================================================
+
+		Arguments:
+
+			lon (float): Longitude of the building
+
+			lat (float): Latitude of the building
+
+		Output:
+
+			county (str): County of the building
+
+			town (str): Town of the building
+
+			towncode (str): TOWNCODE of the building
+		"""
+
+		county, town, towncode = self.locate(lon, lat)
+
+		# Raise error if the coordinate is outside of every town
+		if (county[0] is None): raise ValueError('No town is found for coordinate ({}, {}).'.format(lon, lat))
+
+		return county[0], town[0], towncode[0]
+
+	def clear(self):
+
+		"""
+		This method is used to remove every cached coordinate.
+		===========================================================================================
+
+		Arguments:
+
+			None
+
+		Output:
+
+			None
+		"""
+
+		with self.lock, self.connection:
+
+			self.connection.execute('DELETE FROM geocode')
+
+		return
+
+	def close(self):
+
+		with self.lock:
+
+			self.connection.close()
+
+	def _get_key(self, lons, lats):
+
+		# Rounded coordinates as integers
+		lons = np.atleast_1d(np.asarray(lons, dtype=float))
+		lats = np.atleast_1d(np.asarray(lats, dtype=float))
+
+		# Error handling
+		# Coordinates are not finite
+		if (not np.isfinite(lons).all()) or (not np.isfinite(lats).all()): raise ValueError('Coordinates must be finite.')
+
+		return np.round(lons * 10**self.precision).astype(np.int64), np.round(lats * 10**self.precision).astype(np.int64)
+
+def _to_text(values):
+
+	return [None if (i is None) else str(i) for i in values]
+
+_geocode_cache = None
+
+def enable_geocode_cache(path_cache=None, precision=5, max_entries=1000000, path_layer=None):
+
+	"""
+	This method is used to locate coordinates through a persistent cache in this process.
+	===========================================================================================
+
+	Arguments:
+
+		path_cache (str): Path of the SQLite file. Default is dependency/data/_compiled/geocode_cache.sqlite
+
+		precision (int): Number of decimals the coordinates are rounded to. Default is 5
+
+		max_entries (int): Maximum number of cached coordinates. Default is 1000000
+
+		path_layer (str): Path of the town layer, whose files invalidate the cache. Default is TOWN_MOI_1120317.shp
+
+	Output:
+
+		geocode_cache (GeocodeCache): Shared geocode cache
+	"""
+
+	global _geocode_cache
+
+	disable_geocode_cache()
+
+	_geocode_cache = GeocodeCache(path_cache, precision, max_entries, path_layer)
+
+	return _geocode_cache
+
+def disable_geocode_cache():
+
+	"""
+	This method is used to locate coordinates with the geocoder only.
+	"""
+
+	global _geocode_cache
+
+	if (_geocode_cache is not None): _geocode_cache.close()
+
+	_geocode_cache = None
+
+	return
+
+def get_geocode_cache():
+
+	"""
+	This method is used to get the shared geocode cache, or None if it is not enabled.
+	"""
+
+	return _geocode_cache
+
+def get_locator():
+
+	"""
+	This method is used to get the object locating coordinates: the geocode cache if it is enabled, else the town grid
+	if one is built, else the geocoder.
+	===========================================================================================
+
+	Arguments:
+
+		None
+
+	Output:
+
+		locator (GeocodeCache, TownGrid or TownGeocoder): Object with locate() and locate_point()
+	"""
+
+	return _geocode_cache if (_geocode_cache is not None) else get_town_locator()
@@ -0,0 +1,320 @@
+"""
+Quantized coordinate to town lookup grid with an exact polygon fallback.
+
+The grid is built offline from the town layer used by the geocoder:
+
+	python -m dependency.algorithm_bers.geocoder_grid --resolution 0.005
+
+Each cell stores the row of the town layer containing the whole cell, GRID_OUTSIDE if no town
+touches the cell, or GRID_BOUNDARY if the cell crosses a town border. Only boundary cells fall
+back to the exact point-in-polygon test of the geocoder, which is loaded on the first boundary
+cell. Once built, get_locator() uses the grid for every coordinate lookup. A grid built from
+another version of the town layer is ignored.
+
+Abbreviation:
+ - lon: Longitude
+ - lat: Latitude
+ - res: Resolution
+"""
+
+import numpy as np
+import json
+import os
+
+from .geocoder import PATH_LAYER_TOWN, get_geocoder, hash_town_layer, _take
+from . import instrumentation
+
+__path__ = os.path.dirname(__file__).replace('\\', '/').replace('C:/', '/') + '/'
+
+# Next to the compiled reference data, out of the hashed source tables
+PATH_GRID_TOWN = __path__ + '../data/_compiled/town_grid'
+
+# Cell values other than a row index of the town layer
+GRID_OUTSIDE  = -1
+GRID_BOUNDARY = -2
+
+def build_town_grid(resolution=0.005, path_grid=None, geocoder=None, path_layer=None):
+
+	"""
+	This method is used to rasterize the town layer into a grid of town indices.
+	===========================================================================================
+
+	Arguments:
+
+		resolution (float): Cell size in degrees. Default is 0.005 (about 500 m)
+
+		path_grid (str): Output path without extension. Writes <path_grid>.npy and <path_grid>.json
+
+		geocoder (TownGeocoder): Geocoder providing the town layer. Default is the shared geocoder
+
+		path_layer (str): Path of the town layer the grid is checked against. Default is TOWN_MOI_1120317.shp
+
+	Output:
+
+		path_grid (str): Output path without extension
+	"""
+
+	import shapely
+
+	path_grid = path_grid if (path_grid is not None) else PATH_GRID_TOWN
+	geocoder  = geocoder if (geocoder is not None) else get_geocoder()
+
+	if (os.path.dirname(path_grid) != ''): os.makedirs(os.path.dirname(path_grid), exist_ok=True)
+
+	# Error handling
+	# The town layer index does not fit in the cell dtype
+	if (geocoder.towncode.shape[0] >= np.iinfo(np.int16).max): raise ValueError('Too many towns for the lookup grid.')
+
+	# Grid extent
+	lon_min, lat_min, lon_max, lat_max = shapely.total_bounds(geocoder.geometry)
+	n_lon = int(np.ceil((lon_max - lon_min) / resolution))
+	n_lat = int(np.ceil((lat_max - lat_min) / resolution))
+
+	grid = np.lib.format.open_memmap(path_grid + '.npy', mode='w+', dtype=np.int16, shape=(n_lat, n_lon))
+	lons = lon_min + resolution * np.arange(n_lon)
+
+	# Rasterize one row of cells at a time to keep memory bounded
+	for i in range(n_lat):
+
+		lat   = lat_min + resolution * i
+		cells = shapely.box(lons, lat, lons + resolution, lat + resolution)
+		row   = np.full(n_lon, GRID_OUTSIDE, dtype=np.int16)
+
+		# Candidate towns touching each cell
+		idx_cell, idx_tree = geocoder.tree.query(cells, predicate='intersects')
+
+		# Cells touched by a town are boundary cells unless the town alone contains them
+		row[idx_cell] = GRID_BOUNDARY
+		mask_inside   = shapely.contains_properly(geocoder.geometry[idx_tree], cells[idx_cell])
+		n_touch       = np.bincount(idx_cell, minlength=n_lon)
+		mask_single   = mask_inside & (n_touch[idx_cell]==1)
+		row[idx_cell[mask_single]] = idx_tree[mask_single]
+
+		grid[i] = row
+
+	grid.flush()
+	del grid
+
+	# Metadata to map coordinates to cells and towns, and to check the grid against the town layer
+	with open(path_grid + '.json', 'w', encoding='utf-8') as f:
+
+		json.dump({
+			'lon_min': float(lon_min),
+			'lat_min': float(lat_min),
+			'resolution': float(resolution),
+			'hash_layer': hash_town_layer(path_layer),
+			'towncode': [str(i) for i in geocoder.towncode],
+			'county': [str(i) for i in geocoder.county],
+			'town': [str(i) for i in geocoder.town],
+		}, f, ensure_ascii=False)
+
+	# The shared grid is loaded again on next use
+	global _town_grid
+	_town_grid = None
+
+	return path_grid
+
+class TownGrid():
+
+	"""
+	This class is used to locate coordinates with a precomputed town grid.
+	"""
+
+	def __init__(self, path_grid=None, geocoder=None, path_layer=None):
+
+		"""
+		This method is used to load a town grid. The cell array is memory-mapped.
+		===========================================================================================
+
+		Arguments:
+
+			path_grid (str): Path of the grid without extension. Default is dependency/data/_compiled/town_grid
+
+			geocoder (TownGeocoder): Geocoder used for boundary cells. Default is the shared geocoder, loaded on the first boundary cell
+
+			path_layer (str): Path of the town layer the grid must be built from. Default is TOWN_MOI_1120317.shp
+		"""
+
+		self.path_grid = path_grid if (path_grid is not None) else PATH_GRID_TOWN
+		self._geocoder = geocoder
+
+		with open(self.path_grid + '.json', encoding='utf-8') as f: meta = json.load(f)
+
+		# Error handling
+		# The grid was built from another version of the town layer
+		if (meta.get('hash_layer') != hash_town_layer(path_layer)) or ('county' not in meta): raise ValueError('Town grid does not match the town layer. Please rebuild the grid.')
+
+		self.lon_min    = meta['lon_min']
+		self.lat_min    = meta['lat_min']
+		self.resolution = meta['resolution']
+		self.county     = np.array(meta['county'], dtype=object)
+		self.town       = np.array(meta['town'], dtype=object)
+		self.towncode   = np.array(meta['towncode'], dtype=object)
+		self.grid       = np.load(self.path_grid + '.npy', mmap_mode='r')
+
+	@property
+	def geocoder(self):
+
+		"""
+		Geocoder of boundary cells, checked against the towns of the grid when it is loaded.
+		"""
+
+		if (self._geocoder is None):
+
+			geocoder = get_geocoder()
+
+			# Error handling
+			# The grid was built from another version of the town layer
+			if (list(geocoder.towncode) != list(self.towncode)): raise ValueError('Town grid does not match the town layer. Please rebuild the grid.')
+
+			self._geocoder = geocoder
+
+		return self._geocoder
+
+	def locate_index(self, lons, lats):
+
+		"""
+		This method is used to get the row index of the town containing each coordinate.
+		===========================================================================================
+
+		Arguments:
+
+			lons (array-like): Longitudes
+
+			lats (array-like): Latitudes
+
+		Output:
+
+			idx_town (numpy.ndarray): Row index in the town layer. -1 if no town contains the coordinate.
+		"""
+
+		lons = np.atleast_1d(np.asarray(lons, dtype=float))
+		lats = np.atleast_1d(np.asarray(lats, dtype=float))
+
+		# Cell of each coordinate
+		i = np.floor((lats - self.lat_min) / self.resolution)
+		j = np.floor((lons - self.lon_min) / self.resolution)
+		mask_grid = (i >= 0) & (i < self.grid.shape[0]) & (j >= 0) & (j < self.grid.shape[1])
+
+		idx_town = np.full(lons.shape[0], GRID_OUTSIDE, dtype=np.int64)
+		idx_town[mask_grid] = self.grid[i[mask_grid].astype(np.int64), j[mask_grid].astype(np.int64)]
+
+		# Exact polygon test for cells on town borders
+		mask_boundary = idx_town==GRID_BOUNDARY
+		instrumentation.count('grid_hit', int(lons.shape[0] - mask_boundary.sum()))
+		instrumentation.count('grid_miss', int(mask_boundary.sum()))
+		if (mask_boundary.any()): idx_town[mask_boundary] = self.geocoder.locate_index(lons[mask_boundary], lats[mask_boundary])
+
+		return idx_town
+
+	def locate(self, lons, lats):
+
+		"""
+		This method is used to get the county, town and TOWNCODE of many coordinates at once.
+		===========================================================================================
+
+		Arguments:
+
+			lons (array-like): Longitudes
+
+			lats (array-like): Latitudes
+
+		Output:
+
+			county (numpy.ndarray): County of each coordinate. None if not located.
+
+			town (numpy.ndarray): Town of each coordinate. None if not located.
+
+			towncode (numpy.ndarray): TOWNCODE of each coordinate. None if not located.
+		"""
+
+		idx_town = self.locate_index(lons, lats)
+
+		return _take(self.county, idx_town), _take(self.town, idx_town), _take(self.towncode, idx_town)
+
+	def locate_point(self, lon, lat):
+
+		"""
+		This method is used to get the county, town and TOWNCODE of one coordinate.
+		===========================================================================================
+
+		Arguments:
+
+			lon (float): Longitude of the building
+
+			lat (float): Latitude of the building
+
+		Output:
+
+			county (str): County of the building
+
+			town (str): Town of the building
+
+			towncode (str): TOWNCODE of the building
+		"""
+
+		idx_town = self.locate_index(lon, lat)[0]
+
+		# Raise error if the coordinate is outside of every town
+		if (idx_town < 0): raise ValueError('No town is found for coordinate ({}, {}).'.format(lon, lat))
+
+		return self.county[idx_town], self.town[idx_town], self.towncode[idx_town]
+
+# Marker of a grid that is missing or stale
+_NO_GRID = object()
+
+_town_grid = None
+
+def get_town_grid():
+
+	"""
+	This method is used to get the process-wide town grid. The grid is loaded on first use.
+	===========================================================================================
+
+	Arguments:
+
+		None
+
+	Output:
+
+		town_grid (TownGrid): Shared town grid. None if no grid is built, or if it was built from another town layer
+	"""
+
+	global _town_grid
+
+	if (_town_grid is None):
+
+		try: _town_grid = TownGrid()
+		except (OSError, ValueError): _town_grid = _NO_GRID
+
+	return _town_grid if (_town_grid is not _NO_GRID) else None
+
+def get_town_locator():
+
+	"""
+	This method is used to get the object locating coordinates without the geocode cache: the town grid if one is built, else the geocoder.
+	===========================================================================================
+
+	Arguments:
+
+		None
+
+	Output:
+
+		locator (TownGrid or TownGeocoder): Object with locate() and locate_point()
+	"""
+
+	town_grid = get_town_grid()
+
+	return town_grid if (town_grid is not None) else get_geocoder()
+
+if (__name__ == '__main__'):
+
+	import argparse
+
+	parser = argparse.ArgumentParser(description='Build the coordinate to town lookup grid.')
+	parser.add_argument('--resolution', type=float, default=0.005, help='Cell size in degrees')
+	parser.add_argument('--path_grid', type=str, default=None, help='Output path without extension')
+	args = parser.parse_args()
+
+	print(build_town_grid(resolution=args.resolution, path_grid=args.path_grid))
@@ -0,0 +1,111 @@
+"""
+Streaming ingestion of long-format energy section files.
+
+A sections file has one row per energy section with a building ID column, Section_Type, Section_ID,
+Area and AC_Type. Rows of a building must be contiguous, e.g. sorted by building ID. Files are read
+in chunks, so memory is bounded by the chunk size and not by the file size.
+
+Abbreviation:
+ - es: Energy Section
+ - id: Identifier
+ - n: Number
+"""
+
+import pandas as pd
+import os
+
+from . import instrumentation
+
+def iter_energysection(path_file, column_id='building_id', chunksize=100000):
+
+	"""
+	This method is used to stream the energy sections of one building at a time.
+	===========================================================================================
+
+	Arguments:
+
+		path_file (str): Path of a CSV or Parquet sections file
+
+		column_id (str): Column of the building ID. Default is building_id
+
+		chunksize (int): Number of rows read at once. Default is 100000
+
+	Output:
+
+		building_id: ID of the building
+
+		df_es (pandas.DataFrame): Energy sections of the building, without the building ID column.
+			It can be passed to Building(energysection=...) or Building.estimate()
+	"""
+
+	for df_chunk in iter_energysection_batch(path_file, column_id, chunksize):
+
+		for building_id, df_es in df_chunk.groupby(column_id, sort=False):
+
+			yield building_id, df_es.drop(columns=column_id)
+
+def iter_energysection_batch(path_file, column_id='building_id', chunksize=100000):
+
+	"""
+	This method is used to stream the energy sections of whole buildings in chunks.
+	===========================================================================================
+
+	Arguments:
+
+		path_file (str): Path of a CSV or Parquet sections file
+
+		column_id (str): Column of the building ID. Default is building_id
+
+		chunksize (int): Number of rows read at once. Default is 100000
+
+	Output:
+
+		df_es (pandas.DataFrame): Energy sections of complete buildings with the building ID column.
+			It can be passed to estimate_portfolio()
+	"""
+
+	df_tail  = None
+	set_done = set()
+
+	for df_chunk in _read_chunks(path_file, chunksize):
+
+		# Rows of the last building may continue in the next chunk
+		if (df_tail is not None): df_chunk = pd.concat([df_tail, df_chunk], ignore_index=True)
+
+		if (df_chunk.empty): continue
+
+		# Error handling
+		# Rows of a building are not contiguous
+		ids        = df_chunk[column_id].to_numpy()
+		ids_unique = pd.unique(ids)
+		n_run      = 1 + (ids[1:] != ids[:-1]).sum()
+		if (n_run != ids_unique.shape[0]) or (pd.Series(ids_unique).isin(set_done).any()): raise ValueError('Rows of a building are not contiguous in {}.'.format(path_file))
+
+		mask    = ids==ids[-1]
+		df_tail = df_chunk[mask]
+		df_done = df_chunk[~mask]
+
+		if (df_done.empty): continue
+
+		# Buildings yielded so far, which must not appear again
+		set_done.update(ids_unique[ids_unique != ids[-1]])
+
+		yield df_done
+
+	if (df_tail is not None) and (not df_tail.empty): yield df_tail
+
+def _read_chunks(path_file, chunksize, columns=None):
+
+	instrumentation.count('file_reads')
+	instrumentation.count('bytes_parsed', os.path.getsize(path_file))
+
+	# Parquet is read by record batches (memory-mapped), other files as CSV
+	if (path_file.lower().endswith('.parquet')):
+
+		import pyarrow.parquet as pq
+
+		for batch in pq.ParquetFile(path_file, memory_map=True).iter_batches(batch_size=chunksize, columns=columns): yield batch.to_pandas()
+
+	else:
+
+		yield from pd.read_csv(path_file, chunksize=chunksize, usecols=columns)
@@ -0,0 +1,230 @@
+"""
+Streaming ingestion of smart-meter readings into annual and monthly energy consumption.
+
+A meter file has one row per reading with a building ID column, a timestamp column and the energy
+consumed during the interval (e.g. kWh per 15 minutes or per hour). Files are read in chunks, and
+only per-building and per-(building, month) aggregates are kept, so memory is bounded by the chunk
+size and the number of buildings, not by the file size. Readings of each building must be in time
+order across chunks (as exported by meters); within a chunk any order is accepted.
+
+Gaps are measured against the number of intervals expected in each month. Months covered at least
+min_coverage are filled in proportion to their missing intervals; ec_annual is NaN if a month is
+not covered enough.
+
+	df_annual, df_monthly = aggregate_meter('meter.parquet', interval='15min', year=2023)
+	df_building = join_meter(df_building, df_annual)
+
+Abbreviation:
+ - ec: Energy Consumption
+ - id: Identifier
+ - n: Number
+"""
+
+import collections
+import numpy as np
+import pandas as pd
+
+from .ingestion import _read_chunks
+
+def aggregate_meter(path_file, column_id='building_id', column_time='timestamp', column_value='ec', interval=None, year=None, min_coverage=0.9, chunksize=1000000):
+
+	"""
+	This method is used to stream a meter file and aggregate it into annual and monthly EC of each building.
+	===========================================================================================
+
+	Arguments:
+
+		path_file (str): Path of a CSV or Parquet meter file
+
+		column_id (str): Column of the building ID. Default is building_id
+
+		column_time (str): Column of the reading timestamp. Default is timestamp
+
+		column_value (str): Column of the EC of the interval. Default is ec. NaN readings count as missing
+
+		interval (str or pandas.Timedelta): Interval of the readings, e.g. 15min or 1h. Default is the most frequent step
+			between consecutive readings of a building in the file
+
+		year (int): Calendar year to aggregate. Default is every month between the first and last reading of the file
+
+		min_coverage (float): Minimum share of the expected readings of a month for it to be filled. Default is 0.9
+
+		chunksize (int): Number of rows read at once. Default is 1000000
+
+	Output:
+
+		df_annual (pandas.DataFrame): One row per building, indexed by building ID, with ec_annual (gap-filled and
+			annualized over n_month months, NaN if a month is not covered enough), ec_measured, n_month,
+			n_reading, n_expected, n_missing, coverage, max_gap_hours (longest run without readings, including
+			before the first and after the last reading within the months) and n_duplicate
+
+		df_monthly (pandas.DataFrame): One row per (building ID, month) with ec (measured), ec_filled, n_reading,
+			n_expected and coverage
+	"""
+
+	# Error handling
+	# Coverage is not a share
+	if (not 0 <= min_coverage <= 1): raise ValueError('min_coverage must be in [0, 1].')
+
+	interval_ns = pd.Timedelta(interval).value if (interval is not None) else None
+
+	list_month, list_building, dict_last = [], [], {}
+
+	# Number of each step between readings, until the interval is known
+	counter_step = collections.Counter()
+
+	for df_chunk in _read_chunks(path_file, chunksize, [column_id, column_time, column_value]):
+
+		# Readings of the chunk sorted by building and time
+		value = df_chunk[column_value].to_numpy(dtype=float, na_value=np.nan)
+		time  = pd.to_datetime(df_chunk[column_time]).to_numpy(dtype='datetime64[ns]').view(np.int64)
+		mask  = ~np.isnan(value)
+
+		if (year is not None): mask &= (time >= pd.Timestamp(year=year, month=1, day=1).value) & (time < pd.Timestamp(year=year + 1, month=1, day=1).value)
+
+		code, uniques = pd.factorize(df_chunk[column_id].to_numpy()[mask])
+		value, time   = value[mask], time[mask]
+
+		order = np.lexsort((time, code))
+		code, time, value = code[order], time[order], value[order]
+
+		if (code.shape[0] == 0): continue
+
+		# Previous reading of each row: the row before in the same building, or the last reading of an earlier chunk
+		mask_first = np.r_[True, code[1:] != code[:-1]]
+		time_prev  = np.r_[np.iinfo(np.int64).min, time[:-1]]
+		time_prev[mask_first] = [dict_last.get(uniques[i], np.iinfo(np.int64).min) for i in code[mask_first]]
+
+		mask_prev = time_prev != np.iinfo(np.int64).min
+		diff      = np.where(mask_prev, time - time_prev, 0)
+
+		# Error handling
+		# Readings of a building go back in time across chunks
+		if (diff < 0).any(): raise ValueError('Readings of building {} are not in time order in {}.'.format(uniques[code[diff < 0][0]], path_file))
+
+		# Steps between readings of a building. A chunk may have none, e.g. one reading per building
+		if (interval_ns is None):
+
+			step, n_step = np.unique(diff[mask_prev & (diff > 0)], return_counts=True)
+			counter_step.update(dict(zip(step.tolist(), n_step.tolist())))
+
+		# Repeated timestamps are read once
+		mask_duplicate = mask_prev & (diff == 0)
+
+		df_reading = pd.DataFrame({
+			'building_id' : uniques[code],
+			'month'       : time.view('datetime64[ns]').astype('datetime64[M]').astype('datetime64[ns]'),
+			'ec'          : np.where(mask_duplicate, 0.0, value),
+			'n_reading'   : (~mask_duplicate).astype(np.int64),
+			'diff'        : diff,
+			'n_duplicate' : mask_duplicate.astype(np.int64),
+			'time_first'  : time,
+			'time_last'   : time,
+		})
+
+		list_month.append(df_reading.groupby(['building_id', 'month'], sort=False)[['ec', 'n_reading']].sum())
+		list_building.append(df_reading.groupby('building_id', sort=False).agg({'diff': 'max', 'n_duplicate': 'sum', 'time_first': 'min', 'time_last': 'max'}))
+
+		# Aggregates of earlier chunks are merged so that memory does not grow with the file
+		if (len(list_month) > 1):
+
+			list_month    = [pd.concat(list_month).groupby(level=[0, 1], sort=False).sum()]
+			list_building = [pd.concat(list_building).groupby(level=0, sort=False).agg({'diff': 'max', 'n_duplicate': 'sum', 'time_first': 'min', 'time_last': 'max'})]
+
+		dict_last.update(zip(uniques[code[np.r_[mask_first[1:], True]]], time[np.r_[mask_first[1:], True]]))
+
+	# Error handling
+	# No reading is found
+	if (len(list_month) == 0): raise ValueError('No reading is found in {}.'.format(path_file))
+
+	# Most frequent step between readings of a building, the smallest one if tied
+	if (interval_ns is None):
+
+		# Error handling
+		# Interval cannot be inferred
+		if (len(counter_step) == 0): raise ValueError('Interval of the readings cannot be inferred. Please set interval.')
+
+		interval_ns = min(counter_step, key=lambda i: (-counter_step[i], i))
+
+	df_month, df_building = list_month[0], list_building[0]
+
+	# =========================================================================================
+	#
+	# Monthly EC with gaps
+	#
+	# =========================================================================================
+
+	if (year is not None): index_month = pd.date_range('{}-01-01'.format(year), periods=12, freq='MS')
+	else: index_month = pd.date_range(pd.Timestamp(df_building['time_first'].min()).to_period('M').to_timestamp(), pd.Timestamp(df_building['time_last'].max()), freq='MS')
+
+	df_monthly = df_month.reindex(pd.MultiIndex.from_product([df_building.index, index_month], names=[column_id, 'month']), fill_value=0)
+	df_monthly['n_expected'] = np.tile(index_month.days_in_month.to_numpy() * 86400e9 / interval_ns, df_building.shape[0])
+	df_monthly['coverage']   = df_monthly['n_reading'] / df_monthly['n_expected']
+
+	# Missing intervals of a covered month are filled at its measured rate
+	with np.errstate(divide='ignore', invalid='ignore'):
+
+		df_monthly['ec_filled'] = np.where(df_monthly['coverage'] >= min_coverage, df_monthly['ec'] / np.minimum(df_monthly['coverage'], 1.0), np.nan)
+
+	df_monthly = df_monthly[['ec', 'ec_filled', 'n_reading', 'n_expected', 'coverage']]
+
+	# =========================================================================================
+	#
+	# Annual EC
+	#
+	# =========================================================================================
+
+	grouped   = df_monthly.groupby(level=0, sort=False)
+	df_annual = pd.DataFrame({
+		'ec_annual'     : grouped['ec_filled'].sum(min_count=len(index_month)) * 12 / len(index_month),
+		'ec_measured'   : grouped['ec'].sum(),
+		'n_month'       : len(index_month),
+		'n_reading'     : grouped['n_reading'].sum(),
+		'n_expected'    : grouped['n_expected'].sum(),
+	})
+	df_annual['n_missing']     = np.maximum(df_annual['n_expected'] - df_annual['n_reading'], 0)
+	df_annual['coverage']      = df_annual['n_reading'] / df_annual['n_expected']
+	df_annual['max_gap_hours'] = _get_max_gap(df_building, index_month, interval_ns).reindex(df_annual.index).to_numpy() / 3600e9
+	df_annual['n_duplicate']   = df_building['n_duplicate'].reindex(df_annual.index).to_numpy()
+	df_annual.index.name       = column_id
+
+	return df_annual, df_monthly
+
+def _get_max_gap(df_building, index_month, interval_ns):
+
+	# Longest run without readings: between two readings, from the start of the months to the first reading,
+	# and from the end of the interval of the last reading to the end of the months
+	time_start = index_month[0].value
+	time_end   = (index_month[-1] + pd.offsets.MonthBegin()).value
+
+	gap_between = np.maximum(df_building['diff'].to_numpy() - interval_ns, 0)
+	gap_first   = np.maximum(df_building['time_first'].to_numpy() - time_start, 0)
+	gap_last    = np.maximum(time_end - df_building['time_last'].to_numpy() - interval_ns, 0)
+
+	return pd.Series(np.maximum.reduce([gap_between, gap_first, gap_last]), index=df_building.index)
+
+def join_meter(df_building, df_annual, column_id='building_id'):
+
+	"""
+	This method is used to set ec_annual of buildings from aggregated meter readings.
+	===========================================================================================
+
+	Arguments:
+
+		df_building (pandas.DataFrame): One row per building with column_id, as in estimate_portfolio()
+
+		df_annual (pandas.DataFrame): Annual EC of aggregate_meter(), indexed by building ID
+
+		column_id (str): Column of the building ID. Default is building_id
+
+	Output:
+
+		df_building (pandas.DataFrame): df_building with ec_annual from the meters where it is defined,
+			keeping the existing ec_annual elsewhere
+	"""
+
+	ec_meter    = df_building[column_id].map(df_annual['ec_annual'])
+	df_building = df_building.copy()
+	df_building['ec_annual'] = ec_meter.fillna(df_building['ec_annual']) if ('ec_annual' in df_building) else ec_meter
+
+	return df_building
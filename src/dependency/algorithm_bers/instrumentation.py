@@ -0,0 +1,315 @@
+"""
+Optional per-stage timing and I/O instrumentation.
+
+Instrumentation is disabled by default. When disabled, stage() returns a shared no-op context and
+count() returns at once, so the hot paths pay one global lookup.
+
+When enabled, every record goes to the process-wide aggregate and to each collector opened with
+collect() in the same thread or asyncio task, e.g. the one of the Building being estimated.
+
+Counters:
+ - file_reads: Number of files read
+ - bytes_parsed: Bytes of the files read
+ - <cache>_hit / <cache>_miss: Lookups answered from memory or not, for the registry, the coefficient
+   tables, the compiled reference data, the geocoder and the town grid
+ - geocoder_points: Number of points located with the town layer
+
+Stages of Building.estimate() and estimate_portfolio(): locate, eui_scale, adjusted_ec, bias_correction, score
+"""
+
+import collections
+import contextlib
+import contextvars
+import functools
+import time
+
+class Instrumentation():
+
+	"""
+	This class is used to collect stage wall times and counters.
+	"""
+
+	def __init__(self):
+
+		self.stage_seconds = collections.defaultdict(float)
+		self.counter       = collections.defaultdict(int)
+
+	def merge(self, other):
+
+		"""
+		This method is used to add the records of another collector or of its dict form.
+		===========================================================================================
+
+		Arguments:
+
+			other (Instrumentation or dict): Records to add
+
+		Output:
+
+			None
+		"""
+
+		if (isinstance(other, Instrumentation)): other = other.to_dict()
+
+		for k, v in other.get('stage_seconds', {}).items(): self.stage_seconds[k] += v
+		for k, v in other.get('counter', {}).items(): self.counter[k] += v
+
+		return
+
+	def to_dict(self):
+
+		"""
+		This method is used to get the records as a structured dict.
+		===========================================================================================
+
+		Arguments:
+
+			None
+
+		Output:
+
+			records (dict): stage_seconds and counter
+		"""
+
+		return {'stage_seconds': dict(self.stage_seconds), 'counter': dict(self.counter)}
+
+# Process-wide aggregate. None when disabled
+_aggregate  = None
+_null_stage = contextlib.nullcontext()
+_null_lap   = lambda name: None
+
+# Collectors open in the current thread or asyncio task
+_collectors = contextvars.ContextVar('collectors', default=())
+
+def enable_instrumentation():
+
+	"""
+	This method is used to enable instrumentation. Records are aggregated from now on.
+	"""
+
+	global _aggregate
+
+	if (_aggregate is None): _aggregate = Instrumentation()
+
+	return
+
+def disable_instrumentation():
+
+	"""
+	This method is used to disable instrumentation and drop the aggregate.
+	"""
+
+	global _aggregate
+
+	_aggregate = None
+
+	return
+
+def is_enabled():
+
+	return _aggregate is not None
+
+def get_instrumentation():
+
+	"""
+	This method is used to get the aggregated records of the process.
+	===========================================================================================
+
+	Arguments:
+
+		None
+
+	Output:
+
+		records (dict): stage_seconds and counter. None if instrumentation is disabled
+	"""
+
+	return None if (_aggregate is None) else _aggregate.to_dict()
+
+def reset_instrumentation():
+
+	"""
+	This method is used to clear the aggregated records of the process.
+	"""
+
+	if (_aggregate is not None): _aggregate.__init__()
+
+	return
+
+def merge_instrumentation(records):
+
+	"""
+	This method is used to add records, e.g. those of a worker process, to the aggregate of the process.
+	===========================================================================================
+
+	Arguments:
+
+		records (dict): stage_seconds and counter
+
+	Output:
+
+		None
+	"""
+
+	if (_aggregate is not None): _aggregate.merge(records)
+
+	return
+
+def stage(name):
+
+	"""
+	This method is used to time a stage. Use as a context manager.
+	===========================================================================================
+
+	Arguments:
+
+		name (str): Name of the stage
+
+	Output:
+
+		context: Context manager adding the wall time of the block to the stage
+	"""
+
+	if (_aggregate is None): return _null_stage
+
+	return _stage(name)
+
+def count(name, value=1):
+
+	"""
+	This method is used to add to a counter.
+	===========================================================================================
+
+	Arguments:
+
+		name (str): Name of the counter
+
+		value (int): Value to add. Default is 1
+
+	Output:
+
+		None
+	"""
+
+	if (_aggregate is None): return
+
+	_aggregate.counter[name] += value
+	for i in _collectors.get(): i.counter[name] += value
+
+	return
+
+def laps():
+
+	"""
+	This method is used to time consecutive stages without nesting blocks.
+	===========================================================================================
+
+	Arguments:
+
+		None
+
+	Output:
+
+		lap (callable): lap(name) adds the wall time since the previous lap (or since laps()) to the stage
+	"""
+
+	if (_aggregate is None): return _null_lap
+
+	return _Laps()
+
+def instrumented(func):
+
+	"""
+	This method is used to decorate a method whose records are kept on its object as instrumentation.
+	===========================================================================================
+
+	Arguments:
+
+		func (callable): Method of an object
+
+	Output:
+
+		wrapper (callable): Method adding the records of each call to self.instrumentation (None if disabled)
+	"""
+
+	@functools.wraps(func)
+	def wrapper(self, *args, **kwargs):
+
+		if (_aggregate is None):
+
+			output = func(self, *args, **kwargs)
+			self.instrumentation = None
+
+			return output
+
+		with collect() as collector:
+
+			output = func(self, *args, **kwargs)
+
+		# Records accumulate over the calls on the same object
+		if (self.__dict__.get('instrumentation') is not None): collector.merge(self.__dict__['instrumentation'])
+		self.instrumentation = collector.to_dict()
+
+		return output
+
+	return wrapper
+
+@contextlib.contextmanager
+def collect():
+
+	"""
+	This method is used to collect the records of a block separately. Use as a context manager.
+	===========================================================================================
+
+	Arguments:
+
+		None
+
+	Output:
+
+		collector (Instrumentation): Records of the block. None if instrumentation is disabled
+	"""
+
+	if (_aggregate is None):
+
+		yield None
+
+		return
+
+	collector = Instrumentation()
+	token     = _collectors.set(_collectors.get() + (collector,))
+
+	try: yield collector
+
+	finally:
+
+		# A block left in another context (e.g. a generator resumed elsewhere) drops only its own collector
+		try: _collectors.reset(token)
+		except ValueError: _collectors.set(tuple(i for i in _collectors.get() if (i is not collector)))
+
+class _Laps():
+
+	def __init__(self):
+
+		self.time_last = time.perf_counter()
+
+	def __call__(self, name):
+
+		time_now = time.perf_counter()
+		_add_stage(name, time_now - self.time_last)
+		self.time_last = time_now
+
+@contextlib.contextmanager
+def _stage(name):
+
+	time_start = time.perf_counter()
+
+	try: yield
+	finally: _add_stage(name, time.perf_counter() - time_start)
+
+def _add_stage(name, seconds):
+
+	if (_aggregate is None): return
+
+	_aggregate.stage_seconds[name] += seconds
+	for i in _collectors.get(): i.stage_seconds[name] += seconds
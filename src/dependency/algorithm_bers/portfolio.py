@@ -0,0 +1,284 @@
+"""
+Columnar estimation of many buildings in one call.
+
+Abbreviation:
+ - a: Area
+ - es: Energy Section
+ - ec: Energy Consumption
+ - cz: Climate Zone
+ - uc: Urban Coefficient
+ - id: Identifier
+"""
+
+import numpy as np
+import pandas as pd
+
+from .reference_data import get_registry, get_estimation_system, use_estimation_system
+from .building_basic import DICT_ARGUMENT_ATTRIBUTE, calc_en_section
+from .facility_fleet import VerticalTransportFleet
+from .score import score_result
+from .geocoder_cache import get_locator
+from . import instrumentation
+
+def estimate_portfolio(df_building, df_es, df_elevator=None, df_escalator=None, column_id='building_id'):
+
+	"""
+	This method is used to estimate the EUI score scale of many buildings at once.
+	===========================================================================================
+
+	Arguments:
+
+		df_building (pandas.DataFrame): One row per building with column_id, building_type, and either
+			building_address_county and building_address_town, or building_lon and building_lat.
+			Optional columns are estimation_system (default is the current one, see use_estimation_system()),
+			the usage fields of Building (n_hotelroom, coef_usage_hotelroom, ...), and ec_annual and ec_other for the score
+
+		df_es (pandas.DataFrame): Energy sections with column_id, Section_Type, Section_ID, Area and AC_Type
+
+		df_elevator (pandas.DataFrame): One row per elevator with column_id and the arguments of FacilityElevator
+
+		df_escalator (pandas.DataFrame): One row per escalator with column_id and the arguments of FacilityEscalator
+
+		column_id (str): Column of the building ID. Default is building_id
+
+	Output:
+
+		df_result (pandas.DataFrame): One row per building, indexed by building ID, with building_type, estimation_system,
+			the location, building_cz, building_uc and the est_* values of Building.estimate()
+	"""
+
+	# Error handling
+	# Building ID is not unique
+	if (df_building[column_id].duplicated().any()): raise ValueError('{} of df_building is not unique.'.format(column_id))
+
+	# Sections refer to an unknown building
+	mask_unknown = ~df_es[column_id].isin(df_building[column_id])
+	if (mask_unknown.any()): raise ValueError('Energy sections refer to unknown building {}.'.format(df_es.loc[mask_unknown, column_id].values[0]))
+
+	# Buildings are estimated system by system, each with the reference tables of its system
+	if ('estimation_system' in df_building) and (df_building['estimation_system'].nunique(dropna=False) > 1):
+
+		list_result = [
+			estimate_portfolio(df_group, _select(df_es, df_group[column_id], column_id), _select(df_elevator, df_group[column_id], column_id), _select(df_escalator, df_group[column_id], column_id), column_id)
+			for _, df_group in df_building.groupby('estimation_system', sort=False, dropna=False)
+		]
+
+		return pd.concat(list_result).reindex(pd.Index(df_building[column_id]))
+
+	estimation_system = df_building['estimation_system'].iloc[0] if ('estimation_system' in df_building) and (df_building.shape[0] > 0) else None
+
+	with use_estimation_system(estimation_system if (isinstance(estimation_system, str)) else None):
+
+		return _estimate_portfolio(df_building, df_es, df_elevator, df_escalator, column_id)
+
+def _estimate_portfolio(df_building, df_es, df_elevator, df_escalator, column_id):
+
+	df_building = df_building.set_index(column_id, drop=False)
+
+	# =========================================================================================
+	#
+	# Location, climate zone and urban coefficient
+	#
+	# =========================================================================================
+
+	with instrumentation.stage('locate'):
+
+		df_result = locate_portfolio(df_building)
+
+	df_result.insert(0, 'building_type', df_building['building_type'])
+	df_result.insert(1, 'estimation_system', get_estimation_system())
+
+	# =========================================================================================
+	#
+	# Calculate EUI score scale
+	#
+	# =========================================================================================
+
+	lap = instrumentation.laps()
+
+	df_es_comm = df_es[df_es['Section_Type']=='common']
+	df_es_exc  = df_es[df_es['Section_Type']=='exclusive']
+
+	# Attach EUI values with the climate zone of each section's building
+	df_es_comm = get_registry().join_eui_criteria(df_es_comm, df_es_comm[column_id].map(df_result['building_cz']).values)
+
+	# Error handling
+	# aeui_min, aeui_m, or aeui_max include NaN
+	mask_nan = df_es_comm[['aeui_min', 'aeui_m', 'aeui_max']].isna().any(axis=1)
+	if (mask_nan.any()): raise ValueError('aeui_min, aeui_m, or aeui_max include NaN for building {}.'.format(df_es_comm.loc[mask_nan, column_id].values[0]))
+
+	# Calculate area and area-weighted EUIs
+	df_result['est_a_es_comm'] = df_es_comm.groupby(column_id)['Area'].sum().round(2).reindex(df_result.index, fill_value=0.0)
+	df_result['est_a_es_exc']  = df_es_exc.groupby(column_id)['Area'].sum().round(2).reindex(df_result.index, fill_value=0.0)
+
+	df_weighted = df_es_comm[['aeui_min', 'aeui_m', 'aeui_max', 'leui_min', 'leui_m', 'leui_max', 'eeui_m']].multiply(df_es_comm['Area'], axis=0)
+	df_weighted = df_weighted.groupby(df_es_comm[column_id]).sum().reindex(df_result.index)
+
+	for column in df_weighted.columns: df_result['est_{}'.format(column)] = df_weighted[column] / df_result['est_a_es_comm']
+
+	# Energy consumption of exclusive sections
+	df_result['est_e_n'] = calc_e_n_portfolio(df_building, df_es_exc, column_id).reindex(df_result.index, fill_value=0.0)
+
+	lap('eui_scale')
+
+	# =========================================================================================
+	#
+	# Calculate adjusted EC
+	#
+	# =========================================================================================
+
+	df_result['est_e_t'] = calc_e_t_portfolio(df_building, df_elevator, df_escalator, column_id).reindex(df_result.index, fill_value=0.0)
+
+	lap('adjusted_ec')
+
+	# =========================================================================================
+	#
+	# Bias-correction for EC and score
+	#
+	# =========================================================================================
+
+	df_result = score_result(df_result, _get_float(df_building, 'ec_annual'), _get_float(df_building, 'ec_other'))
+
+	lap('score')
+
+	return df_result
+
+def locate_portfolio(df_building):
+
+	"""
+	This method is used to get the county, town, climate zone and urban coefficient of many buildings.
+	===========================================================================================
+
+	Arguments:
+
+		df_building (pandas.DataFrame): Buildings with building_address_county and building_address_town, or building_lon and building_lat
+
+	Output:
+
+		df_location (pandas.DataFrame): building_address_county, building_address_town, building_cz and building_uc, on the index of df_building
+	"""
+
+	registry    = get_registry()
+	df_location = pd.DataFrame(index=df_building.index)
+
+	county = df_building['building_address_county'].to_numpy(dtype=object) if ('building_address_county' in df_building) else np.full(df_building.shape[0], None, dtype=object)
+	town   = df_building['building_address_town'].to_numpy(dtype=object) if ('building_address_town' in df_building) else np.full(df_building.shape[0], None, dtype=object)
+
+	# Coordinates take precedence over the address, as in Building
+	if ('building_lon' in df_building) and ('building_lat' in df_building):
+
+		mask_coordinate = (df_building['building_lon'].notna() & df_building['building_lat'].notna()).to_numpy()
+
+		if (mask_coordinate.any()):
+
+			county = county.copy()
+			town   = town.copy()
+			county[mask_coordinate], town[mask_coordinate], _ = get_locator().locate(
+				df_building['building_lon'].to_numpy(dtype=float)[mask_coordinate],
+				df_building['building_lat'].to_numpy(dtype=float)[mask_coordinate],
+			)
+
+	df_location['building_address_county'] = county
+	df_location['building_address_town']   = town
+
+	# Climate zone and urban coefficient
+	key_town = pd.Series(list(zip(county, town)), index=df_building.index)
+	mask_town = ~key_town.isin(registry.dict_climatezone_town.keys()) | ~key_town.isin(registry.dict_uc_town.keys())
+
+	# Error handling
+	# Building location is not defined
+	if (mask_town.any()): raise ValueError('Climate zone or urban region is not defined for building {}.'.format(df_building.index[mask_town.to_numpy()][0]))
+
+	df_location['building_cz'] = key_town.map(registry.dict_climatezone_town)
+	df_location['building_uc'] = key_town.map(registry.dict_uc_town)
+
+	return df_location
+
+def calc_e_n_portfolio(df_building, df_es_exc, column_id='building_id'):
+
+	"""
+	This method is used to calculate the energy consumption of exclusive sections of many buildings.
+	===========================================================================================
+
+	Arguments:
+
+		df_building (pandas.DataFrame): Buildings indexed by building ID, with the usage fields of Building
+
+		df_es_exc (pandas.DataFrame): Exclusive sections with column_id
+
+		column_id (str): Column of the building ID. Default is building_id
+
+	Output:
+
+		en (pandas.Series): Energy consumption of exclusive sections, by building ID
+	"""
+
+	df_usage = get_usage_portfolio(df_building)
+
+	# Energy consumption of every section, summed by building ignoring undefined sections
+	en = pd.Series(calc_en_section(df_es_exc, df_usage, column_id), index=df_es_exc[column_id].values)
+
+	return en.groupby(level=0).sum()
+
+def get_usage_portfolio(df_building):
+
+	"""
+	This method is used to get the usage fields of exclusive sections of many buildings.
+	===========================================================================================
+
+	Arguments:
+
+		df_building (pandas.DataFrame): Buildings indexed by building ID, with the usage fields under the argument
+			or attribute names of Building
+
+	Output:
+
+		df_usage (pandas.DataFrame): Usage fields of the current registry under the attribute names of Building,
+			None if df_building has no such column
+	"""
+
+	dict_attribute_argument = {v: k for k, v in DICT_ARGUMENT_ATTRIBUTE.items()}
+	dict_usage              = {}
+
+	# Fields of coef_es_exclusive.csv, read from the argument name of Building first
+	for attribute in get_registry().list_es_exclusive_field:
+
+		column                = dict_attribute_argument.get(attribute, attribute)
+		column                = column if (column in df_building) else attribute
+		dict_usage[attribute] = df_building[column] if (column in df_building) else None
+
+	return pd.DataFrame(dict_usage, index=df_building.index)
+
+def calc_e_t_portfolio(df_building, df_elevator=None, df_escalator=None, column_id='building_id'):
+
+	"""
+	This method is used to calculate the energy consumption of elevators and escalators of many buildings.
+	===========================================================================================
+
+	Arguments:
+
+		df_building (pandas.DataFrame): Buildings indexed by building ID, with building_type
+
+		df_elevator (pandas.DataFrame): One row per elevator with column_id and the arguments of FacilityElevator
+
+		df_escalator (pandas.DataFrame): One row per escalator with column_id and the arguments of FacilityEscalator
+
+		column_id (str): Column of the building ID. Default is building_id
+
+	Output:
+
+		et (pandas.Series): Energy consumption of elevators and escalators, by building ID
+	"""
+
+	# Every unit of every building is matched at once
+	fleet = VerticalTransportFleet(df_elevator, df_escalator, df_building['building_type'], column_id)
+
+	return fleet.calc_e_t()
+
+def _select(df, list_id, column_id):
+
+	return df[df[column_id].isin(list_id)] if (df is not None) else None
+
+def _get_float(df_building, column):
+
+	return df_building[column].to_numpy(dtype=float, na_value=np.nan) if (column in df_building) else np.full(df_building.shape[0], np.nan)
@@ -0,0 +1,226 @@
+"""
+Compiled binary cache of the reference data under dependency/data.
+
+The CSV tables are compiled into a CoefficientRegistry, with Energy_Section_ID keys split and
+climate zone / urban coefficient encoded. The town layer is compiled to WKB geometry. Both are
+pickled into one artifact tagged with the content hash of every source file and of the modules
+defining the pickled classes. The artifact is loaded automatically and rebuilt when either hash no
+longer matches, e.g. after a table is edited or the package is upgraded. It can also be built ahead
+of time:
+
+	python -m dependency.algorithm_bers.reference_cache
+"""
+
+import pandas as pd
+import hashlib
+import pickle
+import os
+
+from .reference_data import CoefficientRegistry
+from . import instrumentation
+
+__path__ = os.path.dirname(__file__).replace('\\', '/').replace('C:/', '/') + '/'
+
+PATH_DATA  = __path__ + '../data/'
+DIR_CACHE  = '_compiled'
+FILE_CACHE = 'reference_data.pkl'
+
+# Bump when the layout of the artifact changes
+VERSION_CACHE = 3
+
+# Modules whose code is pickled or builds the artifact, relative to this directory
+LIST_MODULE_CACHE = ['reference_data.py', 'reference_cache.py']
+
+# Town layer relative to the data directory
+PATH_LAYER_TOWN = 'gis_layer/layer_taiwan_town/TOWN_MOI_1120317.shp'
+
+_dict_reference_data = {}
+_hash_code           = None
+
+def hash_reference_data(path_data=None):
+
+	"""
+	This method is used to hash the content of every source file of the reference data.
+	===========================================================================================
+
+	Arguments:
+
+		path_data (str): Directory of the reference data. Default is dependency/data
+
+	Output:
+
+		hash (str): SHA-256 of the relative paths and content of the source files
+	"""
+
+	path_data = path_data if (path_data is not None) else PATH_DATA
+	hasher    = hashlib.sha256(str(VERSION_CACHE).encode())
+
+	for root, dirs, files in os.walk(path_data):
+
+		# Skip compiled artifacts and walk in a stable order
+		dirs[:] = sorted(i for i in dirs if (i != DIR_CACHE))
+
+		for file in sorted(files):
+
+			path_file = os.path.join(root, file)
+			hasher.update(os.path.relpath(path_file, path_data).replace('\\', '/').encode())
+
+			with open(path_file, 'rb') as f:
+
+				for block in iter(lambda: f.read(1 << 20), b''): hasher.update(block)
+
+	return hasher.hexdigest()
+
+def hash_reference_code():
+
+	"""
+	This method is used to hash the source of the modules building the artifact, so that an artifact
+	pickled by another version of the package is rebuilt.
+	===========================================================================================
+
+	Arguments:
+
+		None
+
+	Output:
+
+		hash (str): SHA-256 of the source of LIST_MODULE_CACHE
+	"""
+
+	global _hash_code
+
+	# Hashed once per process
+	if (_hash_code is None):
+
+		hasher = hashlib.sha256()
+
+		for module in LIST_MODULE_CACHE:
+
+			with open(__path__ + module, 'rb') as f: hasher.update(f.read())
+
+		_hash_code = hasher.hexdigest()
+
+	return _hash_code
+
+def compile_reference_data(path_data=None, path_cache=None):
+
+	"""
+	This method is used to compile the reference data into one binary artifact.
+	===========================================================================================
+
+	Arguments:
+
+		path_data (str): Directory of the reference data. Default is dependency/data
+
+		path_cache (str): Path of the artifact. Default is <path_data>/_compiled/reference_data.pkl
+
+	Output:
+
+		reference_data (dict): version, hash, hash_code, registry (CoefficientRegistry) and df_town (pandas.DataFrame
+			with TOWNCODE, COUNTYNAME, TOWNNAME and WKB geometry, or None if the town layer cannot be read)
+	"""
+
+	path_data  = path_data if (path_data is not None) else PATH_DATA
+	path_cache = path_cache if (path_cache is not None) else os.path.join(path_data, DIR_CACHE, FILE_CACHE)
+
+	reference_data = {
+		'version'   : VERSION_CACHE,
+		'hash'      : hash_reference_data(path_data),
+		'hash_code' : hash_reference_code(),
+		'registry'  : CoefficientRegistry(path_data),
+		'df_town'   : _compile_town_layer(path_data + PATH_LAYER_TOWN),
+	}
+
+	# Write to a temporary file first so that concurrent readers never see a partial artifact
+	try:
+
+		os.makedirs(os.path.dirname(path_cache), exist_ok=True)
+
+		with open(path_cache + '.{}.tmp'.format(os.getpid()), 'wb') as f: pickle.dump(reference_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+		os.replace(path_cache + '.{}.tmp'.format(os.getpid()), path_cache)
+
+	# A read-only installation still works without the artifact
+	except OSError:
+
+		pass
+
+	return reference_data
+
+def load_reference_data(path_data=None, path_cache=None):
+
+	"""
+	This method is used to load the compiled reference data, compiling it if it is missing or stale.
+	===========================================================================================
+
+	Arguments:
+
+		path_data (str): Directory of the reference data. Default is dependency/data
+
+		path_cache (str): Path of the artifact. Default is <path_data>/_compiled/reference_data.pkl
+
+	Output:
+
+		reference_data (dict): version, hash, hash_code, registry (CoefficientRegistry) and df_town (pandas.DataFrame or None)
+	"""
+
+	path_data  = path_data if (path_data is not None) else PATH_DATA
+	path_cache = path_cache if (path_cache is not None) else os.path.join(path_data, DIR_CACHE, FILE_CACHE)
+
+	# Loaded once per process
+	if (path_cache in _dict_reference_data):
+
+		instrumentation.count('reference_data_hit')
+
+		return _dict_reference_data[path_cache]
+
+	reference_data = None
+
+	if (os.path.exists(path_cache)):
+
+		try:
+
+			with open(path_cache, 'rb') as f: reference_data = pickle.load(f)
+
+			instrumentation.count('file_reads')
+			instrumentation.count('bytes_parsed', os.path.getsize(path_cache))
+
+		except Exception:
+
+			reference_data = None
+
+	# Invalidate by version, code hash and content hash
+	if (reference_data is None) or (reference_data.get('version') != VERSION_CACHE) or (reference_data.get('hash_code') != hash_reference_code()) or (reference_data.get('hash') != hash_reference_data(path_data)):
+
+		instrumentation.count('reference_data_miss')
+
+		reference_data = compile_reference_data(path_data, path_cache)
+
+	_dict_reference_data[path_cache] = reference_data
+
+	return reference_data
+
+def _compile_town_layer(path_layer):
+
+	if (not os.path.exists(path_layer)): return None
+
+	import geopandas as gpd
+	import shapely
+
+	df_town = gpd.read_file(path_layer, encoding='utf-8')
+
+	instrumentation.count('file_reads')
+	instrumentation.count('bytes_parsed', os.path.getsize(path_layer))
+
+	return pd.DataFrame({
+		'TOWNCODE'   : df_town['TOWNCODE'].astype(str).values,
+		'COUNTYNAME' : df_town['COUNTYNAME'].values,
+		'TOWNNAME'   : df_town['TOWNNAME'].values,
+		'wkb'        : shapely.to_wkb(df_town.geometry.values),
+	})
+
+if (__name__ == '__main__'):
+
+	reference_data = compile_reference_data()
+
+	print('Compiled reference data {}.'.format(reference_data['hash']))
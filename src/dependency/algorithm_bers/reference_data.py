@@ -0,0 +1,506 @@
+"""
+Process-wide registries of the reference tables, one per estimation system.
+
+An estimation system is a named version of the coefficients and EUI criteria (e.g. a handbook
+edition), stored as a data directory with the layout of dependency/data. BERSe is the tables under
+dependency/data; other versions are registered side by side:
+
+	register_estimation_system('BERSe_2019', '/path/to/data_2019/')
+
+	with use_estimation_system('BERSe_2019'): df_result = estimate_portfolio(...)
+
+Each registry is loaded on first use and then shared read-only by every building using its system.
+A system that is not registered uses the tables of BERSe, as any estimation_system did before
+versions could be registered.
+
+Abbreviation:
+ - coef: Coefficient
+ - es: Energy Section
+ - cz: Climate Zone
+ - uc: Urban Coefficient
+ - eui: Energy Use Intensity
+ - yoh: Yearly Operation Hours
+"""
+
+import numpy as np
+import pandas as pd
+import contextlib
+import contextvars
+import functools
+import os
+
+from . import instrumentation
+
+__path__ = os.path.dirname(__file__).replace('\\', '/').replace('C:/', '/') + '/'
+
+# Urban coefficient of each urban region. Towns without a region use the last value.
+DICT_URBANREGION_UC = {'A': 1.0, 'B': 0.95, 'C': 0.8}
+DEFAULT_URBANREGION_UC = 0.7
+
+# Estimation system of the tables under dependency/data
+DEFAULT_ESTIMATION_SYSTEM = 'BERSe'
+
+# Marker of a key missing in a lookup table
+_MISSING = object()
+
+class CoefficientRegistry():
+
+	"""
+	This class is used to load every reference table once and serve keyed lookups.
+	"""
+
+	def __init__(self, path_data=None):
+
+		"""
+		This method is used to initialize a coefficient registry.
+		===========================================================================================
+
+		Arguments:
+
+			path_data (str): Directory of the reference tables. Default is dependency/data.
+		"""
+
+		self.path_data = path_data if (path_data is not None) else __path__ + '../data/'
+
+		# =========================================================================================
+		#
+		# EUI criteria
+		#
+		# =========================================================================================
+
+		# EUI median and maximum. No minimum table is shipped, the median table is used instead.
+		self.df_eui_m   = self._read_eui_criteria('eui_criteria/eui_criteria.m.csv')
+		self.df_eui_max = self._read_eui_criteria('eui_criteria/eui_criteria.max.csv')
+		self.df_eui_min = self.df_eui_m
+
+		# Keyed EUI criteria of every section: one row per Energy_Section_ID
+		self.index_eui_criteria = self.df_eui_m.index.union(self.df_eui_max.index)
+		df_eui_m                = self.df_eui_m.reindex(self.index_eui_criteria)
+		df_eui_max              = self.df_eui_max.reindex(self.index_eui_criteria)
+		df_eui_min              = self.df_eui_min.reindex(self.index_eui_criteria)
+
+		self.df_eui_criteria = pd.DataFrame({
+			'eeui_m'     : df_eui_m['EEUI'],
+			'leui_min'   : df_eui_min['LEUI'],
+			'leui_m'     : df_eui_m['LEUI'],
+			'leui_max'   : df_eui_max['LEUI'],
+			'meaneui_m'  : df_eui_m['EUI_Mean'],
+			'totaleui_m' : df_eui_m['TotalEUI'],
+		}, index=self.index_eui_criteria)
+
+		# AEUI by climate zone and AC type, as (section, AEUI column) arrays
+		self.index_aeui = pd.Index([i for i in self.df_eui_m.columns if i.startswith('AEUI_')])
+		self.dict_aeui  = {
+			'min' : df_eui_min[self.index_aeui].to_numpy(dtype=float),
+			'm'   : df_eui_m[self.index_aeui].to_numpy(dtype=float),
+			'max' : df_eui_max[self.index_aeui].to_numpy(dtype=float),
+		}
+
+		# =========================================================================================
+		#
+		# Town tables: climate zone and urban region
+		#
+		# =========================================================================================
+
+		self.df_climatezone = self._read_csv('coef_climatezone/coef_climatezone.csv')
+		self.df_urbanregion = self._read_csv('coef_urbanregion/coef_urbanregion.csv')
+
+		self.dict_climatezone_town     = _index_town(self.df_climatezone, 'Climate_Zone')
+		self.dict_climatezone_towncode = _index_towncode(self.df_climatezone, 'Climate_Zone')
+		self.dict_urbanregion_town     = _index_town(self.df_urbanregion, 'Urban_Region')
+		self.dict_urbanregion_towncode = _index_towncode(self.df_urbanregion, 'Urban_Region')
+
+		# Urban coefficient encoded from the urban region
+		self.df_urbanregion['Urban_Coefficient'] = self.df_urbanregion['Urban_Region'].map(DICT_URBANREGION_UC).fillna(DEFAULT_URBANREGION_UC)
+		self.dict_uc_town     = _index_town(self.df_urbanregion, 'Urban_Coefficient')
+		self.dict_uc_towncode = _index_towncode(self.df_urbanregion, 'Urban_Coefficient')
+
+		# =========================================================================================
+		#
+		# Operation hours of energy sections
+		#
+		# =========================================================================================
+
+		self.df_es_operation = self._read_csv('coef_es_operation/coef_es_operation.csv')
+		self.df_es_operation['Energy_Section_ID'] = self.df_es_operation['Energy_Section'].str.split('. ').str[0]
+		self.df_es_operation['Sub_Section_ID']    = self.df_es_operation['Sub-section'].str.split('. ').str[0]
+
+		# (es, sub-section) -> YOH. Sections without sub-sections are keyed by (es, None).
+		self.dict_yoh = {}
+		for es, es_sub, yoh in self.df_es_operation[['Energy_Section_ID', 'Sub_Section_ID', 'YOH']].itertuples(index=False):
+			self.dict_yoh.setdefault((es, es_sub if isinstance(es_sub, str) else None), yoh)
+			self.dict_yoh.setdefault((es, None), yoh)
+
+		# The same keys flattened for array lookups: es, or es|sub-section
+		self.index_yoh = pd.Index(['{}|{}'.format(es, es_sub) if (es_sub is not None) else es for es, es_sub in self.dict_yoh.keys()])
+		self.array_yoh = np.array(list(self.dict_yoh.values()), dtype=float)
+
+		# =========================================================================================
+		#
+		# Coefficients of exclusive sections
+		#
+		# =========================================================================================
+
+		# en = (EUI * Usage + Offset) * Quantity * Days * Factor. Blank Usage, Days and Factor are 1, blank Offset is 0.
+		self.df_es_exclusive = self._read_csv('coef_es_exclusive/coef_es_exclusive.csv')
+		self.df_es_exclusive = self.df_es_exclusive.drop_duplicates('Section_ID').set_index('Section_ID', drop=False)
+		self.df_es_exclusive = self.df_es_exclusive.fillna({'Offset': 0.0, 'Days': 1.0, 'Factor': 1.0})
+
+		# Building fields referred by Usage and Quantity
+		self.list_es_exclusive_field = sorted((set(self.df_es_exclusive['Usage'].dropna()) | set(self.df_es_exclusive['Quantity'].dropna())) - {'Area', 'YOH'})
+
+		# =========================================================================================
+		#
+		# Facilities: elevator and escalator
+		#
+		# =========================================================================================
+
+		self.df_facility_usage            = self._read_csv('coef_facility/coef_facility_usage_elevator_escalator.csv')
+		self.df_facility_ec_elevator      = self._read_csv('coef_facility/coef_facility_ec_elevator.csv')
+		self.df_facility_ec_elevator_ind  = self._read_csv('coef_facility/coef_facility_ec_elevator_industrial.csv')
+		self.df_facility_power_escalator  = self._read_csv('coef_facility/coef_facility_power_escalator.csv')
+
+		self.dict_facility_usage = self.df_facility_usage.drop_duplicates('Section_ID').set_index('Section_ID')[['Or', 'Osr']].to_dict('index')
+
+	def get_climatezone(self, county, town):
+
+		"""
+		This method is used to get the climate zone of a town.
+		===========================================================================================
+
+		Arguments:
+
+			county (str): County of the building
+
+			town (str): Town of the building
+
+		Output:
+
+			climatezone (str): Climate zone of the building. N, C, or S.
+		"""
+
+		climatezone = self._lookup(self.dict_climatezone_town, (county, town))
+
+		# Raise error if the town is not defined
+		if (climatezone is _MISSING): raise ValueError('Climate zone is not defined for {} {}.'.format(county, town))
+
+		return climatezone
+
+	def get_urbanregion(self, county, town):
+
+		"""
+		This method is used to get the urban coefficient of a town.
+		===========================================================================================
+
+		Arguments:
+
+			county (str): County of the building
+
+			town (str): Town of the building
+
+		Output:
+
+			urbanregion (float): Urban coefficient of the building
+		"""
+
+		urbanregion = self._lookup(self.dict_uc_town, (county, town))
+
+		# Raise error if the town is not defined
+		if (urbanregion is _MISSING): raise ValueError('Urban region is not defined for {} {}.'.format(county, town))
+
+		return urbanregion
+
+	def get_coef_usage_h(self, es, es_sub=1):
+
+		"""
+		This method is used to get YOH (operation hours per year) of the given es.
+		===========================================================================================
+
+		Arguments:
+
+			es (str): Energy section
+
+			es_sub (str): Sub-energy section. Default is 1 and only available for J4
+
+		Output:
+
+			coef_usage_h (float): YOH of the given es
+		"""
+
+		# Modify es if the section is special
+		if (es == 'N7'): es = 'L6-1'
+
+		key = (es, str(es_sub)) if (es == 'J4') else (es, None)
+
+		coef_usage_h = self._lookup(self.dict_yoh, key)
+
+		# Raise error if no YOH is found (the given es is not defined)
+		if (coef_usage_h is _MISSING): raise ValueError('YOH is not defined for es {}.'.format(es))
+
+		return coef_usage_h
+
+	def get_coef_usage_h_array(self, es, es_sub=1):
+
+		"""
+		This method is used to get YOH (operation hours per year) of many es at once.
+		===========================================================================================
+
+		Arguments:
+
+			es (array-like): Energy sections
+
+			es_sub (str): Sub-energy section. Default is 1 and only available for J4
+
+		Output:
+
+			coef_usage_h (numpy.ndarray): YOH of each given es
+		"""
+
+		# Modify es if the section is special
+		es  = np.asarray(es, dtype=object)
+		es  = np.where(es=='N7', 'L6-1', es)
+		key = np.where(es=='J4', 'J4|{}'.format(es_sub), es)
+
+		idx_yoh = self.index_yoh.get_indexer(key)
+
+		instrumentation.count('coefficient_hit', int((idx_yoh >= 0).sum()))
+		instrumentation.count('coefficient_miss', int((idx_yoh < 0).sum()))
+
+		# Raise error if no YOH is found (the given es is not defined)
+		if (idx_yoh < 0).any(): raise ValueError('YOH is not defined for es {}.'.format(es[idx_yoh < 0][0]))
+
+		return self.array_yoh[idx_yoh]
+
+	def get_coef_facility_usage(self, building_type, facility='Or'):
+
+		"""
+		This method is used to get the usage ratio of elevator (Or) or escalator (Osr) by building type.
+		===========================================================================================
+
+		Arguments:
+
+			building_type (str): Building type
+
+			facility (str): Or for elevator, Osr for escalator
+
+		Output:
+
+			coef_usage_r (float): Coefficient of usage ratio
+		"""
+
+		coef_usage_r = self._lookup(self.dict_facility_usage, building_type)
+
+		# Raise error if the building type is not defined
+		if (coef_usage_r is _MISSING): raise ValueError('Usage ratio of facility is not defined for building type {}.'.format(building_type))
+
+		return coef_usage_r[facility]
+
+	def join_eui_criteria(self, df_es_comm, building_cz):
+
+		"""
+		This method is used to attach the EUI criteria to common sections.
+		===========================================================================================
+
+		Arguments:
+
+			df_es_comm (pandas.DataFrame): Common sections with Section_ID and AC_Type
+
+			building_cz (str or array-like): Climate zone of the building, or of each section
+
+		Output:
+
+			df_es_comm (pandas.DataFrame): Common sections with eeui_m, leui_min/m/max, aeui_min/m/max, meaneui_m and totaleui_m
+		"""
+
+		# Row of each section in the EUI criteria
+		idx_section = self.index_eui_criteria.get_indexer(df_es_comm['Section_ID'])
+
+		# Raise error if the section is not defined
+		if (idx_section < 0).any(): raise ValueError('EUI criteria is not defined for es {}.'.format(df_es_comm['Section_ID'].values[idx_section < 0][0]))
+
+		df_es_comm = df_es_comm.copy()
+		for column, values in self.df_eui_criteria.items(): df_es_comm[column] = values.values[idx_section]
+
+		# Column of each section in the AEUI arrays: AEUI_<climate zone>_<AC type>
+		column_aeui = 'AEUI_' + pd.Series(building_cz, index=df_es_comm.index).astype(str) + '_' + df_es_comm['AC_Type'].astype(str).str.upper()
+		idx_aeui    = self.index_aeui.get_indexer(column_aeui)
+
+		# Unknown climate zone or AC type gives NaN
+		for stat, array_aeui in self.dict_aeui.items():
+
+			df_es_comm['aeui_{}'.format(stat)] = np.where(idx_aeui >= 0, array_aeui[idx_section, idx_aeui], np.nan)
+
+		return df_es_comm
+
+	def _lookup(self, dict_lookup, key):
+
+		value = dict_lookup.get(key, _MISSING)
+		instrumentation.count('coefficient_miss' if (value is _MISSING) else 'coefficient_hit')
+
+		return value
+
+	def _read_csv(self, path_file):
+
+		instrumentation.count('file_reads')
+		instrumentation.count('bytes_parsed', os.path.getsize(self.path_data + path_file))
+
+		return pd.read_csv(self.path_data + path_file)
+
+	def _read_eui_criteria(self, path_file):
+
+		df = self._read_csv(path_file)
+		df['Energy_Section_ID'] = df['Energy_Section'].str.split('. ').str[0]
+
+		return df.drop_duplicates('Energy_Section_ID').set_index('Energy_Section_ID', drop=False)
+
+def _index_town(df, column):
+
+	return dict(zip(zip(df['COUNTYNAME'], df['TOWNNAME']), df[column]))
+
+def _index_towncode(df, column):
+
+	return dict(zip(df['TOWNCODE'].astype(str), df[column]))
+
+# Data directory of each estimation system. None is dependency/data
+_dict_estimation_system = {DEFAULT_ESTIMATION_SYSTEM: None}
+_dict_registry          = {}
+
+# Estimation system of get_registry() without argument
+_estimation_system = contextvars.ContextVar('estimation_system', default=DEFAULT_ESTIMATION_SYSTEM)
+
+def register_estimation_system(estimation_system, path_data):
+
+	"""
+	This method is used to register a version of the reference tables under an estimation system name.
+	===========================================================================================
+
+	Arguments:
+
+		estimation_system (str): Name of the estimation system, as in Building(estimation_system=...)
+
+		path_data (str): Directory of the reference tables, with the layout of dependency/data
+
+	Output:
+
+		None
+	"""
+
+	# Error handling
+	# Directory of the reference tables does not exist
+	if (not os.path.isdir(path_data)): raise ValueError('Reference data directory {} does not exist.'.format(path_data))
+
+	path_data = os.path.join(path_data, '')
+
+	# A registry loaded from another directory is dropped, with those of the systems sharing the default one
+	if (_dict_estimation_system.get(estimation_system, _MISSING) != path_data):
+
+		_dict_registry.pop(estimation_system, None)
+
+		if (estimation_system == DEFAULT_ESTIMATION_SYSTEM):
+
+			for i in [i for i in _dict_registry if (i not in _dict_estimation_system)]: _dict_registry.pop(i)
+
+	_dict_estimation_system[estimation_system] = path_data
+
+	return
+
+def get_estimation_system():
+
+	"""
+	This method is used to get the estimation system of get_registry() without argument.
+	===========================================================================================
+
+	Arguments:
+
+		None
+
+	Output:
+
+		estimation_system (str): Name of the estimation system
+	"""
+
+	return _estimation_system.get()
+
+def get_dict_estimation_system():
+
+	"""
+	This method is used to get the registered estimation systems.
+	===========================================================================================
+
+	Arguments:
+
+		None
+
+	Output:
+
+		dict_estimation_system (dict): Data directory of each estimation system. None is dependency/data
+	"""
+
+	return dict(_dict_estimation_system)
+
+@contextlib.contextmanager
+def use_estimation_system(estimation_system=None):
+
+	"""
+	This method is used to set the estimation system of get_registry() within a block.
+	===========================================================================================
+
+	Arguments:
+
+		estimation_system (str): Name of the estimation system. Default is None (the current one)
+
+	Output:
+
+		None
+	"""
+
+	token = _estimation_system.set(estimation_system if (estimation_system is not None) else _estimation_system.get())
+
+	try: yield
+
+	finally: _estimation_system.reset(token)
+
+def get_registry(estimation_system=None):
+
+	"""
+	This method is used to get the process-wide coefficient registry of an estimation system. It is loaded
+	on first use from the compiled reference data, which is rebuilt when any source table changes.
+	===========================================================================================
+
+	Arguments:
+
+		estimation_system (str): Name of the estimation system. Default is None (the one of use_estimation_system(), or BERSe).
+			A system that is not registered uses the registry of BERSe
+
+	Output:
+
+		registry (CoefficientRegistry): Shared coefficient registry
+	"""
+
+	estimation_system = estimation_system if (estimation_system is not None) else _estimation_system.get()
+	registry          = _dict_registry.get(estimation_system)
+
+	instrumentation.count('registry_miss' if (registry is None) else 'registry_hit')
+
+	if (registry is None):
+
+		# Systems that are not registered share the registry of the default system
+		if (estimation_system not in _dict_estimation_system): registry = _dict_registry[estimation_system] = get_registry(DEFAULT_ESTIMATION_SYSTEM)
+
+		else:
+
+			from .reference_cache import load_reference_data
+
+			registry = _dict_registry[estimation_system] = load_reference_data(_dict_estimation_system[estimation_system])['registry']
+
+	return registry
+
+def _with_estimation_system(func):
+
+	# Reference tables of the estimation system of the building (first argument, or self) within the call
+	@functools.wraps(func)
+	def wrapper(building, *args, **kwargs):
+
+		with use_estimation_system(building.estimation_system): return func(building, *args, **kwargs)
+
+	return wrapper
@@ -0,0 +1,236 @@
+"""
+Partitioned columnar store of estimation results.
+
+Results are appended to a Parquet dataset partitioned by county and building type (hive layout with
+URL-encoded values, e.g. <path>/building_address_county=%E8%87%BA%E5%8C%97%E5%B8%82/building_type=B2/
+part-<uuid>-0.parquet for 臺北市). Every write adds new files, so batches of several runs accumulate
+in one dataset. Reads memory-map the files and only open the partitions that match the filter.
+
+	with ResultsWriter('results') as writer:
+		for record in run_buildings(list_building): writer.write(record)
+
+	df_result = read_results('results', county='臺北市', building_type=['B2', 'B3'])
+
+Abbreviation:
+ - cz: Climate Zone
+ - uc: Urban Coefficient
+ - id: Identifier
+"""
+
+import pandas as pd
+import uuid
+import json
+
+# Partition columns, in directory order
+LIST_PARTITION = ['building_address_county', 'building_type']
+
+class ResultsWriter():
+
+	"""
+	This class is used to append estimation results to a partitioned Parquet dataset.
+	"""
+
+	def __init__(self, path_dataset, batch_size=100000):
+
+		"""
+		This method is used to initialize a writer.
+		===========================================================================================
+
+		Arguments:
+
+			path_dataset (str): Directory of the dataset
+
+			batch_size (int): Number of records buffered before they are written. Default is 100000
+		"""
+
+		self.path_dataset = path_dataset
+		self.batch_size   = batch_size
+		self.n_written    = 0
+		self.n_skipped    = 0
+		self._list_buffer = []
+		self._n_buffer    = 0
+
+	def __enter__(self):
+
+		return self
+
+	def __exit__(self, *args):
+
+		self.flush()
+
+	def write(self, records):
+
+		"""
+		This method is used to add results to the buffer, writing it when it is full.
+		===========================================================================================
+
+		Arguments:
+
+			records (dict, list or pandas.DataFrame): One record or many records of run_buildings(), or the
+				result of estimate_portfolio(). Records with an error are skipped
+
+		Output:
+
+			None
+		"""
+
+		if (isinstance(records, dict)): records = [records]
+
+		df_result = records if (isinstance(records, pd.DataFrame)) else pd.DataFrame(records)
+
+		# Results of estimate_portfolio() are indexed by building ID
+		if ('building_id' not in df_result): df_result = df_result.rename_axis('building_id').reset_index()
+
+		# Failed buildings have no results
+		if ('error' in df_result):
+
+			mask_error      = df_result['error'].notna().to_numpy()
+			self.n_skipped += int(mask_error.sum())
+			df_result       = df_result[~mask_error].drop(columns='error')
+
+		if (df_result.empty): return
+
+		# Error handling
+		# Partition columns are not defined
+		for column in LIST_PARTITION:
+
+			if (column not in df_result): raise ValueError('{} is not defined in the results.'.format(column))
+
+		self._list_buffer.append(df_result)
+		self._n_buffer += df_result.shape[0]
+
+		if (self._n_buffer >= self.batch_size): self.flush()
+
+		return
+
+	def flush(self):
+
+		"""
+		This method is used to write the buffered results as new files of the dataset.
+		===========================================================================================
+
+		Arguments:
+
+			None
+
+		Output:
+
+			None
+		"""
+
+		if (self._n_buffer == 0):
+
+			self._list_buffer = []
+
+			return
+
+		import pyarrow as pa
+		import pyarrow.dataset as ds
+
+		df_result = pd.concat(self._list_buffer, ignore_index=True)
+
+		# Instrumentation is kept as a JSON string, since its keys vary. The column is always written so that every file can be read with it
+		if ('instrumentation' not in df_result): df_result['instrumentation'] = None
+		df_result['instrumentation'] = pd.array([None if (i is None) or (i != i) else json.dumps(i) for i in df_result['instrumentation']], dtype='string')
+
+		for column in LIST_PARTITION: df_result[column] = df_result[column].astype(str)
+		df_result['building_id'] = df_result['building_id'].astype(str)
+
+		ds.write_dataset(
+			pa.Table.from_pandas(df_result, preserve_index=False),
+			self.path_dataset,
+			format                 = 'parquet',
+			partitioning           = _get_partitioning(),
+			basename_template      = 'part-{}-{{i}}.parquet'.format(uuid.uuid4().hex),
+			existing_data_behavior = 'overwrite_or_ignore',
+		)
+
+		self.n_written   += df_result.shape[0]
+		self._list_buffer = []
+		self._n_buffer    = 0
+
+		return
+
+def write_results(path_dataset, records, batch_size=100000):
+
+	"""
+	This method is used to append estimation results to a partitioned Parquet dataset.
+	===========================================================================================
+
+	Arguments:
+
+		path_dataset (str): Directory of the dataset
+
+		records (iterable or pandas.DataFrame): Records of run_buildings(), or the result of estimate_portfolio()
+
+		batch_size (int): Number of records written at once. Default is 100000
+
+	Output:
+
+		n_written (int): Number of results written
+	"""
+
+	with ResultsWriter(path_dataset, batch_size) as writer:
+
+		if (isinstance(records, pd.DataFrame)): writer.write(records)
+		else:
+
+			for record in records: writer.write(record)
+
+	return writer.n_written
+
+def read_results(path_dataset, county=None, building_type=None, columns=None, as_arrow=False):
+
+	"""
+	This method is used to read estimation results, opening only the matching partitions.
+	===========================================================================================
+
+	Arguments:
+
+		path_dataset (str): Directory of the dataset
+
+		county (str or list): County or counties to read. Default is all
+
+		building_type (str or list): Building type or types to read. Default is all
+
+		columns (list): Columns to read. Default is all
+
+		as_arrow (bool): Return a pyarrow.Table instead of a pandas.DataFrame. Default is False
+
+	Output:
+
+		df_result (pandas.DataFrame or pyarrow.Table): Results with the partition columns
+	"""
+
+	import pyarrow as pa
+	import pyarrow.dataset as ds
+	import pyarrow.fs as fs
+
+	filesystem = fs.LocalFileSystem(use_mmap=True)
+	dataset    = ds.dataset(path_dataset, format='parquet', partitioning=_get_partitioning(), filesystem=filesystem)
+
+	expression = None
+	for column, values in ((LIST_PARTITION[0], county), (LIST_PARTITION[1], building_type)):
+
+		if (values is None): continue
+
+		values     = [values] if (isinstance(values, str)) else list(values)
+		expression = ds.field(column).isin(values) if (expression is None) else (expression & ds.field(column).isin(values))
+
+	# Files written by different versions may have different columns
+	list_fragment = list(dataset.get_fragments(filter=expression))
+	if (len(list_fragment) > 0):
+
+		schema  = pa.unify_schemas([dataset.partitioning.schema] + [i.physical_schema for i in list_fragment])
+		dataset = ds.dataset([i.path for i in list_fragment], schema=schema, format='parquet', partitioning=ds.partitioning(dataset.partitioning.schema, flavor='hive'), partition_base_dir=path_dataset, filesystem=filesystem)
+
+	table = dataset.to_table(columns=columns, filter=expression)
+
+	return table if (as_arrow) else table.to_pandas()
+
+def _get_partitioning():
+
+	import pyarrow as pa
+	import pyarrow.dataset as ds
+
+	return ds.partitioning(pa.schema([(i, pa.string()) for i in LIST_PARTITION]), flavor='hive')
@@ -0,0 +1,177 @@
+"""
+Multi-core runner spreading building estimation over a process pool.
+
+Abbreviation:
+ - es: Energy Section
+ - n: Number
+"""
+
+import concurrent.futures
+import collections
+import itertools
+import os
+
+from .building_basic import Building
+from .reference_data import get_registry, get_dict_estimation_system, register_estimation_system
+from .geocoder_grid import get_town_locator
+from . import geocoder_cache
+from . import instrumentation
+
+def run_buildings(list_building, max_workers=None, chunksize=64, load_geocoder=True):
+
+	"""
+	This method is used to estimate many buildings on a process pool and stream the results in input order.
+	===========================================================================================
+
+	Arguments:
+
+		list_building (iterable): Building specifications. Each one is a dict of Building arguments with optional
+			building_id, energysection (pandas.DataFrame), elevator (list of dict) and escalator (list of dict)
+
+		max_workers (int): Number of worker processes. Default is the number of CPUs
+
+		chunksize (int): Number of buildings sent to a worker at once. Default is 64
+
+		load_geocoder (bool): Load the town layer in every worker at start-up. Default is True
+
+	Output:
+
+		record (dict): One record per building, in input order. Failed buildings have an error entry
+			instead of the estimation results. If instrumentation is enabled, every record has the
+			instrumentation of its building, which is also added to the aggregate of this process
+	"""
+
+	max_workers = max_workers if (max_workers is not None) else (os.cpu_count() or 1)
+	iterator    = iter(list_building)
+
+	with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(load_geocoder, instrumentation.is_enabled(), _get_geocode_cache_config(), get_dict_estimation_system())) as executor:
+
+		# Keep a bounded number of chunks in flight and yield them in submission order
+		pending = collections.deque()
+
+		while True:
+
+			while (len(pending) < 2 * max_workers):
+
+				chunk = list(itertools.islice(iterator, chunksize))
+				if (len(chunk) == 0): break
+
+				pending.append(executor.submit(_estimate_chunk, chunk))
+
+			if (len(pending) == 0): break
+
+			for record in pending.popleft().result():
+
+				if (record.get('instrumentation') is not None): instrumentation.merge_instrumentation(record['instrumentation'])
+
+				yield record
+
+def estimate_building(spec):
+
+	"""
+	This method is used to create and estimate one building from its specification.
+	===========================================================================================
+
+	Arguments:
+
+		spec (dict): Building arguments with optional building_id, energysection, elevator and escalator
+
+	Output:
+
+		record (dict): building_id, building_type, estimation_system, location, building_cz, building_uc and est_* values, or building_id and error
+	"""
+
+	spec        = dict(spec)
+	building_id = spec.pop('building_id', None)
+
+	with instrumentation.collect() as collector:
+
+		record = _estimate_building(spec, building_id)
+
+	if (collector is not None): record['instrumentation'] = collector.to_dict()
+
+	return record
+
+def _estimate_building(spec, building_id):
+
+	try:
+
+		list_elevator  = spec.pop('elevator', [])
+		list_escalator = spec.pop('escalator', [])
+
+		building = Building(**spec)
+
+		for i in list_elevator: building.create_elevator(**i)
+		for i in list_escalator: building.create_escalator(**i)
+
+		building.estimate()
+
+	except Exception as e:
+
+		# Per-building failures are reported and do not abort the batch
+		return {'building_id': building_id, 'error': '{}: {}'.format(type(e).__name__, e)}
+
+	return get_record(building, building_id)
+
+def get_record(building, building_id=None):
+
+	"""
+	This method is used to collect the estimation results of a building as a flat record.
+	===========================================================================================
+
+	Arguments:
+
+		building (Building): Estimated building
+
+		building_id: ID of the building
+
+	Output:
+
+		record (dict): building_id, building_type, estimation_system, location, building_cz, building_uc and est_* values
+	"""
+
+	record = {
+		'building_id'             : building_id,
+		'building_type'           : building.building_type,
+		'estimation_system'       : building.estimation_system,
+		'building_address_county' : building.building_address_county,
+		'building_address_town'   : building.building_address_town,
+		'building_cz'             : building.building_cz,
+		'building_uc'             : building.building_uc,
+	}
+	record.update({k: v for k, v in vars(building).items() if k.startswith('est_')})
+
+	return record
+
+def _init_worker(load_geocoder, instrumentation_enabled=False, geocode_cache_config=None, dict_estimation_system=None):
+
+	# Workers record only what the parent asked for
+	if (instrumentation_enabled): instrumentation.enable_instrumentation()
+	else: instrumentation.disable_instrumentation()
+
+	# Workers share the geocode cache of the parent
+	if (geocode_cache_config is not None): geocoder_cache.enable_geocode_cache(**geocode_cache_config)
+
+	# Workers know the estimation systems of the parent. Their tables are loaded on first use
+	for estimation_system, path_data in (dict_estimation_system or {}).items():
+
+		if (path_data is not None): register_estimation_system(estimation_system, path_data)
+
+	# Load the reference tables of the default system, and the town grid or layer, once per worker
+	get_registry()
+
+	# A missing town layer is reported by the buildings that need it. With the geocode cache, it is loaded on the first miss
+	if (load_geocoder) and (geocode_cache_config is None):
+
+		try: get_town_locator()
+		except Exception: pass
+
+def _get_geocode_cache_config():
+
+	geocode_cache = geocoder_cache.get_geocode_cache()
+
+	return None if (geocode_cache is None) else geocode_cache.config
+
+def _estimate_chunk(chunk):
+
+	return [estimate_building(i) for i in chunk]
@@ -0,0 +1,235 @@
+"""
+What-if scenario sweep over variants of one building.
+
+The location, climate zone, urban coefficient and EUI criteria of the base building are looked up
+once. The varying parts of every variant (section areas and AC types, usage fields, elevators and
+escalators) are then evaluated together as arrays of shape (variant, section) or (variant, unit).
+
+Parameters:
+ - Usage fields of exclusive sections, by Building attribute or argument name, e.g. n_hotelroom,
+   coef_usage_r_hotelroom or coef_usage_hotelroom
+ - ('energysection', label, column): Area or AC_Type of the section with the given index label
+ - ('elevator', i, argument) / ('escalator', i, argument): Argument of the i-th elevator/escalator,
+   e.g. ('elevator', 0, 'coef_speed')
+
+Abbreviation:
+ - a: Area
+ - es: Energy Section
+ - ec: Energy Consumption
+ - n: Number
+"""
+
+import numpy as np
+import pandas as pd
+import itertools
+
+from .reference_data import get_registry, _with_estimation_system
+from .building_basic import DICT_ARGUMENT_ATTRIBUTE, calc_en_section
+from .facility_fleet import VerticalTransportFleet
+from .score import score_result
+
+# Variable columns of energy sections
+LIST_ES_COLUMN = ['Area', 'AC_Type']
+
+# Arguments of facilities kept on the objects
+LIST_ELEVATOR_ARGUMENT  = ['elevator_bottom_floor', 'elevator_top_floor', 'elevator_floor_offset', 'elevator_es', 'coef_eff', 'coef_people_per_elevator', 'coef_load_per_elevator', 'coef_speed']
+LIST_ESCALATOR_ARGUMENT = ['escalator_elevate_height', 'escalator_width', 'escalator_es', 'coef_eff']
+
+@_with_estimation_system
+def sweep_scenarios(building, dict_grid=None, list_variant=None, df_es=None):
+
+	"""
+	This method is used to estimate many variants of a building at once.
+	===========================================================================================
+
+	Arguments:
+
+		building (Building): Base building with its elevators and escalators
+
+		dict_grid (dict): Values of each parameter. Every combination is a variant
+
+		list_variant (list): Variants as dicts of parameter values, instead of dict_grid
+
+		df_es (pandas.DataFrame): Energy sections of the base building. Default is energysection of the building
+
+	Output:
+
+		df_result (pandas.DataFrame): One row per variant with the parameter values and the est_* values of Building.estimate()
+	"""
+
+	# Error handling
+	# Variants are not defined
+	if (dict_grid is None) == (list_variant is None): raise ValueError('Either dict_grid or list_variant must be defined.')
+
+	if (dict_grid is not None): list_variant = [dict(zip(dict_grid.keys(), i)) for i in itertools.product(*dict_grid.values())]
+
+	list_parameter = list(dict.fromkeys(k for i in list_variant for k in i.keys()))
+	n_variant      = len(list_variant)
+
+	# Read section tables
+	if (df_es is None): df_es = building.energysection
+	if (isinstance(df_es, str)): df_es = pd.read_csv(df_es)
+
+	# Error handling
+	# Energy sections are not defined
+	if (df_es is None): raise ValueError('Energy sections are not defined.')
+
+	# =========================================================================================
+	#
+	# Values of every variant
+	#
+	# =========================================================================================
+
+	# Energy sections as (variant, section) arrays
+	dict_es = {column: np.tile(df_es[column].to_numpy(dtype=object), (n_variant, 1)) for column in LIST_ES_COLUMN}
+
+	# Usage fields as one row per variant
+	df_usage = pd.DataFrame({i: np.full(n_variant, getattr(building, i), dtype=object) for i in get_registry().list_es_exclusive_field})
+
+	# Facilities as one row per (variant, unit)
+	list_elevator  = [{k: getattr(i, k) for k in LIST_ELEVATOR_ARGUMENT} for i in building.elevator]
+	list_escalator = [{k: getattr(i, k) for k in LIST_ESCALATOR_ARGUMENT} for i in building.escalator]
+	dict_facility  = {'elevator': {}, 'escalator': {}}
+	dict_value     = {}
+
+	for parameter in list_parameter:
+
+		# Variants without the parameter keep the value of the base building
+		base   = _get_base(building, df_es, list_elevator, list_escalator, parameter)
+		values = [i.get(parameter, base) for i in list_variant]
+		dict_value[_get_name(parameter)] = values
+
+		if (isinstance(parameter, tuple)) and (len(parameter) == 3) and (parameter[0] == 'energysection'):
+
+			dict_es[parameter[2]][:, df_es.index.get_loc(parameter[1])] = values
+
+		elif (isinstance(parameter, tuple)) and (len(parameter) == 3) and (parameter[0] in dict_facility):
+
+			dict_facility[parameter[0]][parameter[1:]] = values
+
+		else:
+
+			df_usage[DICT_ARGUMENT_ATTRIBUTE.get(parameter, parameter)] = values
+
+	# =========================================================================================
+	#
+	# Calculate EUI score scale
+	#
+	# =========================================================================================
+
+	df_result = pd.DataFrame(dict_value, index=pd.RangeIndex(n_variant))
+	df_result.index.name = 'variant'
+
+	mask_comm = (df_es['Section_Type']=='common').to_numpy()
+	mask_exc  = (df_es['Section_Type']=='exclusive').to_numpy()
+	area      = dict_es['Area'].astype(float)
+
+	# EUI criteria of each distinct (section, AC type) pair, joined once with the building's climate zone
+	section_id  = np.tile(df_es['Section_ID'].to_numpy(dtype=object)[mask_comm], (n_variant, 1))
+	idx_pair, df_pair = pd.MultiIndex.from_arrays([section_id.ravel(), dict_es['AC_Type'][:, mask_comm].ravel()], names=['Section_ID', 'AC_Type']).factorize()
+	df_pair = get_registry().join_eui_criteria(df_pair.to_frame(index=False, name=['Section_ID', 'AC_Type']), building.building_cz)
+
+	# Error handling
+	# aeui_min, aeui_m, or aeui_max include NaN
+	if (df_pair[['aeui_min', 'aeui_m', 'aeui_max']].isna().values.any()): raise ValueError('aeui_min, aeui_m, or aeui_max include NaN.')
+
+	# Calculate area and EUIs
+	area_comm = area[:, mask_comm]
+	df_result['est_a_es_comm'] = area_comm.sum(axis=1).round(2)
+	df_result['est_a_es_exc']  = area[:, mask_exc].sum(axis=1).round(2)
+
+	for column in ('aeui_min', 'aeui_m', 'aeui_max', 'leui_min', 'leui_m', 'leui_max', 'eeui_m'):
+
+		eui = df_pair[column].to_numpy(dtype=float)[idx_pair].reshape(area_comm.shape)
+		df_result['est_{}'.format(column)] = np.einsum('ij,ij->i', area_comm, eui) / df_result['est_a_es_comm'].to_numpy()
+
+	# Energy consumption of exclusive sections
+	df_es_exc = pd.DataFrame({
+		'variant'    : np.repeat(np.arange(n_variant), mask_exc.sum()),
+		'Section_ID' : np.tile(df_es['Section_ID'].to_numpy(dtype=object)[mask_exc], n_variant),
+		'Area'       : area[:, mask_exc].ravel(),
+	})
+	df_result['est_e_n'] = np.nansum(calc_en_section(df_es_exc, df_usage, 'variant').reshape(n_variant, mask_exc.sum()), axis=1)
+
+	# =========================================================================================
+	#
+	# Calculate adjusted EC
+	#
+	# =========================================================================================
+
+	# Facilities of the base building are shared unless a variant changes them
+	if (len(dict_facility['elevator']) == 0) and (len(dict_facility['escalator']) == 0):
+
+		df_result['est_e_t'] = np.nansum(VerticalTransportFleet.from_facility(building.elevator, building.escalator).calc_e_t_unit())
+
+	else:
+
+		fleet = VerticalTransportFleet(
+			_tile_facility(list_elevator, dict_facility['elevator'], n_variant),
+			_tile_facility(list_escalator, dict_facility['escalator'], n_variant),
+			building.building_type,
+			'variant',
+		)
+		df_result['est_e_t'] = np.bincount(fleet.building_id.astype(np.int64), weights=np.nan_to_num(fleet.calc_e_t_unit()), minlength=n_variant)
+
+	# =========================================================================================
+	#
+	# Bias-correction for EC and score
+	#
+	# =========================================================================================
+
+	df_result = score_result(
+		df_result,
+		building.ec_annual if (building.ec_annual is not None) else np.nan,
+		building.ec_other if (building.ec_other is not None) else np.nan,
+		building.building_uc,
+	)
+
+	return df_result
+
+def _get_base(building, df_es, list_elevator, list_escalator, parameter):
+
+	# Value of a parameter in the base building
+	if (isinstance(parameter, tuple)) and (len(parameter) == 3):
+
+		part, key, column = parameter
+
+		if (part == 'energysection') and (key in df_es.index) and (column in LIST_ES_COLUMN): return df_es.loc[key, column]
+		if (part == 'elevator') and (0 <= key < len(list_elevator)) and (column in LIST_ELEVATOR_ARGUMENT): return list_elevator[key][column]
+		if (part == 'escalator') and (0 <= key < len(list_escalator)) and (column in LIST_ESCALATOR_ARGUMENT): return list_escalator[key][column]
+
+	elif (DICT_ARGUMENT_ATTRIBUTE.get(parameter, parameter) in get_registry().list_es_exclusive_field):
+
+		return getattr(building, DICT_ARGUMENT_ATTRIBUTE.get(parameter, parameter))
+
+	# Error handling
+	# Parameter is not defined
+	raise ValueError('Parameter {} is not defined.'.format(parameter))
+
+def _get_name(parameter):
+
+	return '.'.join(str(i) for i in parameter) if (isinstance(parameter, tuple)) else parameter
+
+def _tile_facility(list_facility, dict_value, n_variant):
+
+	if (len(list_facility) == 0): return None
+
+	# One row per (variant, unit), in variant order
+	df_facility = pd.DataFrame(list_facility * n_variant)
+	df_facility.insert(0, 'variant', np.repeat(np.arange(n_variant), len(list_facility)))
+
+	for (i, column), values in dict_value.items():
+
+		# Assigned element-wise so that lists of sections stay one value
+		array = df_facility[column].to_numpy(dtype=object).copy()
+		array[np.arange(n_variant) * len(list_facility) + i] = _to_object(values)
+		df_facility[column] = array
+
+	return df_facility
+
+def _to_object(values):
+
+	array = np.empty(len(values), dtype=object)
+	for i, value in enumerate(values): array[i] = value
+
+	return array
@@ -0,0 +1,312 @@
+"""
+EUI score of buildings as closed-form array math.
+
+Every function takes scalars or arrays (one value per building) and broadcasts, so the same code
+scores one Building or a whole portfolio.
+
+ - EUI scale:    eui_stat = uc * (aeui_stat + leui_stat + eeui_m), for stat in min, m and max
+ - EUI*:         eui = (ec_annual - e_p - e_n - e_t) / a_es_comm
+ - Score:        100 at eui_min, 50 at eui_m, 0 at eui_max, linear in between and clipped to [0, 100]
+
+A zero-width segment of the scale (e.g. eui_min equal to eui_m, as long as no minimum table is
+shipped) does not define the scores within it: a building beyond eui_m on that side scores NaN.
+
+The inverse gives the highest EUI* (and annual EC) reaching a target score, in closed form for the
+piecewise linear scale, or by vectorized bisection for any other monotone score function.
+
+Abbreviation:
+ - a: Area
+ - es: Energy Section
+ - ec: Energy Consumption
+ - uc: Urban Coefficient
+"""
+
+import numpy as np
+import pandas as pd
+
+# Score at the points of the EUI scale
+SCORE_MIN = 100.0
+SCORE_M   = 50.0
+SCORE_MAX = 0.0
+
+def calc_eui_scale(building_uc, aeui, leui, eeui):
+
+	"""
+	This method is used to adjust the EUI criteria of buildings by their urban coefficient.
+	===========================================================================================
+
+	Arguments:
+
+		building_uc (float or array-like): Urban coefficient
+
+		aeui (float or array-like): Area-weighted AEUI (air conditioning)
+
+		leui (float or array-like): Area-weighted LEUI (lighting)
+
+		eeui (float or array-like): Area-weighted EEUI (equipment)
+
+	Output:
+
+		eui (float or numpy.ndarray): EUI of the scale point
+	"""
+
+	building_uc, aeui, leui, eeui = (np.asarray(i, dtype=float) for i in (building_uc, aeui, leui, eeui))
+
+	return _to_output(building_uc * (aeui + leui + eeui))
+
+def calc_eui_adjusted(ec_annual, e_p, e_n, e_t, a_es_comm):
+
+	"""
+	This method is used to calculate the EUI of the common sections of buildings (EUI*).
+	===========================================================================================
+
+	Arguments:
+
+		ec_annual (float or array-like): Annual energy consumption. NaN if unknown
+
+		e_p (float or array-like): Energy consumption of other special uses (ec_other)
+
+		e_n (float or array-like): Energy consumption of exclusive sections
+
+		e_t (float or array-like): Energy consumption of elevators and escalators
+
+		a_es_comm (float or array-like): Area of common sections
+
+	Output:
+
+		eui (float or numpy.ndarray): Adjusted EUI. NaN if ec_annual is unknown
+	"""
+
+	ec_annual, e_p, e_n, e_t, a_es_comm = (np.asarray(i, dtype=float) for i in (ec_annual, e_p, e_n, e_t, a_es_comm))
+
+	with np.errstate(divide='ignore', invalid='ignore'):
+
+		eui = (ec_annual - e_p - e_n - e_t) / a_es_comm
+
+	return _to_output(eui)
+
+def calc_score(eui, eui_min, eui_m, eui_max):
+
+	"""
+	This method is used to interpolate the adjusted EUI of buildings onto their EUI scale.
+	===========================================================================================
+
+	Arguments:
+
+		eui (float or array-like): Adjusted EUI (EUI*)
+
+		eui_min (float or array-like): EUI scoring SCORE_MIN
+
+		eui_m (float or array-like): EUI scoring SCORE_M
+
+		eui_max (float or array-like): EUI scoring SCORE_MAX
+
+	Output:
+
+		score (float or numpy.ndarray): Score in [0, 100]. NaN if eui or a point of the scale is NaN, or if eui is
+			beyond eui_m on the side of a zero-width segment
+	"""
+
+	eui, eui_min, eui_m, eui_max = (np.asarray(i, dtype=float) for i in (eui, eui_min, eui_m, eui_max))
+
+	# Position within each segment
+	with np.errstate(divide='ignore', invalid='ignore'):
+
+		ratio_upper = np.where(eui == eui_m, 0.0, (eui_m - eui) / (eui_m - eui_min))
+		ratio_lower = np.where(eui == eui_m, 1.0, (eui_max - eui) / (eui_max - eui_m))
+
+	score = np.where(eui <= eui_m, SCORE_M + (SCORE_MIN - SCORE_M) * ratio_upper, SCORE_MAX + (SCORE_M - SCORE_MAX) * ratio_lower)
+
+	# A segment without width has no score within it
+	mask_undefined = ((eui < eui_m) & ~(eui_m > eui_min)) | ((eui > eui_m) & ~(eui_max > eui_m))
+	mask_nan       = np.isnan(eui) | np.isnan(eui_min) | np.isnan(eui_m) | np.isnan(eui_max) | mask_undefined
+
+	score = np.where(mask_nan, np.nan, np.clip(score, SCORE_MAX, SCORE_MIN))
+
+	return _to_output(score)
+
+def calc_eui_target(score, eui_min, eui_m, eui_max):
+
+	"""
+	This method is used to get the highest adjusted EUI reaching a score, inverting calc_score().
+	===========================================================================================
+
+	Arguments:
+
+		score (float or array-like): Target score in (0, 100]
+
+		eui_min, eui_m, eui_max (float or array-like): EUI scale, as in calc_score()
+
+	Output:
+
+		eui (float or numpy.ndarray): Highest EUI* whose score is at least the target. NaN if the target is within a
+			zero-width segment of the scale, which no EUI* scores
+	"""
+
+	score, eui_min, eui_m, eui_max = (np.asarray(i, dtype=float) for i in (score, eui_min, eui_m, eui_max))
+
+	# Error handling
+	# Target score is out of range
+	if ((score <= SCORE_MAX) | (score > SCORE_MIN)).any(): raise ValueError('Target score must be in ({}, {}].'.format(SCORE_MAX, SCORE_MIN))
+
+	eui = np.where(
+		score >= SCORE_M,
+		eui_m - (score - SCORE_M) / (SCORE_MIN - SCORE_M) * (eui_m - eui_min),
+		eui_max - (score - SCORE_MAX) / (SCORE_M - SCORE_MAX) * (eui_max - eui_m),
+	)
+
+	# Targets within a segment without width cannot be reached
+	mask_unreachable = ((score > SCORE_M) & ~(eui_m > eui_min)) | ((score < SCORE_M) & ~(eui_max > eui_m))
+	eui              = np.where(mask_unreachable, np.nan, eui)
+
+	return _to_output(eui)
+
+def calc_ec_target(eui, e_p, e_n, e_t, a_es_comm):
+
+	"""
+	This method is used to get the annual energy consumption of an adjusted EUI, inverting calc_eui_adjusted().
+	===========================================================================================
+
+	Arguments:
+
+		eui (float or array-like): Adjusted EUI (EUI*)
+
+		e_p, e_n, e_t, a_es_comm (float or array-like): As in calc_eui_adjusted()
+
+	Output:
+
+		ec_annual (float or numpy.ndarray): Annual energy consumption
+	"""
+
+	eui, e_p, e_n, e_t, a_es_comm = (np.asarray(i, dtype=float) for i in (eui, e_p, e_n, e_t, a_es_comm))
+
+	return _to_output(eui * a_es_comm + e_p + e_n + e_t)
+
+def solve_target_ec(df_result, list_target, dict_grade=None, score_function=None, tol=1e-9, max_iter=200):
+
+	"""
+	This method is used to get the annual energy consumption reaching each target score, for every building at once.
+	===========================================================================================
+
+	Arguments:
+
+		df_result (pandas.DataFrame): Scored results (estimate_portfolio(), sweep_scenarios(), or records of run_buildings())
+			with est_eui_min, est_eui_m, est_eui_max, est_eui, est_e_p, est_e_n, est_e_t and est_a_es_comm
+
+		list_target (list): Target scores, or grades if dict_grade is given
+
+		dict_grade (dict): Minimum score of each grade. Default is None (targets are scores)
+
+		score_function (callable): Monotone decreasing score function f(eui, eui_min, eui_m, eui_max) on arrays.
+			Default is None (calc_score, solved in closed form)
+
+		tol (float): Tolerance on EUI* of the bisection. Default is 1e-9
+
+		max_iter (int): Maximum number of bisection steps. Default is 200
+
+	Output:
+
+		df_target (pandas.DataFrame): One row per (building, target) with eui_target, ec_target, ec_reduction
+			(annual EC to save, 0 if the target is already reached) and ec_reduction_ratio (of the current annual EC).
+			Targets the scale of a building cannot reach are NaN
+	"""
+
+	list_target = list(list_target)
+
+	# Error handling
+	# Grade is not defined
+	if (dict_grade is not None) and any(i not in dict_grade for i in list_target): raise ValueError('Grade {} is not defined.'.format([i for i in list_target if (i not in dict_grade)][0]))
+
+	# Targets along the second axis, buildings along the first
+	score = np.array([dict_grade[i] if (dict_grade is not None) else i for i in list_target], dtype=float)[None, :]
+	eui_min, eui_m, eui_max, eui, e_p, e_n, e_t, a_es_comm = (
+		df_result[i].to_numpy(dtype=float)[:, None]
+		for i in ('est_eui_min', 'est_eui_m', 'est_eui_max', 'est_eui', 'est_e_p', 'est_e_n', 'est_e_t', 'est_a_es_comm')
+	)
+
+	if (score_function is None): eui_target = calc_eui_target(score, eui_min, eui_m, eui_max)
+	else: eui_target = _bisect_eui(score_function, score, eui_min, eui_m, eui_max, tol, max_iter)
+
+	# Current and target annual EC, from the adjusted EUI of the results
+	ec_annual = calc_ec_target(eui, e_p, e_n, e_t, a_es_comm)
+	ec_target = calc_ec_target(eui_target, e_p, e_n, e_t, a_es_comm)
+
+	with np.errstate(divide='ignore', invalid='ignore'):
+
+		ec_reduction = np.where(np.isnan(ec_annual), np.nan, np.maximum(ec_annual - ec_target, 0.0))
+		ratio        = ec_reduction / ec_annual
+
+	df_target = pd.DataFrame({
+		'eui_target'         : np.broadcast_to(eui_target, ec_reduction.shape).ravel(),
+		'ec_target'          : np.broadcast_to(ec_target, ec_reduction.shape).ravel(),
+		'ec_reduction'       : ec_reduction.ravel(),
+		'ec_reduction_ratio' : ratio.ravel(),
+	}, index=pd.MultiIndex.from_product([df_result.index, list_target], names=[df_result.index.name, 'target']))
+
+	return df_target
+
+def score_result(df_result, ec_annual=np.nan, ec_other=np.nan, building_uc=None):
+
+	"""
+	This method is used to add the EUI scale, the adjusted EUI and the score to estimation results.
+	===========================================================================================
+
+	Arguments:
+
+		df_result (pandas.DataFrame): Results with building_uc, est_a_es_comm, est_aeui_*, est_leui_*, est_eeui_m, est_e_n and est_e_t
+
+		ec_annual (float or array-like): Annual energy consumption of each row. Default is NaN (not scored)
+
+		ec_other (float or array-like): Energy consumption of other special uses of each row. NaN is 0
+
+		building_uc (float or array-like): Urban coefficient of each row. Default is the building_uc column
+
+	Output:
+
+		df_result (pandas.DataFrame): df_result with est_eui_min, est_eui_m, est_eui_max, est_e_p, est_eui and est_score
+	"""
+
+	if (building_uc is None): building_uc = df_result['building_uc']
+
+	for stat in ('min', 'm', 'max'):
+
+		df_result['est_eui_{}'.format(stat)] = calc_eui_scale(building_uc, df_result['est_aeui_{}'.format(stat)], df_result['est_leui_{}'.format(stat)], df_result['est_eeui_m'])
+
+	df_result['est_e_p']   = np.nan_to_num(np.broadcast_to(np.asarray(ec_other, dtype=float), (df_result.shape[0],)), nan=0.0)
+	df_result['est_eui']   = calc_eui_adjusted(np.broadcast_to(np.asarray(ec_annual, dtype=float), (df_result.shape[0],)), df_result['est_e_p'], df_result['est_e_n'], df_result['est_e_t'], df_result['est_a_es_comm'])
+	df_result['est_score'] = calc_score(df_result['est_eui'], df_result['est_eui_min'], df_result['est_eui_m'], df_result['est_eui_max'])
+
+	return df_result
+
+def _bisect_eui(score_function, score, eui_min, eui_m, eui_max, tol, max_iter):
+
+	# Bracket wider than the scale, where the score is saturated at both ends
+	span = np.abs(eui_max - eui_min) + 1.0
+	lo   = np.broadcast_to(eui_min - span, np.broadcast_shapes(score.shape, eui_min.shape)).copy()
+	hi   = np.broadcast_to(eui_max + span, lo.shape).copy()
+
+	# A scale with a zero-width segment scores NaN below it, so the bracket starts at its first scored point
+	for eui_start in (eui_min, eui_m):
+
+		lo = np.where(np.isnan(score_function(lo, eui_min, eui_m, eui_max)), eui_start, lo)
+
+	# Targets out of reach at the low end are NaN. Targets reached at the high end are at most hi
+	mask_reach = score_function(lo, eui_min, eui_m, eui_max) >= score
+	mask_done  = score_function(hi, eui_min, eui_m, eui_max) >= score
+
+	# Largest EUI* whose score reaches the target
+	for _ in range(max_iter):
+
+		if (np.nanmax(hi - lo, initial=0.0) <= tol): break
+
+		mid = 0.5 * (lo + hi)
+		ok  = score_function(mid, eui_min, eui_m, eui_max) >= score
+		lo  = np.where(ok, mid, lo)
+		hi  = np.where(ok, hi, mid)
+
+	return np.where(mask_done, hi, np.where(mask_reach, lo, np.nan))
+
+def _to_output(array):
+
+	# Scalars for one building, arrays for many
+	return array if (array.ndim > 0) else float(array)
@@ -0,0 +1,467 @@
+"""
+Local asyncio estimation service with request micro-batching.
+
+Concurrent requests are collected into micro-batches of at most max_batch_size requests, waiting at
+most max_wait seconds after the first one. Each batch is estimated at once by estimate_portfolio() on
+a process pool whose workers keep the reference data and the town layer loaded, so the event loop is
+never blocked. Specifications are validated once before they are batched, so that a response does
+not depend on the batch. A batch with an invalid building is split in halves until the invalid
+building is estimated alone, so that one request cannot fail the others. NaN values are returned as
+null.
+
+Run on localhost:
+
+	python -m dependency.algorithm_bers.service --port 8765
+
+Endpoints:
+ - POST /estimate: A building specification (dict of Building arguments with optional building_id,
+   energysection as a list of records, elevator and escalator as lists of dict), or a list of them.
+   The response is one record (or a list of records) as in run_buildings()
+ - GET /health: Status and number of pending requests
+
+Abbreviation:
+ - es: Energy Section
+ - n: Number
+"""
+
+import concurrent.futures
+import argparse
+import asyncio
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .portfolio import estimate_portfolio
+from .runner import estimate_building, _init_worker, _get_geocode_cache_config
+from .reference_data import get_dict_estimation_system
+
+# Arguments of a specification that are not columns of df_building
+LIST_SPEC_PART = ['building_id', 'energysection', 'elevator', 'escalator', 'building_coordinate']
+
+DICT_STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}
+
+class EstimationService():
+
+	"""
+	This class is used to serve building estimation with micro-batching on a process pool.
+	"""
+
+	def __init__(self, max_batch_size=256, max_wait=0.005, max_workers=None, load_geocoder=True):
+
+		"""
+		This method is used to initialize the service.
+		===========================================================================================
+
+		Arguments:
+
+			max_batch_size (int): Maximum number of requests per batch. Default is 256
+
+			max_wait (float): Maximum wait in seconds between the first request of a batch and its estimation. Default is 0.005
+
+			max_workers (int): Number of worker processes. Default is the number of CPUs
+
+			load_geocoder (bool): Load the town layer in every worker at start-up. Default is True
+		"""
+
+		# Error handling
+		# Batch size is not positive
+		if (max_batch_size < 1): raise ValueError('max_batch_size must be positive.')
+
+		self.max_batch_size = max_batch_size
+		self.max_wait       = max_wait
+		self.max_workers    = max_workers if (max_workers is not None) else (os.cpu_count() or 1)
+		self.load_geocoder  = load_geocoder
+
+		self.n_request      = 0
+		self.n_batch        = 0
+		self._queue         = None
+		self._semaphore     = None
+		self._executor      = None
+		self._task_batcher  = None
+		self._set_task      = set()
+		self._server        = None
+
+	async def start(self):
+
+		"""
+		This method is used to start the worker pool and the batcher, and to warm up every worker.
+		"""
+
+		loop = asyncio.get_running_loop()
+
+		self._queue     = asyncio.Queue()
+		self._executor  = concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker, initargs=(self.load_geocoder, False, _get_geocode_cache_config(), get_dict_estimation_system()))
+		self._semaphore = asyncio.Semaphore(2 * self.max_workers)
+
+		# Start every worker now, so that the first requests do not pay for loading the reference data
+		await asyncio.gather(*[loop.run_in_executor(self._executor, os.getpid) for _ in range(self.max_workers)])
+
+		self._task_batcher = asyncio.create_task(self._run_batcher())
+
+		return
+
+	async def stop(self):
+
+		"""
+		This method is used to stop the server and the batcher, finish the batches in flight and stop the worker pool.
+		Requests not batched yet fail.
+		"""
+
+		if (self._server is not None):
+
+			self._server.close()
+			await self._server.wait_closed()
+
+		if (self._task_batcher is not None):
+
+			self._task_batcher.cancel()
+
+			try: await self._task_batcher
+			except asyncio.CancelledError: pass
+
+		# Batches in flight are answered before the worker pool stops
+		if (len(self._set_task) > 0): await asyncio.gather(*self._set_task, return_exceptions=True)
+
+		while (self._queue is not None) and (not self._queue.empty()):
+
+			_, future = self._queue.get_nowait()
+			if (not future.done()): future.set_exception(RuntimeError('Service is stopped.'))
+
+		# The worker pool is joined off the event loop
+		if (self._executor is not None): await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown, True)
+
+		return
+
+	async def serve(self, host='127.0.0.1', port=8765):
+
+		"""
+		This method is used to start the service and listen for HTTP requests.
+		===========================================================================================
+
+		Arguments:
+
+			host (str): Host. Default is 127.0.0.1
+
+			port (int): Port. 0 picks a free port. Default is 8765
+
+		Output:
+
+			port (int): Port listened on
+		"""
+
+		await self.start()
+
+		self._server = await asyncio.start_server(self._handle_connection, host, port)
+
+		return self._server.sockets[0].getsockname()[1]
+
+	async def estimate(self, spec):
+
+		"""
+		This method is used to estimate one building through the next micro-batch.
+		===========================================================================================
+
+		Arguments:
+
+			spec (dict): Building specification
+
+		Output:
+
+			record (dict): building_id, building_type, location, building_cz, building_uc and est_* values, or building_id and error
+		"""
+
+		future = asyncio.get_running_loop().create_future()
+		self._queue.put_nowait((spec, future))
+		self.n_request += 1
+
+		return await future
+
+	async def _run_batcher(self):
+
+		loop  = asyncio.get_running_loop()
+		batch = []
+
+		try:
+
+			while True:
+
+				batch    = [await self._queue.get()]
+				deadline = loop.time() + self.max_wait
+
+				# Collect requests until the batch is full or the oldest request has waited max_wait
+				while (len(batch) < self.max_batch_size):
+
+					if (not self._queue.empty()):
+
+						batch.append(self._queue.get_nowait())
+
+						continue
+
+					timeout = deadline - loop.time()
+					if (timeout <= 0): break
+
+					try: batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+					except asyncio.TimeoutError: break
+
+				# Bound the number of batches in flight, keeping them referenced until done
+				await self._semaphore.acquire()
+
+				task = asyncio.create_task(self._run_batch(batch))
+				self._set_task.add(task)
+				task.add_done_callback(self._set_task.discard)
+
+				batch = []
+
+		# Requests collected when the service stops are not estimated
+		except asyncio.CancelledError:
+
+			for _, future in batch:
+
+				if (not future.done()): future.set_exception(RuntimeError('Service is stopped.'))
+
+			raise
+
+	async def _run_batch(self, batch):
+
+		try:
+
+			self.n_batch += 1
+			list_record   = await asyncio.get_running_loop().run_in_executor(self._executor, estimate_batch, [i[0] for i in batch])
+
+			for (_, future), record in zip(batch, list_record):
+
+				if (not future.done()): future.set_result(record)
+
+		except Exception as e:
+
+			for _, future in batch:
+
+				if (not future.done()): future.set_exception(e)
+
+		finally:
+
+			self._semaphore.release()
+
+	async def _handle_connection(self, reader, writer):
+
+		# Minimal HTTP/1.1 with keep-alive
+		try:
+
+			while True:
+
+				line_request = await reader.readline()
+				if (not line_request): break
+
+				method, path = line_request.decode('latin-1').split(' ')[:2]
+
+				dict_header = {}
+				while True:
+
+					line = await reader.readline()
+					if (line in (b'\r\n', b'\n', b'')): break
+
+					key, value = line.decode('latin-1').split(':', 1)
+					dict_header[key.strip().lower()] = value.strip()
+
+				body = await reader.readexactly(int(dict_header.get('content-length', 0)))
+
+				status, payload = await self._route(method, path, body)
+				content         = json.dumps(_to_finite(payload), default=_to_json, ensure_ascii=False, allow_nan=False).encode('utf-8')
+
+				writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n\r\n'.format(status, DICT_STATUS[status], len(content)).encode('latin-1') + content)
+				await writer.drain()
+
+				if (dict_header.get('connection', '').lower() == 'close'): break
+
+		except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+
+			pass
+
+		finally:
+
+			writer.close()
+
+	async def _route(self, method, path, body):
+
+		if (method == 'GET') and (path == '/health'): return 200, {'status': 'ok', 'n_request': self.n_request, 'n_batch': self.n_batch, 'n_pending': self._queue.qsize()}
+
+		if (method != 'POST') or (path != '/estimate'): return 404, {'error': 'Not found.'}
+
+		try: spec = json.loads(body)
+		except ValueError: return 400, {'error': 'Invalid JSON.'}
+
+		try:
+
+			if (isinstance(spec, list)): return 200, list(await asyncio.gather(*[self.estimate(i) for i in spec]))
+
+			return 200, await self.estimate(spec)
+
+		except Exception as e:
+
+			return 500, {'error': '{}: {}'.format(type(e).__name__, e)}
+
+def estimate_batch(list_spec):
+
+	"""
+	This method is used to estimate a batch of building specifications at once.
+	===========================================================================================
+
+	Arguments:
+
+		list_spec (list): Building specifications
+
+	Output:
+
+		list_record (list): One record per specification, as in run_buildings()
+	"""
+
+	# Specifications are validated before they are batched, so that a record does not depend on the batch
+	list_record, list_position, list_valid = [None] * len(list_spec), [], []
+
+	for position, spec in enumerate(list_spec):
+
+		try: list_valid.append(normalize_spec(spec))
+		except ValueError as e: list_record[position] = {'building_id': spec.get('building_id'), 'error': '{}: {}'.format(type(e).__name__, e)}
+		else: list_position.append(position)
+
+	for position, record in zip(list_position, _estimate_batch(list_valid) if (len(list_valid) > 0) else []): list_record[position] = record
+
+	return list_record
+
+def normalize_spec(spec):
+
+	"""
+	This method is used to validate a building specification and convert it into Building arguments.
+	===========================================================================================
+
+	Arguments:
+
+		spec (dict): Building specification
+
+	Output:
+
+		spec (dict): Building specification with energysection as a DataFrame and elevator and escalator as lists
+	"""
+
+	spec = dict(spec)
+
+	# Error handling
+	# Building information for estimation is not defined
+	if (spec.get('estimation_system') is None) or (spec.get('building_type') is None): raise ValueError('Building information for estimation is not defined.')
+
+	# Building location is not defined
+	if (spec.get('building_coordinate') is None) and (spec.get('building_address_county') is None) and (spec.get('building_address_town') is None): raise ValueError('Building location is not defined.')
+
+	# Number of stories is not a number
+	for k in ('building_n_stories_above_ground', 'building_n_stories_below_ground'):
+
+		if (isinstance(spec.get(k), bool)) or (not isinstance(spec.get(k), (int, float, np.number))) or (not np.isfinite(spec[k])): raise ValueError('{} must be a number.'.format(k))
+
+	# Energy sections are not defined
+	if (spec.get('energysection') is None): raise ValueError('Energy sections are not defined.')
+
+	# Energy sections as a DataFrame, read once for a file path
+	if (isinstance(spec['energysection'], str)): spec['energysection'] = pd.read_csv(spec['energysection'])
+	elif (not isinstance(spec['energysection'], pd.DataFrame)): spec['energysection'] = pd.DataFrame(spec['energysection'])
+
+	spec['elevator']  = list(spec.get('elevator') or [])
+	spec['escalator'] = list(spec.get('escalator') or [])
+
+	return spec
+
+def _estimate_batch(list_spec):
+
+	try:
+
+		df_building, df_es, df_elevator, df_escalator = to_portfolio(list_spec)
+		df_result = estimate_portfolio(df_building, df_es, df_elevator, df_escalator, column_id='_position')
+
+	# One invalid building fails the whole portfolio, so each half is estimated as a portfolio again until the
+	# invalid building is alone, and it is then estimated on its own to report its error
+	except Exception:
+
+		if (len(list_spec) == 1): return [estimate_building(list_spec[0])]
+
+		n_half = len(list_spec) // 2
+
+		return _estimate_batch(list_spec[:n_half]) + _estimate_batch(list_spec[n_half:])
+
+	return [{'building_id': spec.get('building_id'), **record} for spec, record in zip(list_spec, df_result.to_dict('records'))]
+
+def to_portfolio(list_spec):
+
+	"""
+	This method is used to convert building specifications into the tables of estimate_portfolio().
+	===========================================================================================
+
+	Arguments:
+
+		list_spec (list): Building specifications, as returned by normalize_spec()
+
+	Output:
+
+		df_building, df_es, df_elevator, df_escalator (pandas.DataFrame): Portfolio tables keyed by _position
+	"""
+
+	list_building, list_es, list_elevator, list_escalator = [], [], [], []
+
+	for position, spec in enumerate(list_spec):
+
+		row = {k: v for k, v in spec.items() if (k not in LIST_SPEC_PART)}
+		row['_position'] = position
+
+		if (spec.get('building_coordinate') is not None): row['building_lon'], row['building_lat'] = spec['building_coordinate']
+
+		list_building.append(row)
+		list_es.append(pd.DataFrame(spec['energysection']).assign(_position=position))
+		list_elevator   += [dict(i, _position=position) for i in spec.get('elevator', [])]
+		list_escalator  += [dict(i, _position=position) for i in spec.get('escalator', [])]
+
+	df_building  = pd.DataFrame(list_building)
+	df_es        = pd.concat(list_es, ignore_index=True)
+	df_elevator  = pd.DataFrame(list_elevator) if (len(list_elevator) > 0) else None
+	df_escalator = pd.DataFrame(list_escalator) if (len(list_escalator) > 0) else None
+
+	return df_building, df_es, df_elevator, df_escalator
+
+def _to_finite(value):
+
+	# NaN and infinite values as null, which JSON parsers accept
+	if (isinstance(value, dict)): return {k: _to_finite(v) for k, v in value.items()}
+	if (isinstance(value, (list, tuple))): return [_to_finite(i) for i in value]
+	if (isinstance(value, np.generic)): value = value.item()
+	if (isinstance(value, float)) and (not np.isfinite(value)): return None
+
+	return value
+
+def _to_json(value):
+
+	if (isinstance(value, np.generic)): return value.item()
+
+	return str(value)
+
+async def _serve_forever(args):
+
+	service = EstimationService(args.max_batch_size, args.max_wait, args.max_workers, not args.skip_geocoder)
+	port    = await service.serve(args.host, args.port)
+
+	print('Serving on http://{}:{}'.format(args.host, port), flush=True)
+
+	try: await asyncio.Event().wait()
+	finally: await service.stop()
+
+if (__name__ == '__main__'):
+
+	parser = argparse.ArgumentParser(description='Local estimation service with request micro-batching.')
+	parser.add_argument('--host', type=str, default='127.0.0.1', help='Host')
+	parser.add_argument('--port', type=int, default=8765, help='Port')
+	parser.add_argument('--max_batch_size', type=int, default=256, help='Maximum number of requests per batch')
+	parser.add_argument('--max_wait', type=float, default=0.005, help='Maximum wait in seconds before a batch is estimated')
+	parser.add_argument('--max_workers', type=int, default=None, help='Number of worker processes')
+	parser.add_argument('--skip_geocoder', action='store_true', help='Do not load the town layer in the workers')
+	args = parser.parse_args()
+
+	try: asyncio.run(_serve_forever(args))
+	except KeyboardInterrupt: pass
@@ -0,0 +1,305 @@
+"""
+Monte Carlo uncertainty of the EUI score scale and the energy consumption of exclusive sections.
+
+Section-level EUIs are drawn from triangular distributions on the EUI criteria: AEUI between
+aeui_min, aeui_m (mode) and aeui_max, LEUI between leui_min, leui_m and leui_max. The AEUI and LEUI
+of a section share one uniform draw, so LEUI stays consistent with AEUI. Optional input noise is a
+relative triangular noise with mode 1 on section areas (noise_area) and on the usage fields of
+exclusive sections (noise_usage, one draw per field and sample).
+
+Samples are drawn in chunks and reduced at once into fixed-range histograms, so memory does not
+depend on the number of samples. The range of each output is bounded analytically, and quantiles are
+interpolated within one of n_bin bins, i.e. within (max - min) / n_bin of the exact sample quantile.
+
+Abbreviation:
+ - a: Area
+ - es: Energy Section
+ - cz: Climate Zone
+ - n: Number
+ - q: Quantile
+"""
+
+import numpy as np
+import pandas as pd
+
+from .reference_data import get_registry, use_estimation_system, _with_estimation_system
+from .building_basic import _get_en_term
+from .portfolio import get_usage_portfolio, locate_portfolio
+
+# Building-level outputs with uncertainty
+LIST_OUTPUT = ['est_a_es_comm', 'est_aeui', 'est_leui', 'est_eeui', 'est_e_n']
+
+@_with_estimation_system
+def estimate_uncertainty(building, n_sample=100000, quantiles=(0.05, 0.5, 0.95), noise_area=0.0, noise_usage=0.0, df_es=None, chunksize=65536, n_bin=10000, seed=None):
+
+	"""
+	This method is used to estimate the uncertainty of the outputs of a building by Monte Carlo sampling.
+	===========================================================================================
+
+	Arguments:
+
+		building (Building): Building to sample
+
+		n_sample (int): Number of samples. Default is 100000
+
+		quantiles (list): Quantiles of the outputs. Default is (0.05, 0.5, 0.95)
+
+		noise_area (float): Relative bound of the noise on section areas. Default is 0
+
+		noise_usage (float): Relative bound of the noise on usage fields of exclusive sections. Default is 0
+
+		df_es (pandas.DataFrame): Energy sections. Default is energysection of the building
+
+		chunksize (int): Number of samples drawn at once. Default is 65536
+
+		n_bin (int): Number of histogram bins per output. Default is 10000
+
+		seed (int): Seed of the random generator
+
+	Output:
+
+		df_result (pandas.DataFrame): One row per output of LIST_OUTPUT with mean, min, max and q<quantile> columns
+	"""
+
+	# Read section tables
+	if (df_es is None): df_es = building.energysection
+	if (isinstance(df_es, str)): df_es = pd.read_csv(df_es)
+
+	# Error handling
+	# Energy sections are not defined
+	if (df_es is None): raise ValueError('Energy sections are not defined.')
+
+	df_es_comm = get_registry().join_eui_criteria(df_es[df_es['Section_Type']=='common'], building.building_cz)
+	df_es_exc  = df_es[df_es['Section_Type']=='exclusive']
+
+	# Error handling
+	# aeui_min, aeui_m, or aeui_max include NaN
+	if (df_es_comm[['aeui_min', 'aeui_m', 'aeui_max']].isna().values.any()): raise ValueError('aeui_min, aeui_m, or aeui_max include NaN.')
+
+	df_usage = pd.DataFrame([{i: getattr(building, i) for i in get_registry().list_es_exclusive_field}])
+	term     = _get_en_term(df_es_exc, df_usage)
+
+	return _sample(df_es_comm, term, n_sample, quantiles, noise_area, noise_usage, chunksize, n_bin, np.random.default_rng(seed))
+
+def estimate_uncertainty_portfolio(df_building, df_es, n_sample=100000, quantiles=(0.05, 0.5, 0.95), noise_area=0.0, noise_usage=0.0, column_id='building_id', chunksize=65536, n_bin=10000, seed=None):
+
+	"""
+	This method is used to estimate the uncertainty of the outputs of many buildings, one building at a time.
+	===========================================================================================
+
+	Arguments:
+
+		df_building (pandas.DataFrame): Buildings as in estimate_portfolio()
+
+		df_es (pandas.DataFrame): Energy sections with column_id, Section_Type, Section_ID, Area and AC_Type
+
+		n_sample (int): Number of samples per building. Default is 100000
+
+		quantiles (list): Quantiles of the outputs. Default is (0.05, 0.5, 0.95)
+
+		noise_area (float): Relative bound of the noise on section areas. Default is 0
+
+		noise_usage (float): Relative bound of the noise on usage fields of exclusive sections. Default is 0
+
+		column_id (str): Column of the building ID. Default is building_id
+
+		chunksize (int): Number of samples drawn at once. Default is 65536
+
+		n_bin (int): Number of histogram bins per output. Default is 10000
+
+		seed (int or numpy.random.Generator): Seed of the random generator
+
+	Output:
+
+		df_result (pandas.DataFrame): One row per building, indexed by building ID, with <output>_<statistic> columns
+	"""
+
+	# Error handling
+	# Building ID is not unique
+	if (df_building[column_id].duplicated().any()): raise ValueError('{} of df_building is not unique.'.format(column_id))
+
+	rng = np.random.default_rng(seed)
+
+	# Buildings are sampled system by system, each with the reference tables of its system, from one random stream
+	if ('estimation_system' in df_building) and (df_building['estimation_system'].nunique(dropna=False) > 1):
+
+		list_result = [
+			estimate_uncertainty_portfolio(df_group, df_es[df_es[column_id].isin(df_group[column_id])], n_sample, quantiles, noise_area, noise_usage, column_id, chunksize, n_bin, rng)
+			for _, df_group in df_building.groupby('estimation_system', sort=False, dropna=False)
+		]
+
+		return pd.concat(list_result).reindex(pd.Index(df_building[column_id]))
+
+	estimation_system = df_building['estimation_system'].iloc[0] if ('estimation_system' in df_building) and (df_building.shape[0] > 0) else None
+
+	with use_estimation_system(estimation_system if (isinstance(estimation_system, str)) else None):
+
+		return _estimate_uncertainty_portfolio(df_building, df_es, n_sample, quantiles, noise_area, noise_usage, column_id, chunksize, n_bin, rng)
+
+def _estimate_uncertainty_portfolio(df_building, df_es, n_sample, quantiles, noise_area, noise_usage, column_id, chunksize, n_bin, rng):
+
+	df_building = df_building.set_index(column_id, drop=False)
+	df_location = locate_portfolio(df_building)
+
+	# EUI criteria and exclusive section terms of every building, looked up once
+	df_es_comm = df_es[df_es['Section_Type']=='common']
+	df_es_comm = get_registry().join_eui_criteria(df_es_comm, df_es_comm[column_id].map(df_location['building_cz']).values)
+	df_es_exc  = df_es[df_es['Section_Type']=='exclusive']
+
+	# Error handling
+	# aeui_min, aeui_m, or aeui_max include NaN
+	mask_nan = df_es_comm[['aeui_min', 'aeui_m', 'aeui_max']].isna().any(axis=1)
+	if (mask_nan.any()): raise ValueError('aeui_min, aeui_m, or aeui_max include NaN for building {}.'.format(df_es_comm.loc[mask_nan, column_id].values[0]))
+
+	df_usage = get_usage_portfolio(df_building)
+	term     = _get_en_term(df_es_exc, df_usage, column_id)
+
+	dict_idx_comm = df_es_comm.groupby(column_id, sort=False).indices
+	dict_idx_exc  = df_es_exc.groupby(column_id, sort=False).indices
+	empty         = np.empty(0, dtype=np.int64)
+
+	list_record = []
+	for building_id in df_building.index:
+
+		df_result = _sample(
+			df_es_comm.iloc[dict_idx_comm.get(building_id, empty)],
+			{k: v[dict_idx_exc.get(building_id, empty)] for k, v in term.items()},
+			n_sample, quantiles, noise_area, noise_usage, chunksize, n_bin, rng,
+		)
+		list_record.append({'{}_{}'.format(output, stat): value for output, row in df_result.iterrows() for stat, value in row.items()})
+
+	return pd.DataFrame(list_record, index=df_building.index)
+
+def _sample(df_es_comm, term, n_sample, quantiles, noise_area, noise_usage, chunksize, n_bin, rng):
+
+	# Error handling
+	# Number of samples is not positive
+	if (n_sample <= 0): raise ValueError('n_sample must be positive.')
+
+	area = df_es_comm['Area'].to_numpy(dtype=float)
+	eui  = {i: df_es_comm[i].to_numpy(dtype=float) for i in ('aeui_min', 'aeui_m', 'aeui_max', 'leui_min', 'leui_m', 'leui_max', 'eeui_m')}
+
+	# Usage fields drawn once per sample and shared by the sections using them
+	list_field         = sorted(set(i for i in term['field_usage'] if (i is not None)) | set(i for i in term['field_quantity'] if (i != 'Area')))
+	idx_field_usage    = np.array([list_field.index(i) if (i is not None) else -1 for i in term['field_usage']], dtype=np.int64)
+	idx_field_quantity = np.array([list_field.index(i) if (i != 'Area') else -1 for i in term['field_quantity']], dtype=np.int64)
+	mask_area_exc      = term['field_quantity'] == 'Area'
+
+	# Range of each output
+	dict_bound = {
+		'est_a_es_comm' : (area.sum() * (1 - noise_area), area.sum() * (1 + noise_area)),
+		'est_aeui'      : _get_bound(eui['aeui_min'], eui['aeui_max']),
+		'est_leui'      : _get_bound(eui['leui_min'], eui['leui_max']),
+		'est_eeui'      : _get_bound(eui['eeui_m'], eui['eeui_m']),
+		'est_e_n'       : _get_bound(
+			np.nansum(_calc_en(term, 1 - noise_usage, 1 - noise_area)),
+			np.nansum(_calc_en(term, 1 + noise_usage, 1 + noise_area)),
+		),
+	}
+	dict_stat = {i: _Histogram(*dict_bound[i], n_bin) for i in LIST_OUTPUT}
+
+	for start in range(0, n_sample, chunksize):
+
+		n_chunk = min(chunksize, n_sample - start)
+
+		# =========================================================================================
+		#
+		# EUI score scale
+		#
+		# =========================================================================================
+
+		area_sample = area * _draw_noise(rng, (n_chunk, area.shape[0]), noise_area)
+		u           = rng.random((n_chunk, area.shape[0]))
+		a_es_comm   = area_sample.sum(axis=1)
+
+		dict_stat['est_a_es_comm'].add(a_es_comm)
+		dict_stat['est_aeui'].add(np.einsum('ij,ij->i', area_sample, _ppf_triangular(u, eui['aeui_min'], eui['aeui_m'], eui['aeui_max'])) / a_es_comm)
+		dict_stat['est_leui'].add(np.einsum('ij,ij->i', area_sample, _ppf_triangular(u, eui['leui_min'], eui['leui_m'], eui['leui_max'])) / a_es_comm)
+		dict_stat['est_eeui'].add(area_sample.dot(eui['eeui_m']) / a_es_comm)
+
+		# =========================================================================================
+		#
+		# Energy consumption of exclusive sections
+		#
+		# =========================================================================================
+
+		# The last column is no noise, for sections without a usage field
+		noise_field    = np.concatenate([_draw_noise(rng, (n_chunk, len(list_field)), noise_usage), np.ones((n_chunk, 1))], axis=1)
+		noise_area_exc = _draw_noise(rng, (n_chunk, term['eui'].shape[0]), noise_area)
+
+		coef_usage    = noise_field[:, idx_field_usage]
+		coef_quantity = np.where(idx_field_quantity >= 0, noise_field[:, idx_field_quantity], np.where(mask_area_exc, noise_area_exc, 1.0))
+
+		dict_stat['est_e_n'].add(np.nansum(_calc_en(term, coef_usage, coef_quantity), axis=1))
+
+	return pd.DataFrame({i: dict_stat[i].get_statistic(quantiles) for i in LIST_OUTPUT}).T
+
+class _Histogram():
+
+	def __init__(self, value_min, value_max, n_bin):
+
+		self.value_min = value_min
+		self.value_max = value_max
+		self.n_bin     = n_bin
+		self.count     = np.zeros(n_bin, dtype=np.int64)
+		self.sum       = 0.0
+		self.min       = np.inf
+		self.max       = -np.inf
+
+	def add(self, values):
+
+		values = values[~np.isnan(values)]
+		if (values.shape[0] == 0): return
+
+		# Values outside the range (e.g. negative coefficients) fall into the end bins
+		width   = self.value_max - self.value_min
+		idx_bin  = np.zeros(values.shape[0], dtype=np.int64) if (not width > 0) else \
+			np.clip(((values - self.value_min) * (self.n_bin / width)).astype(np.int64), 0, self.n_bin - 1)
+
+		self.count += np.bincount(idx_bin, minlength=self.n_bin)
+		self.sum   += values.sum()
+		self.min    = min(self.min, values.min())
+		self.max    = max(self.max, values.max())
+
+	def get_statistic(self, quantiles):
+
+		n = self.count.sum()
+
+		if (n == 0): return pd.Series({'mean': np.nan, 'min': np.nan, 'max': np.nan, **{'q{:g}'.format(q): np.nan for q in quantiles}})
+
+		# Linear interpolation within the bin holding each quantile
+		cdf      = np.cumsum(self.count)
+		target   = np.asarray(quantiles, dtype=float) * n
+		idx_bin  = np.minimum(np.searchsorted(cdf, target, side='left'), self.n_bin - 1)
+		cdf_prev = np.where(idx_bin > 0, cdf[idx_bin - 1], 0)
+		fraction = np.divide(target - cdf_prev, self.count[idx_bin], out=np.zeros(target.shape[0]), where=self.count[idx_bin] > 0)
+		value    = np.clip(self.value_min + (idx_bin + fraction) * (self.value_max - self.value_min) / self.n_bin, self.min, self.max)
+
+		return pd.Series({'mean': self.sum / n, 'min': self.min, 'max': self.max, **{'q{:g}'.format(q): v for q, v in zip(quantiles, value)}})
+
+def _calc_en(term, coef_usage, coef_quantity):
+
+	return (term['eui'] * (term['usage'] * coef_usage) + term['offset']) * (term['quantity'] * coef_quantity) * term['days'] * term['factor']
+
+def _draw_noise(rng, shape, noise):
+
+	if (noise <= 0) or (shape[1] == 0): return np.ones(shape)
+
+	return _ppf_triangular(rng.random(shape), 1 - noise, 1.0, 1 + noise)
+
+def _ppf_triangular(u, a, m, b):
+
+	# Inverse CDF of the triangular distribution. Degenerate bounds (a == m or a == b) are allowed.
+	a, m, b = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(m, dtype=float), np.asarray(b, dtype=float))
+	width   = b - a
+	c       = np.divide(m - a, width, out=np.zeros(width.shape), where=width > 0)
+
+	return np.where(u < c, a + np.sqrt(u * width * (m - a)), b - np.sqrt((1 - u) * width * (b - m)))
+
+def _get_bound(value_min, value_max):
+
+	value_min, value_max = np.atleast_1d(value_min), np.atleast_1d(value_max)
+
+	if (value_min.shape[0] == 0): return 0.0, 0.0
+
+	return float(min(np.nanmin(value_min), np.nanmin(value_max))), float(max(np.nanmax(value_min), np.nanmax(value_max)))
@@ -1,14 +1,16 @@
 import dependency.algorithm_bers as algorithm_bers
+import os
 
 if (__name__ == '__main__'):
 
 	# Create a building object
-	building_1 = algorithm_bers.building(
+	building_1 = algorithm_bers.Building(
 		estimation_system='BERSe',
 		building_type='B2',
 		building_n_stories_above_ground=15,
 		building_n_stories_below_ground=3,
 		building_coordinate=(121.53811771789655, 25.027638292217627),
+		energysection=os.path.dirname(os.path.abspath(__file__)) + '/../input/building_config/energysection.test.ver1.csv',
 	)
 
 	# Create elevator
@@ -0,0 +1,119 @@
+"""
+Shared fixtures of the tests. The package is imported from src, as main.py does.
+
+Abbreviation:
+ - es: Energy Section
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import shutil
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+PATH_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'dependency', 'data')
+
+@pytest.fixture
+def town_geocoder():
+
+	# Synthetic 2x2 town layer with towns of the reference tables
+	import shapely
+
+	from dependency.algorithm_bers.geocoder import TownGeocoder
+
+	df_town = pd.DataFrame({
+		'COUNTYNAME' : ['臺北市', '臺北市', '臺中市', '臺中市'],
+		'TOWNNAME'   : ['中山區', '北投區', '霧峰區', '沙鹿區'],
+		'TOWNCODE'   : ['1', '2', '3', '4'],
+		'geometry'   : [shapely.box(120, 22, 121, 23), shapely.box(121, 22, 122, 23), shapely.box(120, 23, 121, 24), shapely.box(121, 23, 122, 24)],
+	})
+
+	return TownGeocoder(df_town)
+
+@pytest.fixture
+def estimation_system_alt(tmp_path, monkeypatch):
+
+	# Another version of the reference tables with a 10% higher EEUI, registered as BERSe_alt for the test only
+	from dependency.algorithm_bers import reference_data
+
+	path_data = str(tmp_path / 'data_alt')
+	shutil.copytree(PATH_DATA, path_data, ignore=shutil.ignore_patterns('_compiled', 'gis_layer'))
+
+	for path_file in ('eui_criteria/eui_criteria.m.csv', 'eui_criteria/eui_criteria.max.csv'):
+
+		df = pd.read_csv(os.path.join(path_data, path_file))
+		df['EEUI'] *= 1.1
+		df.to_csv(os.path.join(path_data, path_file), index=False)
+
+	monkeypatch.setattr(reference_data, '_dict_estimation_system', dict(reference_data._dict_estimation_system))
+	monkeypatch.setattr(reference_data, '_dict_registry', dict(reference_data._dict_registry))
+	reference_data.register_estimation_system('BERSe_alt', path_data)
+
+	return path_data
+
+@pytest.fixture
+def portfolio():
+
+	# Buildings located by address, with common and exclusive sections, elevators and escalators
+	df_building = pd.DataFrame({
+		'building_id'                     : ['b0', 'b1', 'b2', 'b3'],
+		'building_type'                   : ['B2', 'H1', 'B3', 'B2'],
+		'building_address_county'         : ['臺北市', '高雄市', '臺中市', '臺北市'],
+		'building_address_town'           : ['中山區', '前鎮區', '霧峰區', '北投區'],
+		'building_n_stories_above_ground' : [15, 10, 5, 8],
+		'building_n_stories_below_ground' : [3, 2, 1, 1],
+		'n_hotelroom'                     : [120, 80, 0, 10],
+		'coef_usage_hotelroom'            : [0.7, 0.6, 0.0, 0.5],
+		'a_dining'                        : [300.0, 100.0, 0.0, 50.0],
+		'n_dining_meal_per_day'           : [2, 3, 0, 1],
+		'coef_power_cabinetrack'          : [0.3, 0.3, 0.3, 0.3],
+		'ec_annual'                       : [9.9e5, np.nan, 1.4e5, 2.3e5],
+	})
+
+	df_es = pd.DataFrame([
+		('b0', 'common', 'B2', 5000.0, 'continue'),
+		('b0', 'common', 'J1', 1200.0, 'continue'),
+		('b0', 'exclusive', 'N8', 300.0, None),
+		('b1', 'common', 'H1', 3000.0, 'continue'),
+		('b1', 'exclusive', 'N4-1', 150.0, None),
+		('b2', 'common', 'B3', 800.0, 'interval'),
+		('b2', 'common', 'J1', 400.0, 'continue'),
+		('b3', 'common', 'B2', 2500.0, 'continue'),
+		('b3', 'exclusive', 'N8', 100.0, None),
+	], columns=['building_id', 'Section_Type', 'Section_ID', 'Area', 'AC_Type'])
+
+	df_elevator = pd.DataFrame([
+		dict(building_id='b0', elevator_bottom_floor=-2, elevator_top_floor=14, elevator_es=['B2', 'J1'], coef_people_per_elevator=13, coef_load_per_elevator=900, coef_speed=105),
+		dict(building_id='b1', elevator_bottom_floor=-1, elevator_top_floor=9, elevator_es=['H1'], coef_people_per_elevator=8, coef_load_per_elevator=600, coef_speed=60),
+	])
+
+	df_escalator = pd.DataFrame([
+		dict(building_id='b0', escalator_elevate_height=4.5, escalator_width=1.0, escalator_es=['B2']),
+	])
+
+	return df_building, df_es, df_elevator, df_escalator
+
+def to_building(df_building, df_es, df_elevator, df_escalator, building_id):
+
+	"""
+	This method is used to create the Building of one row of a portfolio.
+	"""
+
+	from dependency.algorithm_bers import Building
+
+	row      = df_building.set_index('building_id').loc[building_id]
+	building = Building(
+		estimation_system='BERSe',
+		energysection=df_es[df_es['building_id']==building_id].drop(columns='building_id').reset_index(drop=True),
+		coef_usage_hotelroom=row['coef_usage_hotelroom'],
+		ec_annual=row['ec_annual'] if (pd.notna(row['ec_annual'])) else None,
+		**{k: (v.item() if (isinstance(v, np.generic)) else v) for k, v in row.items() if (k not in ('coef_usage_hotelroom', 'ec_annual'))},
+	)
+
+	for i in df_elevator[df_elevator['building_id']==building_id].drop(columns='building_id').to_dict('records'): building.create_elevator(**i)
+	for i in df_escalator[df_escalator['building_id']==building_id].drop(columns='building_id').to_dict('records'): building.create_escalator(**i)
+
+	return building
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dependency.algorithm_bers import estimate_portfolio
+from dependency.algorithm_bers.building_table import BuildingTable
+
+from conftest import to_building
+
+def _assert_same_result(df_result, df_expected):
+
+	assert df_result.index.tolist() == df_expected.index.tolist()
+
+	for column in df_expected:
+
+		if (column.startswith('est_')): assert np.allclose(df_result[column], df_expected[column], rtol=0, atol=0, equal_nan=True), column
+		else: assert (df_result[column] == df_expected[column]).all(), column
+
+def _to_list(values):
+
+	# Values with NaN as None, for comparison
+	return [None if (np.isscalar(i)) and (pd.isna(i)) else i for i in values]
+
+def test_portfolio_round_trip(portfolio):
+
+	df_building, df_es, df_elevator, df_escalator = portfolio
+	table = BuildingTable.from_portfolio(df_building, df_es, df_elevator, df_escalator)
+
+	assert len(table) == 4
+
+	df_building_table, df_es_table, df_elevator_table, df_escalator_table = table.to_portfolio()
+
+	# Same values under the same columns
+	for df_table, df in ((df_building_table, df_building), (df_es_table, df_es), (df_elevator_table, df_elevator), (df_escalator_table, df_escalator)):
+
+		assert df_table['building_id'].tolist() == df['building_id'].tolist()
+
+		for column in df:
+
+			assert _to_list(df_table[column]) == _to_list(df[column]), column
+
+	with pytest.raises(ValueError):
+
+		BuildingTable.from_portfolio(pd.concat([df_building, df_building.iloc[:1]]), df_es)
+
+def test_table_matches_building(portfolio):
+
+	df_building, df_es, df_elevator, df_escalator = portfolio
+	table     = BuildingTable.from_portfolio(df_building, df_es, df_elevator, df_escalator)
+	df_result = table.estimate()
+
+	_assert_same_result(df_result, estimate_portfolio(df_building, df_es, df_elevator, df_escalator))
+
+	for i, building_id in enumerate(df_building['building_id']):
+
+		building = table.to_building(i)
+		building.estimate()
+
+		expected = to_building(df_building, df_es, df_elevator, df_escalator, building_id)
+		expected.estimate()
+
+		assert len(building.elevator) == len(expected.elevator)
+		assert len(building.escalator) == len(expected.escalator)
+
+		for k, v in vars(expected).items():
+
+			if (not k.startswith('est_')): continue
+
+			assert np.isclose(getattr(building, k), v, rtol=0, atol=0, equal_nan=True), (building_id, k)
+			assert np.isclose(df_result.loc[building_id, k], v, rtol=1e-12, atol=0, equal_nan=True), (building_id, k)
+
+def test_buildings_round_trip(portfolio):
+
+	df_building, df_es, df_elevator, df_escalator = portfolio
+	list_building = [to_building(df_building, df_es, df_elevator, df_escalator, i) for i in df_building['building_id']]
+
+	table = BuildingTable.from_buildings(list_building, df_building['building_id'].tolist())
+
+	_assert_same_result(table.estimate(), estimate_portfolio(df_building, df_es, df_elevator, df_escalator))
+
+	# Buildings of the table estimate as the buildings they were made from
+	for building, expected in zip(table.to_buildings(), list_building):
+
+		building.estimate()
+		expected.estimate()
+
+		for k, v in vars(expected).items():
+
+			if (k.startswith('est_')): assert np.isclose(getattr(building, k), v, rtol=0, atol=0, equal_nan=True), k
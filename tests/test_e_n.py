@@ -0,0 +1,140 @@
+import pandas as pd
+import pytest
+import shutil
+import os
+
+from dependency.algorithm_bers import Building, estimate_portfolio, reference_data
+
+from conftest import PATH_DATA
+
+AREA = 250.0
+
+DICT_USAGE = {
+	'n_hotelroom'            : 120,
+	'coef_usage_hotelroom'   : 0.7,
+	'n_hospitalbed'          : 30,
+	'coef_usage_hospitalbed' : 0.8,
+	'a_dining'               : 300.0,
+	'n_dining_meal_per_day'  : 2,
+	'coef_power_cabinetrack' : 0.3,
+}
+
+# YOH of N7 is the one of L6-1
+df_operation = pd.read_csv(os.path.join(PATH_DATA, 'coef_es_operation', 'coef_es_operation.csv'))
+YOH_N7       = df_operation.loc[df_operation['Energy_Section'].str.split('. ').str[0]=='L6-1', 'YOH'].values[0]
+
+# Formulas of each exclusive section before the coefficients moved to coef_es_exclusive.csv
+DICT_BASELINE = {
+	'N1-1-1' : 330 * AREA,
+	'N1-1-2' : 250 * AREA,
+	'N1-2-1' : 665 * AREA,
+	'N1-2-2' : 530 * AREA,
+	'N1-3-1' : 1318 * AREA,
+	'N1-3-2' : 900 * AREA,
+	'N1-4-1' : 989 * AREA,
+	'N1-4-2' : 675 * AREA,
+	'N1-5'   : 387 * AREA,
+	'N1-6'   : 1500 * AREA,
+	'N1-7'   : 530 * AREA,
+	'N3-1-1' : 26.7 * AREA,
+	'N3-1-2' : 35.3 * AREA,
+	'N3-2-1' : 21.3 * AREA,
+	'N3-2-2' : 29.9 * AREA,
+	'N3-3-1' : 41.9 * AREA,
+	'N4-1'   : 3.2 * AREA,
+	'N4-2'   : 6.1 * AREA,
+	'N4-3'   : 80.0 * AREA,
+	'N5'     : 545 * AREA,
+	'N6'     : 910 * AREA,
+	'N2-1-1' : DICT_USAGE['n_hotelroom'] * 5.85 * 365 * DICT_USAGE['coef_usage_hotelroom'] * 2.0,
+	'N2-1-2' : DICT_USAGE['n_hotelroom'] * 3.85 * 365 * DICT_USAGE['coef_usage_hotelroom'] * 1.5,
+	'N2-2'   : DICT_USAGE['n_hospitalbed'] * 0.93 * 365 * DICT_USAGE['coef_usage_hospitalbed'] * 1.5,
+	'N2-1-3' : DICT_USAGE['a_dining'] * 0.09 * DICT_USAGE['n_dining_meal_per_day'] * 365 * 0.7 * 1.5,
+	'N7'     : 0.124 * AREA * YOH_N7 * 1.5,
+	'N8'     : (2630 * DICT_USAGE['coef_power_cabinetrack'] + 51) * AREA,
+	'N9'     : 0.0,
+	'N10'    : 0.0,
+	'N12'    : 0.0,
+}
+
+def _get_es(section_id):
+
+	return pd.DataFrame([
+		('common', 'B2', 1000.0, 'continue'),
+		('exclusive', section_id, AREA, None),
+	], columns=['Section_Type', 'Section_ID', 'Area', 'AC_Type'])
+
+def _get_building(section_id):
+
+	return Building(
+		estimation_system='BERSe',
+		building_type='B2',
+		building_n_stories_above_ground=5,
+		building_n_stories_below_ground=1,
+		building_address_county='臺北市',
+		building_address_town='中山區',
+		energysection=_get_es(section_id),
+		**DICT_USAGE,
+	)
+
+@pytest.mark.parametrize('section_id', list(DICT_BASELINE))
+def test_e_n_matches_baseline(section_id):
+
+	building = _get_building(section_id)
+	building.estimate()
+
+	assert building.est_e_n == pytest.approx(DICT_BASELINE[section_id], rel=1e-12, abs=1e-9)
+
+	df_building = pd.DataFrame([dict(building_id='b', estimation_system='BERSe', building_type='B2', building_address_county='臺北市', building_address_town='中山區', **DICT_USAGE)])
+	df_result   = estimate_portfolio(df_building, _get_es(section_id).assign(building_id='b'))
+
+	assert df_result.loc['b', 'est_e_n'] == pytest.approx(DICT_BASELINE[section_id], rel=1e-12, abs=1e-9)
+
+def test_every_exclusive_section_is_covered():
+
+	df_exclusive = pd.read_csv(os.path.join(PATH_DATA, 'coef_es_exclusive', 'coef_es_exclusive.csv'))
+
+	assert set(df_exclusive['Section_ID']) == set(DICT_BASELINE)
+
+def test_n11_is_rejected():
+
+	with pytest.raises(ValueError, match='N11'):
+
+		_get_building('N11').estimate()
+
+def test_new_exclusive_field_is_used(tmp_path, monkeypatch):
+
+	# Exclusive section added to the tables, with usage fields no other section uses
+	path_data = str(tmp_path / 'data_pool')
+	shutil.copytree(PATH_DATA, path_data, ignore=shutil.ignore_patterns('_compiled', 'gis_layer'))
+
+	path_file = os.path.join(path_data, 'coef_es_exclusive', 'coef_es_exclusive.csv')
+	df        = pd.read_csv(path_file)
+	df.loc[df.shape[0]] = {'Class': 2, 'Section_ID': 'N13', 'EUI': 3.0, 'Usage': 'coef_usage_r_swimmingpool', 'Quantity': 'volume_swimmingpool', 'Days': 365}
+	df.to_csv(path_file, index=False)
+
+	monkeypatch.setattr(reference_data, '_dict_estimation_system', dict(reference_data._dict_estimation_system))
+	monkeypatch.setattr(reference_data, '_dict_registry', dict(reference_data._dict_registry))
+	reference_data.register_estimation_system('BERSe_pool', path_data)
+
+	dict_pool = {'coef_usage_swimmingpool': 0.6, 'volume_swimmingpool': 400.0}
+	en        = 3.0 * 0.6 * 400.0 * 365
+
+	building = Building(
+		estimation_system='BERSe_pool',
+		building_type='B2',
+		building_n_stories_above_ground=5,
+		building_n_stories_below_ground=1,
+		building_address_county='臺北市',
+		building_address_town='中山區',
+		energysection=_get_es('N13'),
+		**dict_pool,
+	)
+	building.estimate()
+
+	assert building.est_e_n == pytest.approx(en, rel=1e-12)
+
+	df_building = pd.DataFrame([dict(building_id='b', estimation_system='BERSe_pool', building_type='B2', building_address_county='臺北市', building_address_town='中山區', **dict_pool)])
+	df_result   = estimate_portfolio(df_building, _get_es('N13').assign(building_id='b'))
+
+	assert df_result.loc['b', 'est_e_n'] == pytest.approx(en, rel=1e-12)
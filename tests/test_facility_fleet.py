@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+import pytest
+import os
+
+from dependency.algorithm_bers import FacilityElevator, FacilityEscalator
+from dependency.algorithm_bers.building_basic import get_coef_usage_h, get_coef_usage_h_array
+from dependency.algorithm_bers.facility_fleet import VerticalTransportFleet, match_facility_ec_elevator, match_facility_power_escalator
+
+from conftest import PATH_DATA
+
+df_elevator_coef  = pd.read_csv(os.path.join(PATH_DATA, 'coef_facility', 'coef_facility_ec_elevator.csv'))
+df_escalator_coef = pd.read_csv(os.path.join(PATH_DATA, 'coef_facility', 'coef_facility_power_escalator.csv'))
+df_operation      = pd.read_csv(os.path.join(PATH_DATA, 'coef_es_operation', 'coef_es_operation.csv'))
+
+LIST_ES = sorted(df_operation['Energy_Section'].str.split('. ').str[0].unique()) + ['N7']
+
+# =========================================================================================
+#
+# Per-object matching before the tables moved to arrays
+#
+# =========================================================================================
+
+def _match_elevator_baseline(n_stories_total, n_people, n_load, speed):
+
+	df_coef = df_elevator_coef.loc[(df_elevator_coef['Stories_min']<=n_stories_total) & (df_elevator_coef['Stories_max']>=n_stories_total)].copy()
+
+	df_coef['key_sorting'] = \
+		(np.array(df_coef['n_People'])-n_people)**2 + \
+		1e-2*(np.array(df_coef['n_Load'])-n_load)**2 + \
+		0.5*(np.array(df_coef['Speed'])-speed)**2
+
+	return df_coef.loc[df_coef['key_sorting']==df_coef['key_sorting'].min(), 'FLE'].values[0]
+
+def _match_escalator_baseline(elevate_height, width):
+
+	df_coef = df_escalator_coef.loc[(df_escalator_coef['Elevate_min']<=elevate_height) & (df_escalator_coef['Elevate_max']>elevate_height)].copy()
+
+	df_coef['key_sorting'] = (np.array(df_coef['Width'])-width)
+
+	return df_coef.loc[df_coef['key_sorting']==df_coef['key_sorting'].min(), 'Power'].values[0]
+
+def _get_coef_usage_h_baseline(es, es_sub=1):
+
+	if (es == 'N7'): es = 'L6-1'
+
+	if (es != 'J4'): df_coef = df_operation.loc[df_operation['Energy_Section'].str.split('. ').str[0]==es, 'YOH']
+	else: df_coef = df_operation.loc[(df_operation['Energy_Section'].str.split('. ').str[0]==es) & (df_operation['Sub-section'].str.split('. ').str[0]==str(es_sub)), 'YOH']
+
+	return df_coef.values[0]
+
+def _get_grid(values):
+
+	# Values of the table, midpoints between them and values beyond them
+	values = np.unique(values)
+
+	return np.unique(np.concatenate([values, (values[1:] + values[:-1]) / 2, [values[0] - 1, values[-1] + 1]]))
+
+def test_elevator_matches_baseline():
+
+	rng = np.random.default_rng(0)
+
+	# Sample of the grid around every row of the table, and every row itself
+	grid = [np.array([-2, 0, 1, 5, 6, 7, 12, 16, 17, 25, 30, 31, 60]), _get_grid(df_elevator_coef['n_People']), _get_grid(df_elevator_coef['n_Load']), _get_grid(df_elevator_coef['Speed'])]
+	n_stories_total, n_people, n_load, speed = (np.concatenate([rng.choice(i, 1000), df_elevator_coef[column].clip(0, 60).to_numpy(dtype=float)]) for i, column in zip(grid, ('Stories_max', 'n_People', 'n_Load', 'Speed')))
+
+	coef_fle = match_facility_ec_elevator(n_stories_total, n_people, n_load, speed)
+
+	assert coef_fle.tolist() == [_match_elevator_baseline(*i) for i in zip(n_stories_total, n_people, n_load, speed)]
+
+def test_escalator_matches_baseline():
+
+	elevate_height, width = (i.ravel() for i in np.meshgrid(_get_grid(np.r_[df_escalator_coef['Elevate_min'], df_escalator_coef['Elevate_max']].clip(-10, 10)), _get_grid(df_escalator_coef['Width'])))
+
+	coef_power = match_facility_power_escalator(elevate_height, width)
+
+	assert coef_power.tolist() == [_match_escalator_baseline(*i) for i in zip(elevate_height, width)]
+
+@pytest.mark.parametrize('es_sub', [1, 2, 3])
+def test_yoh_matches_baseline(es_sub):
+
+	coef_usage_h = [_get_coef_usage_h_baseline(i, es_sub) for i in LIST_ES]
+
+	# Sections without YOH are NaN in both
+	assert np.array_equal(get_coef_usage_h_array(LIST_ES, es_sub), coef_usage_h, equal_nan=True)
+	assert np.array_equal([get_coef_usage_h(i, es_sub) for i in LIST_ES], coef_usage_h, equal_nan=True)
+
+	for es in ('X1', 'N11'):
+
+		with pytest.raises(ValueError):
+
+			get_coef_usage_h_array(LIST_ES + [es], es_sub)
+
+		with pytest.raises(ValueError):
+
+			get_coef_usage_h(es, es_sub)
+
+# Units whose sections all lack YOH have NaN YOH, as np.nanmax of the objects
+@pytest.mark.filterwarnings('ignore:All-NaN slice')
+def test_fleet_matches_objects():
+
+	rng           = np.random.default_rng(0)
+	building_type = pd.Series(['B2', 'H1', 'B4', 'G1', 'A1'], index=['b{}'.format(i) for i in range(5)])
+
+	df_elevator = pd.DataFrame({
+		'building_id'              : rng.choice(building_type.index, 300),
+		'elevator_bottom_floor'    : rng.integers(-5, 1, 300),
+		'elevator_top_floor'       : rng.integers(2, 45, 300),
+		'elevator_floor_offset'    : rng.choice([0, 1, np.nan], 300),
+		'coef_eff'                 : rng.choice([1.0, 0.8, np.nan], 300),
+		'coef_people_per_elevator' : rng.choice(_get_grid(df_elevator_coef['n_People']), 300),
+		'coef_load_per_elevator'   : rng.choice(_get_grid(df_elevator_coef['n_Load']), 300),
+		'coef_speed'               : rng.choice(_get_grid(df_elevator_coef['Speed']), 300),
+		'elevator_es'              : [list(rng.choice(LIST_ES, rng.integers(1, 4), replace=False)) for _ in range(300)],
+	})
+
+	df_escalator = pd.DataFrame({
+		'building_id'              : rng.choice(building_type.index, 100),
+		'escalator_elevate_height' : rng.uniform(2.0, 8.0, 100).round(1),
+		'escalator_width'          : rng.choice([0.6, 0.8, 1.0], 100),
+		'coef_eff'                 : rng.choice([1.0, 0.9], 100),
+		'escalator_es'             : [list(rng.choice(LIST_ES, rng.integers(1, 3), replace=False)) for _ in range(100)],
+	})
+
+	fleet = VerticalTransportFleet(df_elevator, df_escalator, building_type)
+
+	# One object per unit, with the arguments that are given
+	list_elevator  = [FacilityElevator(building_type=building_type[i.pop('building_id')], **{k: v for k, v in i.items() if not (np.isscalar(v) and pd.isna(v))}) for i in df_elevator.to_dict('records')]
+	list_escalator = [FacilityEscalator(building_type=building_type[i.pop('building_id')], **i) for i in df_escalator.to_dict('records')]
+
+	fleet_object = VerticalTransportFleet.from_facility(list_elevator, list_escalator)
+
+	for attribute in ('coef_usage_r', 'coef_facility', 'coef_eff', 'coef_usage_h'):
+
+		assert np.array_equal(getattr(fleet, attribute), getattr(fleet_object, attribute), equal_nan=True), attribute
+
+	assert fleet.coef_facility.tolist() == [i.coef_facility_ec for i in list_elevator] + [i.coef_facility_power for i in list_escalator]
+
+	# Energy consumption by building, as the sum over the objects of each building
+	e_t = pd.Series(fleet_object.calc_e_t_unit(), index=np.r_[df_elevator['building_id'], df_escalator['building_id']]).groupby(level=0).sum()
+
+	pd.testing.assert_series_equal(fleet.calc_e_t(), e_t, rtol=1e-12)
@@ -0,0 +1,179 @@
+import concurrent.futures
+import numpy as np
+import pytest
+
+from dependency.algorithm_bers import instrumentation
+from dependency.algorithm_bers.geocoder_cache import GeocodeCache
+
+class CountingGeocoder():
+
+	"""
+	This class is used to count the coordinates a geocoder locates.
+	"""
+
+	def __init__(self, geocoder):
+
+		self.geocoder   = geocoder
+		self.list_count = []
+
+	def locate(self, lons, lats):
+
+		self.list_count.append(len(lons))
+
+		return self.geocoder.locate(lons, lats)
+
+@pytest.fixture
+def path_layer(tmp_path):
+
+	# Town layer whose files only fingerprint the cache
+	path_layer = str(tmp_path / 'town.shp')
+
+	with open(path_layer, 'wb') as f: f.write(b'layer')
+
+	return path_layer
+
+@pytest.fixture
+def geocoder(town_geocoder):
+
+	return CountingGeocoder(town_geocoder)
+
+@pytest.fixture
+def instrumentation_enabled():
+
+	instrumentation.enable_instrumentation()
+	instrumentation.reset_instrumentation()
+
+	yield
+
+	instrumentation.disable_instrumentation()
+
+def _open(tmp_path, path_layer, geocoder, **kwargs):
+
+	return GeocodeCache(str(tmp_path / 'geocode.sqlite'), path_layer=path_layer, geocoder=geocoder, **kwargs)
+
+def test_hit_and_miss(tmp_path, path_layer, geocoder, town_geocoder, instrumentation_enabled):
+
+	lons = np.array([120.5, 121.5, 120.5, 130.0])
+	lats = np.array([22.5, 22.5, 22.5, 22.5])
+
+	geocode_cache = _open(tmp_path, path_layer, geocoder)
+	value         = geocode_cache.locate(lons, lats)
+
+	# Distinct coordinates are located once, including the one outside every town
+	assert geocoder.list_count == [3]
+	assert len(geocode_cache) == 3
+	assert instrumentation.get_instrumentation()['counter']['geocode_cache_miss'] == 4
+
+	for value_cache, value_geocoder in zip(value, town_geocoder.locate(lons, lats)):
+
+		assert (value_cache == value_geocoder).all()
+
+	# The same coordinates are read from the file by another cache
+	geocode_cache.close()
+	instrumentation.reset_instrumentation()
+
+	geocode_cache = _open(tmp_path, path_layer, geocoder)
+
+	for value_cache, value_first in zip(geocode_cache.locate(lons, lats), value):
+
+		assert (value_cache == value_first).all()
+
+	assert geocoder.list_count == [3]
+	assert instrumentation.get_instrumentation()['counter']['geocode_cache_hit'] == 4
+	assert instrumentation.get_instrumentation()['counter']['geocode_cache_miss'] == 0
+
+	with pytest.raises(ValueError):
+
+		geocode_cache.locate_point(130.0, 22.5)
+
+def test_rounding(tmp_path, path_layer, geocoder):
+
+	geocode_cache = _open(tmp_path, path_layer, geocoder, precision=2)
+
+	# 120.501 and 120.504 round to the same key, 120.506 does not
+	geocode_cache.locate([120.501, 120.504, 120.506], [22.5, 22.5, 22.5])
+
+	assert geocoder.list_count == [2]
+	assert len(geocode_cache) == 2
+
+	_, _, _, mask_hit = geocode_cache.lookup([120.5, 120.51, 120.52], [22.504, 22.496, 22.5])
+
+	assert mask_hit.tolist() == [True, True, False]
+
+	# Coordinates are located at their rounded value
+	assert geocode_cache.locate_point(120.504, 22.5) == geocode_cache.locate_point(120.5, 22.5)
+	assert geocoder.list_count == [2]
+
+	with pytest.raises(ValueError):
+
+		geocode_cache.locate(np.nan, 22.5)
+
+def test_lru_eviction(tmp_path, path_layer, geocoder):
+
+	geocode_cache = _open(tmp_path, path_layer, geocoder, max_entries=2)
+
+	geocode_cache.locate(120.5, 22.5)
+	geocode_cache.locate(121.5, 22.5)
+
+	# Using the first entry makes the second one the least recently used
+	geocode_cache.locate(120.5, 22.5)
+	geocode_cache.locate(120.5, 23.5)
+
+	_, _, _, mask_hit = geocode_cache.lookup([120.5, 121.5, 120.5], [22.5, 22.5, 23.5])
+
+	assert len(geocode_cache) == 2
+	assert mask_hit.tolist() == [True, False, True]
+
+	with pytest.raises(ValueError):
+
+		_open(tmp_path, path_layer, geocoder, max_entries=0)
+
+def test_layer_change_clears_cache(tmp_path, path_layer, geocoder):
+
+	geocode_cache = _open(tmp_path, path_layer, geocoder)
+	geocode_cache.locate([120.5, 121.5], [22.5, 22.5])
+	geocode_cache.close()
+
+	# Same layer and precision keep the entries
+	geocode_cache = _open(tmp_path, path_layer, geocoder)
+
+	assert len(geocode_cache) == 2
+
+	geocode_cache.close()
+
+	# Another precision drops them
+	geocode_cache = _open(tmp_path, path_layer, geocoder, precision=4)
+
+	assert len(geocode_cache) == 0
+
+	geocode_cache.locate([120.5, 121.5], [22.5, 22.5])
+	geocode_cache.close()
+
+	# A new town layer drops them
+	with open(path_layer, 'ab') as f: f.write(b' updated')
+
+	geocode_cache = _open(tmp_path, path_layer, geocoder, precision=4)
+
+	assert len(geocode_cache) == 0
+
+def test_shared_by_threads(tmp_path, path_layer, geocoder, town_geocoder):
+
+	rng  = np.random.default_rng(0)
+	lons = np.round(rng.uniform(120.0, 122.0, 2000), 3)
+	lats = np.round(rng.uniform(22.0, 24.0, 2000), 3)
+
+	geocode_cache = _open(tmp_path, path_layer, geocoder)
+
+	# Overlapping chunks located from several threads
+	with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+
+		list_value = list(executor.map(lambda i: geocode_cache.locate(lons[i:i + 400], lats[i:i + 400]), range(0, 2000, 200)))
+
+	for i, value in zip(range(0, 2000, 200), list_value):
+
+		for value_cache, value_geocoder in zip(value, town_geocoder.locate(lons[i:i + 400], lats[i:i + 400])):
+
+			assert (value_cache == value_geocoder).all()
+
+	# Every coordinate is located once
+	assert sum(geocoder.list_count) == len(geocode_cache) == np.unique(np.stack([lons, lats], axis=1), axis=0).shape[0]
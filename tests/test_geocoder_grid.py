@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+import os
+
+from dependency.algorithm_bers import geocoder, geocoder_grid, geocoder_cache
+from dependency.algorithm_bers.reference_cache import DIR_CACHE, hash_reference_data
+
+@pytest.fixture
+def town_grid_path(tmp_path, monkeypatch, town_geocoder):
+
+	# The synthetic layer is the shared geocoder, and the grid is built at the default path
+	path_grid = str(tmp_path / DIR_CACHE / 'town_grid')
+
+	monkeypatch.setattr(geocoder, '_geocoder', town_geocoder)
+	monkeypatch.setattr(geocoder_grid, 'PATH_GRID_TOWN', path_grid)
+	monkeypatch.setattr(geocoder_grid, '_town_grid', None)
+	monkeypatch.setattr(geocoder_cache, '_geocode_cache', None)
+
+	geocoder_grid.build_town_grid(resolution=0.1, path_grid=path_grid, geocoder=town_geocoder)
+
+	return path_grid
+
+def test_grid_matches_geocoder(town_grid_path, town_geocoder):
+
+	rng  = np.random.default_rng(0)
+	lons = rng.uniform(119.8, 122.2, 5000)
+	lats = rng.uniform(21.8, 24.2, 5000)
+
+	town_grid = geocoder_grid.TownGrid(town_grid_path, geocoder=town_geocoder)
+
+	for value_grid, value_geocoder in zip(town_grid.locate(lons, lats), town_geocoder.locate(lons, lats)):
+
+		assert (value_grid == value_geocoder).all()
+
+def test_locator_uses_grid(town_grid_path, town_geocoder, monkeypatch):
+
+	locator = geocoder_cache.get_locator()
+	assert isinstance(locator, geocoder_grid.TownGrid)
+
+	# Interior cells are located without the geocoder
+	monkeypatch.setattr(geocoder, '_geocoder', None)
+	monkeypatch.setattr(geocoder_grid, 'get_geocoder', lambda: pytest.fail('geocoder loaded for an interior cell'))
+	assert locator.locate_point(120.55, 22.55) == ('臺北市', '中山區', '1')
+
+def test_locator_falls_back_on_boundary(town_grid_path, town_geocoder):
+
+	locator = geocoder_cache.get_locator()
+
+	# A point on a cell crossing the border between towns 1 and 2
+	county, town, towncode = locator.locate(np.array([120.999, 121.001]), np.array([22.5, 22.5]))
+	assert list(towncode) == ['1', '2']
+
+def test_stale_grid_is_ignored(town_grid_path, monkeypatch):
+
+	monkeypatch.setattr(geocoder_grid, 'hash_town_layer', lambda path_layer=None: 'another layer')
+
+	with pytest.raises(ValueError): geocoder_grid.TownGrid(town_grid_path)
+
+	assert geocoder_grid.get_town_grid() is None
+	assert isinstance(geocoder_cache.get_locator(), geocoder.TownGeocoder)
+
+def test_grid_does_not_invalidate_reference_data(tmp_path, town_geocoder):
+
+	path_data = str(tmp_path) + '/'
+	os.makedirs(path_data + 'gis_layer')
+	with open(path_data + 'gis_layer/table.csv', 'w') as f: f.write('a\n1\n')
+
+	hash_before = hash_reference_data(path_data)
+	geocoder_grid.build_town_grid(resolution=0.1, path_grid=path_data + DIR_CACHE + '/town_grid', geocoder=town_geocoder)
+
+	assert hash_reference_data(path_data) == hash_before
+	assert os.path.basename(os.path.dirname(geocoder_grid.PATH_GRID_TOWN)) == DIR_CACHE
@@ -0,0 +1,71 @@
+import subprocess
+import pytest
+import json
+import sys
+import os
+
+# Budget of the package import time in seconds, as the default of the benchmark
+IMPORT_BUDGET = 1.0
+
+LIST_MODULE_GIS = ['geopandas', 'shapely', 'pyproj', 'pyogrio', 'fiona']
+
+# Modules of the service and the geocode cache only
+LIST_MODULE_SERVICE = ['asyncio', 'sqlite3']
+
+CODE_ADDRESS_ONLY = '''
+import json, sys, time
+
+t = time.perf_counter()
+import dependency.algorithm_bers as algorithm_bers
+seconds = time.perf_counter() - t
+
+import pandas as pd
+
+building = algorithm_bers.Building(
+	estimation_system='BERSe',
+	building_type='B2',
+	building_n_stories_above_ground=10,
+	building_n_stories_below_ground=2,
+	building_address_county='臺北市',
+	building_address_town='中山區',
+	energysection=pd.DataFrame({'Section_Type': ['common'], 'Section_ID': ['B2'], 'Area': [1000.0], 'AC_Type': ['continue']}),
+)
+building.estimate()
+
+print(json.dumps({'seconds': seconds, 'module': [i for i in %r if (i in sys.modules)], 'module_service': [i for i in %r if (i in sys.modules)]}))
+''' % (LIST_MODULE_GIS, LIST_MODULE_SERVICE)
+
+def _run_address_only():
+
+	path_src = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+	output   = subprocess.run([sys.executable, '-c', CODE_ADDRESS_ONLY], capture_output=True, text=True, check=True, cwd=path_src)
+
+	return json.loads(output.stdout.strip().split('\n')[-1])
+
+def test_address_only_path_loads_no_gis_module():
+
+	assert _run_address_only()['module'] == []
+
+def test_address_only_path_loads_no_service_module():
+
+	assert _run_address_only()['module_service'] == []
+
+def test_lazy_attributes():
+
+	import dependency.algorithm_bers as algorithm_bers
+	from dependency.algorithm_bers import service, geocoder_cache, EstimationService, GeocodeCache, enable_geocode_cache, disable_geocode_cache
+
+	assert EstimationService is service.EstimationService
+	assert (GeocodeCache, enable_geocode_cache, disable_geocode_cache) == (geocoder_cache.GeocodeCache, geocoder_cache.enable_geocode_cache, geocoder_cache.disable_geocode_cache)
+	assert set(algorithm_bers.DICT_LAZY) <= set(dir(algorithm_bers))
+
+	with pytest.raises(AttributeError):
+
+		algorithm_bers.undefined
+
+def test_import_within_budget():
+
+	# The best of a few fresh interpreters, so that a cold disk cache does not fail the test
+	seconds = min(_run_address_only()['seconds'] for _ in range(3))
+
+	assert seconds <= IMPORT_BUDGET, 'Importing the package took {:.2f} s, over the budget of {} s.'.format(seconds, IMPORT_BUDGET)
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from dependency.algorithm_bers import instrumentation
+
+from conftest import to_building
+
+LIST_ELEVATOR = [
+	dict(elevator_bottom_floor=-2, elevator_top_floor=14, elevator_es=['B2', 'J1'], coef_people_per_elevator=13, coef_load_per_elevator=900, coef_speed=105),
+	dict(elevator_bottom_floor=-1, elevator_top_floor=30, elevator_es=['B2'], coef_people_per_elevator=20, coef_load_per_elevator=1350, coef_speed=240),
+	dict(elevator_bottom_floor=0, elevator_top_floor=5, elevator_es=['J1'], coef_people_per_elevator=6, coef_load_per_elevator=450, coef_speed=45),
+]
+
+def test_replaced_elevator_is_recomputed(portfolio):
+
+	building = to_building(*portfolio, 'b3')
+	building.estimate()
+
+	for kwargs in LIST_ELEVATOR:
+
+		# The freed elevator may leave its id to the new one
+		if (building.n_elevator > 0): building.elevator.pop()
+		building.n_elevator = len(building.elevator)
+		building.create_elevator(**kwargs)
+		building.estimate()
+
+		# A new building with the same elevator
+		other = to_building(*portfolio, 'b3')
+		other.create_elevator(**kwargs)
+		other.estimate()
+
+		assert building.est_e_t == other.est_e_t
+
+def test_changed_elevator_is_recomputed(portfolio):
+
+	building = to_building(*portfolio, 'b3')
+	building.create_elevator(**LIST_ELEVATOR[0])
+	building.estimate()
+	est_e_t = building.est_e_t
+
+	# Derived coefficients are part of the fingerprint
+	building.elevator[0].coef_usage_h *= 2
+	building.estimate()
+
+	assert building.est_e_t == pytest.approx(2 * est_e_t)
+
+def test_unchanged_building_is_not_recomputed(portfolio):
+
+	building = to_building(*portfolio, 'b0')
+	building.estimate()
+
+	instrumentation.enable_instrumentation()
+
+	try:
+
+		building.instrumentation = None
+		building.estimate()
+		dict_counter = building.instrumentation['counter']
+
+	finally:
+
+		instrumentation.disable_instrumentation()
+
+	# No coefficient is looked up again
+	assert dict_counter.get('coefficient_hit', 0) == 0
+
+@pytest.mark.parametrize('attribute, value', [
+	('building_address_town', '北投區'),
+	('n_hotelroom', 500),
+	('ec_annual', 9.0e5),
+])
+def test_changed_input_is_recomputed(portfolio, attribute, value):
+
+	building = to_building(*portfolio, 'b0')
+	building.estimate()
+
+	setattr(building, attribute, value)
+	building.estimate()
+
+	other = to_building(*portfolio, 'b0')
+	setattr(other, attribute, value)
+	if (attribute == 'building_address_town'): other._locate()
+	other.estimate()
+
+	for column in ('building_cz', 'building_uc', 'est_aeui_m', 'est_e_n', 'est_e_t', 'est_eui', 'est_score'):
+
+		value, value_other = getattr(building, column), getattr(other, column)
+		assert (value == value_other) or (np.isnan(value) and np.isnan(value_other)), column
+
+def test_changed_sections_are_recomputed(portfolio):
+
+	building = to_building(*portfolio, 'b0')
+	building.estimate()
+
+	df_es = building.energysection.copy()
+	df_es.loc[0, 'Area'] *= 2
+	building.energysection = df_es
+	building.estimate()
+
+	other = to_building(*portfolio, 'b0')
+	other.energysection = df_es
+	other.estimate()
+
+	assert building.est_a_es_comm == other.est_a_es_comm
+	assert building.est_aeui_m == other.est_aeui_m
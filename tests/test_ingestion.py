@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from dependency.algorithm_bers import iter_energysection, iter_energysection_batch
+
+def _write_sections(tmp_path, list_id, extension):
+
+	df_es = pd.DataFrame({
+		'building_id'  : list_id,
+		'Section_Type' : 'common',
+		'Section_ID'   : 'B2',
+		'Area'         : range(len(list_id)),
+		'AC_Type'      : 'continue',
+	})
+
+	path_file = str(tmp_path / 'es{}'.format(extension))
+	if (extension == '.csv'): df_es.to_csv(path_file, index=False)
+	else: df_es.to_parquet(path_file)
+
+	return path_file
+
+@pytest.mark.parametrize('extension', ['.csv', '.parquet'])
+@pytest.mark.parametrize('chunksize', [1, 2, 3, 8, 100])
+def test_buildings_are_whole(tmp_path, extension, chunksize):
+
+	list_id   = ['a'] * 5 + ['b'] + ['c'] * 10 + ['d'] * 2
+	path_file = _write_sections(tmp_path, list_id, extension)
+
+	list_building = [(building_id, df_es.shape[0]) for building_id, df_es in iter_energysection(path_file, chunksize=chunksize)]
+
+	assert list_building == [('a', 5), ('b', 1), ('c', 10), ('d', 2)]
+	assert sum(i.shape[0] for i in iter_energysection_batch(path_file, chunksize=chunksize)) == len(list_id)
+
+@pytest.mark.parametrize('chunksize', [1, 2, 3, 8, 100])
+def test_non_contiguous_rows_raise(tmp_path, chunksize):
+
+	# Rows of a reappear after whole chunks of other buildings
+	list_id   = ['a'] * 3 + ['b'] * 9 + ['c'] * 9 + ['a'] * 2
+	path_file = _write_sections(tmp_path, list_id, '.csv')
+
+	with pytest.raises(ValueError, match='not contiguous'): list(iter_energysection_batch(path_file, chunksize=chunksize))
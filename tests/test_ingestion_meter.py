@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dependency.algorithm_bers import aggregate_meter
+
+def _write_meter(tmp_path, df_meter, extension='.parquet'):
+
+	path_file = str(tmp_path / 'meter{}'.format(extension))
+	if (extension == '.csv'): df_meter.to_csv(path_file, index=False)
+	else: df_meter.to_parquet(path_file)
+
+	return path_file
+
+def _get_meter(list_id, start='2023-01-01', end='2024-01-01', freq='1h'):
+
+	# Hourly readings of a year, sorted by building
+	time = pd.date_range(start, end, freq=freq, inclusive='left')
+
+	return pd.concat([pd.DataFrame({'building_id': i, 'timestamp': time, 'ec': np.arange(time.shape[0], dtype=float) % 7 + 1}) for i in list_id], ignore_index=True)
+
+@pytest.mark.parametrize('extension', ['.csv', '.parquet'])
+def test_complete_year(tmp_path, extension):
+
+	df_meter  = _get_meter(['a', 'b'])
+	path_file = _write_meter(tmp_path, df_meter, extension)
+
+	df_annual, df_monthly = aggregate_meter(path_file, year=2023, chunksize=5000)
+
+	assert np.allclose(df_annual['ec_annual'], df_meter.groupby('building_id')['ec'].sum())
+	assert (df_annual['max_gap_hours'] == 0).all()
+	assert (df_annual['n_missing'] == 0).all()
+	assert df_monthly.shape[0] == 24
+
+def test_gap_between_readings(tmp_path):
+
+	df_meter  = _get_meter(['a']).drop(index=range(100, 125))
+	df_annual, _ = aggregate_meter(_write_meter(tmp_path, df_meter), year=2023)
+
+	assert df_annual.loc['a', 'max_gap_hours'] == 25.0
+	assert df_annual.loc['a', 'n_missing'] == 25
+
+def test_trailing_and_leading_gaps(tmp_path):
+
+	# Meter a stops on 2023-06-01, meter b starts on 2023-03-01
+	df_meter  = pd.concat([_get_meter(['a'], end='2023-06-01'), _get_meter(['b'], start='2023-03-01')], ignore_index=True)
+	df_annual, _ = aggregate_meter(_write_meter(tmp_path, df_meter), year=2023)
+
+	assert df_annual.loc['a', 'max_gap_hours'] == 5136.0
+	assert df_annual.loc['a', 'n_missing'] == 5136
+	assert df_annual.loc['b', 'max_gap_hours'] == 1416.0
+	assert df_annual['ec_annual'].isna().all()
+
+@pytest.mark.parametrize('chunksize', [2, 3, 1000])
+def test_time_major_export(tmp_path, chunksize):
+
+	# Readings sorted by time, so a chunk may hold one reading per building
+	df_meter  = _get_meter(['a', 'b', 'c'], end='2023-01-03').sort_values(['timestamp', 'building_id'], ignore_index=True)
+	df_annual, df_monthly = aggregate_meter(_write_meter(tmp_path, df_meter), chunksize=chunksize)
+
+	assert np.allclose(df_annual['ec_measured'], df_meter.groupby('building_id')['ec'].sum())
+	assert (df_annual['n_reading'] == 48).all()
+	assert (df_annual['max_gap_hours'] == 744 - 48).all()
+	assert (df_monthly['n_expected'] == 744).all()
+
+def test_duplicates_are_read_once(tmp_path):
+
+	df_meter  = _get_meter(['a'])
+	df_meter  = pd.concat([df_meter, df_meter.iloc[995:1005]]).sort_values('timestamp', kind='stable', ignore_index=True)
+	df_annual, _ = aggregate_meter(_write_meter(tmp_path, df_meter), year=2023, chunksize=1000)
+
+	assert df_annual.loc['a', 'n_duplicate'] == 10
+	assert df_annual.loc['a', 'ec_measured'] == pytest.approx(df_meter.drop_duplicates('timestamp')['ec'].sum())
+
+def test_interval_cannot_be_inferred(tmp_path):
+
+	df_meter = pd.DataFrame({'building_id': ['a', 'b'], 'timestamp': pd.to_datetime(['2023-01-01', '2023-01-02']), 'ec': [1.0, 2.0]})
+
+	with pytest.raises(ValueError, match='interval'):
+
+		aggregate_meter(_write_meter(tmp_path, df_meter))
+
+	df_annual, _ = aggregate_meter(_write_meter(tmp_path, df_meter), interval='1h')
+
+	assert df_annual['n_reading'].tolist() == [1, 1]
+
+def test_readings_out_of_order(tmp_path):
+
+	df_meter = _get_meter(['a'], end='2023-01-03').iloc[::-1]
+
+	with pytest.raises(ValueError, match='time order'):
+
+		aggregate_meter(_write_meter(tmp_path, df_meter), chunksize=10)
@@ -0,0 +1,87 @@
+import concurrent.futures
+import threading
+import asyncio
+import time
+import pandas as pd
+import pytest
+
+from dependency.algorithm_bers import instrumentation, Building
+
+@pytest.fixture(autouse=True)
+def enabled():
+
+	instrumentation.enable_instrumentation()
+	instrumentation.reset_instrumentation()
+
+	yield
+
+	instrumentation.disable_instrumentation()
+
+def test_disable_within_collect():
+
+	with instrumentation.collect() as collector:
+
+		instrumentation.count('a')
+		instrumentation.disable_instrumentation()
+
+	assert collector.counter['a'] == 1
+
+def test_collectors_are_per_thread():
+
+	barrier = threading.Barrier(2)
+
+	def work(n):
+
+		with instrumentation.collect() as collector:
+
+			barrier.wait()
+			for _ in range(n): instrumentation.count('a')
+			barrier.wait()
+
+		return collector.counter['a']
+
+	with concurrent.futures.ThreadPoolExecutor(2) as executor: list_n = list(executor.map(work, [3, 5]))
+
+	assert list_n == [3, 5]
+	assert instrumentation.get_instrumentation()['counter']['a'] == 8
+
+def test_collectors_are_per_task():
+
+	async def work(n):
+
+		with instrumentation.collect() as collector:
+
+			for _ in range(n):
+
+				instrumentation.count('a')
+				await asyncio.sleep(0)
+
+		return collector.counter['a']
+
+	async def main(): return await asyncio.gather(work(2), work(7))
+
+	assert asyncio.run(main()) == [2, 7]
+
+def test_locate_is_not_counted_in_eui_scale(monkeypatch):
+
+	building = Building(
+		estimation_system='BERSe',
+		building_type='B2',
+		building_n_stories_above_ground=10,
+		building_n_stories_below_ground=2,
+		building_address_county='臺北市',
+		building_address_town='中山區',
+		energysection=pd.DataFrame({'Section_Type': ['common'], 'Section_ID': ['B2'], 'Area': [1000.0], 'AC_Type': ['continue']}),
+	)
+	building.estimate()
+
+	# A slow location, recomputed by the next estimate()
+	get_climatezone = Building._get_climatezone
+	monkeypatch.setattr(Building, '_get_climatezone', lambda self, county, town: (time.sleep(0.2), get_climatezone(self, county, town))[1])
+
+	building.building_address_town = '北投區'
+	building.instrumentation = None
+	building.estimate()
+
+	assert building.instrumentation['stage_seconds']['locate'] >= 0.2
+	assert building.instrumentation['stage_seconds']['eui_scale'] < 0.2
@@ -0,0 +1,59 @@
+import numpy as np
+
+from dependency.algorithm_bers import estimate_portfolio
+
+from conftest import to_building
+
+def _assert_parity(df_result, building, building_id):
+
+	row = df_result.loc[building_id]
+
+	assert row['estimation_system'] == building.estimation_system
+	assert row['building_cz'] == building.building_cz
+	assert row['building_uc'] == building.building_uc
+
+	for k, v in vars(building).items():
+
+		if (not k.startswith('est_')): continue
+
+		# Same arithmetic, up to the order of floating-point sums
+		assert np.isclose(row[k], v, rtol=1e-12, atol=0, equal_nan=True), (building_id, k, row[k], v)
+
+def test_portfolio_matches_building(portfolio):
+
+	df_building, df_es, df_elevator, df_escalator = portfolio
+	df_result = estimate_portfolio(df_building, df_es, df_elevator, df_escalator)
+
+	assert df_result.index.tolist() == df_building['building_id'].tolist()
+
+	for building_id in df_building['building_id']:
+
+		building = to_building(df_building, df_es, df_elevator, df_escalator, building_id)
+		building.estimate()
+
+		_assert_parity(df_result, building, building_id)
+
+	# Unknown annual EC is not scored
+	assert np.isnan(df_result.loc['b1', 'est_score'])
+	assert df_result.loc[['b0', 'b2', 'b3'], 'est_score'].notna().all()
+
+def test_portfolio_mixed_estimation_system(portfolio, estimation_system_alt):
+
+	df_building, df_es, df_elevator, df_escalator = portfolio
+	df_building = df_building.assign(estimation_system=['BERSe', 'BERSe_alt', 'BERSe_alt', 'BERSe'])
+	df_result   = estimate_portfolio(df_building, df_es, df_elevator, df_escalator)
+
+	assert df_result.index.tolist() == df_building['building_id'].tolist()
+
+	for building_id, estimation_system in zip(df_building['building_id'], df_building['estimation_system']):
+
+		building = to_building(df_building.drop(columns='estimation_system'), df_es, df_elevator, df_escalator, building_id)
+		building.estimation_system = estimation_system
+		building.estimate()
+
+		_assert_parity(df_result, building, building_id)
+
+	df_default = estimate_portfolio(df_building.drop(columns='estimation_system'), df_es, df_elevator, df_escalator)
+
+	assert np.allclose(df_result.loc['b2', 'est_eeui_m'], 1.1 * df_default.loc['b2', 'est_eeui_m'])
+	assert df_result.loc['b0', 'est_eeui_m'] == df_default.loc['b0', 'est_eeui_m']
@@ -0,0 +1,92 @@
+import pandas as pd
+import pytest
+import shutil
+import os
+
+from dependency.algorithm_bers import instrumentation, reference_cache
+
+from conftest import PATH_DATA
+
+@pytest.fixture
+def path_data(tmp_path, monkeypatch):
+
+	# Copy of the reference tables, loaded as in a new process
+	path_data = str(tmp_path / 'data') + '/'
+	shutil.copytree(PATH_DATA, path_data, ignore=shutil.ignore_patterns('_compiled', 'gis_layer'))
+
+	monkeypatch.setattr(reference_cache, '_dict_reference_data', {})
+
+	instrumentation.enable_instrumentation()
+	instrumentation.reset_instrumentation()
+
+	yield path_data
+
+	instrumentation.disable_instrumentation()
+
+def _load(path_data, monkeypatch):
+
+	# Load in a new process: nothing is kept in memory
+	monkeypatch.setattr(reference_cache, '_dict_reference_data', {})
+	instrumentation.reset_instrumentation()
+
+	reference_data = reference_cache.load_reference_data(path_data)
+
+	return reference_data, instrumentation.get_instrumentation()['counter'].get('reference_data_miss', 0)
+
+def test_artifact_is_reused(path_data, monkeypatch):
+
+	_, n_miss = _load(path_data, monkeypatch)
+
+	assert n_miss == 1
+	assert os.path.exists(os.path.join(path_data, reference_cache.DIR_CACHE, reference_cache.FILE_CACHE))
+
+	_, n_miss = _load(path_data, monkeypatch)
+
+	assert n_miss == 0
+
+def test_edited_table_rebuilds_artifact(path_data, monkeypatch):
+
+	reference_data, _ = _load(path_data, monkeypatch)
+	eeui = reference_data['registry'].df_eui_criteria['eeui_m'].copy()
+
+	path_file = os.path.join(path_data, 'eui_criteria', 'eui_criteria.m.csv')
+	df        = pd.read_csv(path_file)
+	df['EEUI'] *= 2
+	df.to_csv(path_file, index=False)
+
+	reference_data_edited, n_miss = _load(path_data, monkeypatch)
+
+	assert n_miss == 1
+	assert reference_data_edited['hash'] != reference_data['hash']
+	pd.testing.assert_series_equal(reference_data_edited['registry'].df_eui_criteria['eeui_m'], 2 * eeui)
+
+	_, n_miss = _load(path_data, monkeypatch)
+
+	assert n_miss == 0
+
+def test_other_package_code_rebuilds_artifact(path_data, monkeypatch):
+
+	_load(path_data, monkeypatch)
+
+	# Artifact pickled by another version of the modules
+	monkeypatch.setattr(reference_cache, '_hash_code', 'other')
+	_, n_miss = _load(path_data, monkeypatch)
+
+	assert n_miss == 1
+
+	monkeypatch.setattr(reference_cache, '_hash_code', None)
+	_, n_miss = _load(path_data, monkeypatch)
+
+	assert n_miss == 1
+	assert reference_cache.hash_reference_code() != 'other'
+
+def test_corrupt_artifact_rebuilds(path_data, monkeypatch):
+
+	_load(path_data, monkeypatch)
+
+	with open(os.path.join(path_data, reference_cache.DIR_CACHE, reference_cache.FILE_CACHE), 'wb') as f: f.write(b'corrupt')
+
+	reference_data, n_miss = _load(path_data, monkeypatch)
+
+	assert n_miss == 1
+	assert reference_data['hash'] == reference_cache.hash_reference_data(path_data)
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+import os
+
+from dependency.algorithm_bers import estimate_portfolio, instrumentation, reference_data, register_estimation_system, use_estimation_system
+from dependency.algorithm_bers.reference_data import get_registry
+
+from conftest import to_building
+
+@pytest.fixture
+def registry_isolated(monkeypatch):
+
+	# Registered systems and loaded registries of the test only
+	monkeypatch.setattr(reference_data, '_dict_estimation_system', dict(reference_data._dict_estimation_system))
+	monkeypatch.setattr(reference_data, '_dict_registry', dict(reference_data._dict_registry))
+
+@pytest.fixture
+def instrumentation_enabled():
+
+	instrumentation.enable_instrumentation()
+	instrumentation.reset_instrumentation()
+
+	yield
+
+	instrumentation.disable_instrumentation()
+
+def test_unregistered_system_uses_default(portfolio, registry_isolated):
+
+	building = to_building(*portfolio, 'b0')
+	building.estimate()
+
+	other = to_building(*portfolio, 'b0')
+	other.estimation_system = 'BERSe_unknown'
+	other.estimate()
+
+	assert get_registry('BERSe_unknown') is get_registry('BERSe')
+	assert other.estimation_system == 'BERSe_unknown'
+
+	for k, v in vars(building).items():
+
+		if (k.startswith('est_')): assert np.isclose(getattr(other, k), v, rtol=0, atol=0, equal_nan=True), k
+
+def test_registry_is_loaded_lazily(estimation_system_alt):
+
+	# Registering a system reads no table
+	assert 'BERSe_alt' not in reference_data._dict_registry
+	assert not os.path.exists(os.path.join(estimation_system_alt, '_compiled'))
+
+	registry = get_registry('BERSe_alt')
+
+	assert reference_data._dict_registry['BERSe_alt'] is registry
+	assert os.path.exists(os.path.join(estimation_system_alt, '_compiled'))
+	assert registry is not get_registry('BERSe')
+
+	with use_estimation_system('BERSe_alt'):
+
+		assert get_registry() is registry
+
+	assert get_registry() is get_registry('BERSe')
+
+def test_registry_is_shared_across_batch(portfolio, estimation_system_alt, instrumentation_enabled):
+
+	df_building, df_es, df_elevator, df_escalator = portfolio
+	df_building = df_building.assign(estimation_system='BERSe_alt')
+
+	# Only the registry of BERSe_alt is counted
+	get_registry('BERSe')
+	instrumentation.reset_instrumentation()
+
+	estimate_portfolio(df_building, df_es, df_elevator, df_escalator)
+
+	for building_id in df_building['building_id']:
+
+		building = to_building(df_building.drop(columns='estimation_system'), df_es, df_elevator, df_escalator, building_id)
+		building.estimation_system = 'BERSe_alt'
+		building.estimate()
+
+	# One load for the portfolio and every building
+	counter = instrumentation.get_instrumentation()['counter']
+
+	assert counter['registry_miss'] == 1
+	assert counter['registry_hit'] > 1
+
+def test_register_again_drops_registry(estimation_system_alt, tmp_path):
+
+	registry       = get_registry('BERSe_alt')
+	registry_alias = get_registry('BERSe_unknown')
+
+	# Same directory keeps the loaded registry
+	register_estimation_system('BERSe_alt', estimation_system_alt)
+
+	assert get_registry('BERSe_alt') is registry
+
+	# Another directory for the default system drops the systems sharing it
+	register_estimation_system('BERSe', estimation_system_alt)
+
+	assert 'BERSe_unknown' not in reference_data._dict_registry
+	assert get_registry('BERSe_unknown') is not registry_alias
+
+	with pytest.raises(ValueError):
+
+		register_estimation_system('BERSe_missing', str(tmp_path / 'missing'))
@@ -0,0 +1,76 @@
+import numpy as np
+import urllib.parse
+import os
+
+from dependency.algorithm_bers import estimate_portfolio
+from dependency.algorithm_bers.results_store import ResultsWriter, write_results, read_results
+
+def _list_file(path_dataset):
+
+	# Partition values are URL-encoded in the paths
+	return sorted(urllib.parse.unquote(os.path.relpath(os.path.join(root, i), path_dataset)) for root, _, files in os.walk(path_dataset) for i in files)
+
+def test_write_and_read_partitions(portfolio, tmp_path):
+
+	path_dataset = str(tmp_path / 'results')
+	df_result    = estimate_portfolio(*portfolio)
+
+	assert write_results(path_dataset, df_result) == 4
+
+	# One directory per county and building type
+	assert {os.path.dirname(i) for i in _list_file(path_dataset)} == {'building_address_county={}/building_type={}'.format(*i) for i in zip(df_result['building_address_county'], df_result['building_type'])}
+
+	df_read = read_results(path_dataset).set_index('building_id').loc[df_result.index]
+
+	for column in df_result:
+
+		if (column.startswith('est_')): assert np.allclose(df_read[column], df_result[column], rtol=0, atol=0, equal_nan=True), column
+		else: assert (df_read[column].astype(str) == df_result[column].astype(str)).all(), column
+
+	# Only the matching partitions are read
+	df_read = read_results(path_dataset, county='臺北市', building_type=['B2', 'B3'], columns=['building_id', 'est_eui'])
+
+	assert sorted(df_read['building_id']) == ['b0', 'b3']
+	assert list(df_read.columns) == ['building_id', 'est_eui']
+
+def test_append_to_partition(portfolio, tmp_path):
+
+	path_dataset = str(tmp_path / 'results')
+	df_result    = estimate_portfolio(*portfolio)
+
+	write_results(path_dataset, df_result.loc[['b0']])
+	list_file = _list_file(path_dataset)
+
+	# Records of another run, in the same partition as b0 and in a new one, with one failed building
+	list_record = df_result.loc[['b3', 'b2']].rename_axis('building_id').reset_index().to_dict('records')
+	list_record.append({'building_id': 'b4', 'error': 'ValueError: failed'})
+
+	with ResultsWriter(path_dataset, batch_size=2) as writer:
+
+		for record in list_record: writer.write(record)
+
+	assert (writer.n_written, writer.n_skipped) == (2, 1)
+
+	# New files are added next to the existing ones
+	assert set(list_file) < set(_list_file(path_dataset))
+	assert len([i for i in _list_file(path_dataset) if (os.path.dirname(i) == 'building_address_county=臺北市/building_type=B2')]) == 2
+
+	df_read = read_results(path_dataset, county='臺北市', building_type='B2')
+
+	assert sorted(df_read['building_id']) == ['b0', 'b3']
+	assert sorted(read_results(path_dataset)['building_id']) == ['b0', 'b2', 'b3']
+
+def test_read_files_of_other_columns(portfolio, tmp_path):
+
+	path_dataset = str(tmp_path / 'results')
+	df_result    = estimate_portfolio(*portfolio)
+
+	write_results(path_dataset, df_result.loc[['b0']].drop(columns='est_score'))
+	write_results(path_dataset, df_result.loc[['b3']])
+
+	df_read = read_results(path_dataset, building_type='B2').set_index('building_id')
+
+	assert np.isnan(df_read.loc['b0', 'est_score'])
+	assert df_read.loc['b3', 'est_score'] == df_result.loc['b3', 'est_score']
+
+	assert read_results(path_dataset, as_arrow=True).num_rows == 2
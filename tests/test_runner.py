@@ -0,0 +1,61 @@
+import numpy as np
+
+from dependency.algorithm_bers.runner import run_buildings
+
+from conftest import to_building
+
+def _to_list_spec(df_building, df_es, df_elevator, df_escalator):
+
+	# Specifications of the buildings of a portfolio
+	list_spec = []
+
+	for row in df_building.to_dict('records'):
+
+		building_id = row['building_id']
+		spec        = {k: v for k, v in row.items() if (k != 'ec_annual')}
+		spec['estimation_system'] = 'BERSe'
+		spec['ec_annual']         = row['ec_annual'] if (not np.isnan(row['ec_annual'])) else None
+
+		spec['energysection'] = df_es[df_es['building_id']==building_id].drop(columns='building_id').reset_index(drop=True)
+		spec['elevator']      = df_elevator[df_elevator['building_id']==building_id].drop(columns='building_id').to_dict('records')
+		spec['escalator']     = df_escalator[df_escalator['building_id']==building_id].drop(columns='building_id').to_dict('records')
+
+		list_spec.append(spec)
+
+	return list_spec
+
+def test_run_buildings_streams_in_order(portfolio):
+
+	# More buildings than chunks in flight, with failing buildings in several chunks
+	list_spec = [dict(spec, building_id='{}_{}'.format(spec['building_id'], i)) for i in range(5) for spec in _to_list_spec(*portfolio)]
+	list_spec[2]  = dict(list_spec[2], building_address_town='nowhere')
+	list_spec[13] = dict(list_spec[13], building_type=None)
+
+	list_record = list(run_buildings(iter(list_spec), max_workers=1, chunksize=3, load_geocoder=False))
+
+	assert [i['building_id'] for i in list_record] == [i['building_id'] for i in list_spec]
+
+	for i, (spec, record) in enumerate(zip(list_spec, list_record)):
+
+		if (i in (2, 13)):
+
+			assert set(record) == {'building_id', 'error'}
+
+			continue
+
+		assert 'error' not in record
+
+		# Same results as the building estimated in this process
+		building = to_building(*portfolio, spec['building_id'].split('_')[0])
+		building.estimate()
+
+		assert record['building_cz'] == building.building_cz
+		assert record['building_uc'] == building.building_uc
+
+		for k, v in vars(building).items():
+
+			if (k.startswith('est_')): assert np.isclose(record[k], v, rtol=0, atol=0, equal_nan=True), (spec['building_id'], k)
+
+def test_run_buildings_empty():
+
+	assert list(run_buildings([], max_workers=1, load_geocoder=False)) == []
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from dependency.algorithm_bers.scenario import sweep_scenarios
+
+from conftest import to_building
+
+DICT_GRID = {
+	'coef_power_cabinetrack'                     : [0.3, 0.6],
+	('energysection', 0, 'Area')                 : [5000.0, 6500.0],
+	('energysection', 0, 'AC_Type')              : ['continue', 'interval'],
+	('elevator', 0, 'coef_load_per_elevator')    : [900, 1600],
+	('escalator', 0, 'escalator_elevate_height') : [3.0, 4.5],
+}
+
+def _get_variant(df_building, df_es, df_elevator, df_escalator, building_id, variant):
+
+	# Portfolio tables of the building with the values of the variant
+	df_building, df_es, df_elevator, df_escalator = (df.copy() for df in (df_building, df_es, df_elevator, df_escalator))
+	mask_es, mask_elevator, mask_escalator = (df['building_id']==building_id for df in (df_es, df_elevator, df_escalator))
+
+	for parameter, value in variant.items():
+
+		if (not isinstance(parameter, tuple)): df_building.loc[df_building['building_id']==building_id, parameter] = value
+		elif (parameter[0] == 'energysection'): df_es.loc[df_es.index[mask_es][parameter[1]], parameter[2]] = value
+		elif (parameter[0] == 'elevator'): df_elevator.loc[df_elevator.index[mask_elevator][parameter[1]], parameter[2]] = value
+		elif (parameter[0] == 'escalator'): df_escalator.loc[df_escalator.index[mask_escalator][parameter[1]], parameter[2]] = value
+
+	return to_building(df_building, df_es, df_elevator, df_escalator, building_id)
+
+def test_variant_matches_building(portfolio):
+
+	building  = to_building(*portfolio, 'b0')
+	df_result = sweep_scenarios(building, dict_grid=DICT_GRID)
+
+	assert df_result.shape[0] == 2**len(DICT_GRID)
+
+	# Every kind of parameter changes the results
+	for column, n_value in (('est_a_es_comm', 2), ('est_aeui_m', 4), ('est_e_n', 2), ('est_e_t', 4)):
+
+		assert df_result[column].round(9).nunique() == n_value, column
+
+	for variant, row in df_result.iterrows():
+
+		dict_variant = {parameter: row['.'.join(str(i) for i in parameter) if (isinstance(parameter, tuple)) else parameter] for parameter in DICT_GRID}
+
+		expected = _get_variant(*portfolio, 'b0', dict_variant)
+		expected.estimate()
+
+		for k, v in vars(expected).items():
+
+			if (k.startswith('est_')): assert np.isclose(row[k], v, rtol=1e-12, atol=0, equal_nan=True), (variant, k, row[k], v)
+
+def test_usage_field_by_argument_name(portfolio):
+
+	df_building, df_es, df_elevator, df_escalator = portfolio
+	df_es = df_es.copy()
+	df_es.loc[df_es['Section_ID']=='N8', 'Section_ID'] = 'N2-1-1'
+
+	# Argument and attribute names of Building give the same variants
+	building     = to_building(df_building, df_es, df_elevator, df_escalator, 'b0')
+	df_argument  = sweep_scenarios(building, list_variant=[{'coef_usage_hotelroom': 0.5}, {'n_hotelroom': 60}])
+	df_attribute = sweep_scenarios(building, list_variant=[{'coef_usage_r_hotelroom': 0.5}, {'n_hotelroom': 60}])
+
+	assert np.allclose(df_argument['est_e_n'], df_attribute['est_e_n'], rtol=0, atol=0)
+
+	for i, dict_variant in enumerate([{'coef_usage_hotelroom': 0.5, 'n_hotelroom': 120}, {'coef_usage_hotelroom': 0.7, 'n_hotelroom': 60}]):
+
+		expected = _get_variant(df_building, df_es, df_elevator, df_escalator, 'b0', dict_variant)
+		expected.estimate()
+
+		assert np.isclose(df_argument.loc[i, 'est_e_n'], expected.est_e_n, rtol=1e-12, atol=0)
+		assert np.isclose(df_argument.loc[i, 'est_score'], expected.est_score, rtol=1e-12, atol=0, equal_nan=True)
+
+	with pytest.raises(ValueError):
+
+		sweep_scenarios(building, list_variant=[{'n_unknown': 1}])
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dependency.algorithm_bers import calc_score, calc_eui_target, solve_target_ec
+
+@pytest.mark.parametrize('eui, score', [(100.0, 100.0), (200.0, 50.0), (400.0, 0.0), (150.0, 75.0), (300.0, 25.0), (50.0, 100.0), (500.0, 0.0)])
+def test_score_points_and_clipping(eui, score):
+
+	assert calc_score(eui, 100.0, 200.0, 400.0) == pytest.approx(score)
+
+@pytest.mark.parametrize('scale', [(np.nan, np.nan, np.nan), (np.nan, 200.0, 400.0), (100.0, np.nan, 400.0), (100.0, 200.0, np.nan)])
+def test_nan_scale_scores_nan(scale):
+
+	assert np.isnan(calc_score(50.0, *scale))
+	assert np.isnan(calc_score(np.array([50.0, 500.0]), *scale)).all()
+
+def test_nan_eui_scores_nan():
+
+	assert np.isnan(calc_score(np.nan, 100.0, 200.0, 400.0))
+
+def test_zero_width_segment_is_nan():
+
+	# eui_min equal to eui_m: no score below the median, the lower segment is still defined
+	score = calc_score(np.array([150.0, 200.0, 300.0, 500.0]), 200.0, 200.0, 400.0)
+
+	assert np.isnan(score[0])
+	np.testing.assert_allclose(score[1:], [50.0, 25.0, 0.0])
+
+	# eui_m equal to eui_max: no score above the median
+	score = calc_score(np.array([150.0, 200.0, 300.0]), 100.0, 200.0, 200.0)
+
+	np.testing.assert_allclose(score[:2], [75.0, 50.0])
+	assert np.isnan(score[2])
+
+def test_sweep_across_median_does_not_jump_to_top():
+
+	eui   = np.linspace(150.0, 250.0, 101)
+	score = calc_score(eui, 200.0, 200.0, 400.0)
+
+	assert np.isnan(score[eui < 200.0]).all()
+	assert (score[eui >= 200.0] <= 50.0).all()
+
+def test_array_broadcast():
+
+	score = calc_score(np.array([100.0, 200.0, np.nan]), np.array([100.0, np.nan, 100.0]), 200.0, 400.0)
+
+	assert score[0] == 100.0
+	assert np.isnan(score[1:]).all()
+
+@pytest.mark.parametrize('score', [100.0, 75.0, 50.0, 25.0, 1.0])
+def test_eui_target_inverts_score(score):
+
+	eui = calc_eui_target(score, 100.0, 200.0, 400.0)
+
+	assert calc_score(eui, 100.0, 200.0, 400.0) == pytest.approx(score)
+
+@pytest.mark.parametrize('score', [0.0, -1.0, 100.5])
+def test_eui_target_out_of_range(score):
+
+	with pytest.raises(ValueError):
+
+		calc_eui_target(score, 100.0, 200.0, 400.0)
+
+def test_eui_target_within_zero_width_segment_is_nan():
+
+	# eui_min equal to eui_m: targets above the median cannot be reached
+	eui = calc_eui_target(np.array([100.0, 75.0, 50.0, 25.0]), 200.0, 200.0, 400.0)
+
+	assert np.isnan(eui[:2]).all()
+	np.testing.assert_allclose(eui[2:], [200.0, 300.0])
+
+	# eui_m equal to eui_max: targets below the median cannot be reached
+	eui = calc_eui_target(np.array([75.0, 25.0]), 100.0, 200.0, 200.0)
+
+	assert eui[0] == 150.0
+	assert np.isnan(eui[1])
+
+def test_solve_target_ec_unreachable_target():
+
+	# A building at eui_m with a degenerate upper segment never reaches 100
+	df_result = pd.DataFrame({
+		'est_eui_min'   : [200.0],
+		'est_eui_m'     : [200.0],
+		'est_eui_max'   : [400.0],
+		'est_eui'       : [200.0],
+		'est_e_p'       : [0.0],
+		'est_e_n'       : [0.0],
+		'est_e_t'       : [0.0],
+		'est_a_es_comm' : [10.0],
+	})
+
+	df_target = solve_target_ec(df_result, [100.0, 50.0, 25.0])
+
+	assert df_target[['eui_target', 'ec_target', 'ec_reduction', 'ec_reduction_ratio']].iloc[0].isna().all()
+	assert df_target['ec_reduction'].iloc[1:].tolist() == [0.0, 0.0]
+
+	# Bisection on the same score function agrees
+	df_bisect = solve_target_ec(df_result, [100.0, 50.0, 25.0], score_function=calc_score)
+
+	assert np.isnan(df_bisect['eui_target'].iloc[0])
+	np.testing.assert_allclose(df_bisect['eui_target'].iloc[1:], df_target['eui_target'].iloc[1:], atol=1e-6)
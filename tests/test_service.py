@@ -0,0 +1,165 @@
+import asyncio
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+from dependency.algorithm_bers import service, EstimationService
+from dependency.algorithm_bers.runner import estimate_building
+
+def _to_list_spec(df_building, df_es, df_elevator, df_escalator):
+
+	# JSON specifications of the buildings of a portfolio
+	list_spec = []
+
+	for row in df_building.to_dict('records'):
+
+		building_id = row['building_id']
+		spec        = {k: (None if (isinstance(v, float) and np.isnan(v)) else v) for k, v in row.items()}
+		spec['estimation_system'] = 'BERSe'
+
+		spec['energysection'] = df_es[df_es['building_id']==building_id].drop(columns='building_id').astype(object).where(lambda df: df.notna(), None).to_dict('records')
+		spec['elevator']      = df_elevator[df_elevator['building_id']==building_id].drop(columns='building_id').to_dict('records')
+		spec['escalator']     = df_escalator[df_escalator['building_id']==building_id].drop(columns='building_id').to_dict('records')
+
+		list_spec.append(spec)
+
+	return list_spec
+
+def test_invalid_spec_does_not_estimate_others_alone(portfolio, monkeypatch):
+
+	list_spec = _to_list_spec(*portfolio) * 4
+	list_spec = [dict(spec, building_id='{}_{}'.format(spec['building_id'], i)) for i, spec in enumerate(list_spec)]
+	list_spec[5] = dict(list_spec[5], building_address_town='nowhere')
+
+	list_call_portfolio, list_call_building = [], []
+	estimate_portfolio = service.estimate_portfolio
+
+	def _estimate_portfolio(df_building, *args, **kwargs):
+
+		list_call_portfolio.append(df_building.shape[0])
+
+		return estimate_portfolio(df_building, *args, **kwargs)
+
+	def _estimate_building(spec):
+
+		list_call_building.append(spec.get('building_id'))
+
+		return estimate_building(spec)
+
+	monkeypatch.setattr(service, 'estimate_portfolio', _estimate_portfolio)
+	monkeypatch.setattr(service, 'estimate_building', _estimate_building)
+
+	list_record = service.estimate_batch(list_spec)
+
+	# Only the invalid building is estimated on its own, the others in halves of the batch
+	assert list_call_building == [list_spec[5]['building_id']]
+	assert len(list_call_portfolio) <= 2 * int(np.log2(len(list_spec))) + 1
+	assert 'error' in list_record[5]
+
+	for spec, record in zip(list_spec, list_record):
+
+		assert record['building_id'] == spec['building_id']
+		if (spec is list_spec[5]): continue
+
+		record_building = estimate_building(service.normalize_spec(spec))
+
+		assert 'error' not in record_building
+
+		for k, v in record_building.items():
+
+			if (k.startswith('est_')): assert np.isclose(record[k], v, rtol=1e-12, equal_nan=True), k
+
+@pytest.mark.parametrize('dict_change, error', [
+	({'estimation_system': None}, 'Building information'),
+	({'building_type': None}, 'Building information'),
+	({'building_n_stories_below_ground': None}, 'building_n_stories_below_ground'),
+	({'building_n_stories_above_ground': '15'}, 'building_n_stories_above_ground'),
+	({'building_address_county': None, 'building_address_town': None}, 'location'),
+	({'energysection': None}, 'Energy sections'),
+	({'n_hotelroom': None}, None),
+])
+def test_spec_is_validated_the_same_alone_or_in_batch(portfolio, dict_change, error):
+
+	list_spec = _to_list_spec(*portfolio)
+	spec      = dict(list_spec[0], **dict_change)
+
+	record_alone = service.estimate_batch([spec])[0]
+	record_batch = service.estimate_batch([spec] + list_spec[1:])[0]
+
+	if (error is None):
+
+		assert ('error' not in record_alone) and ('error' not in record_batch)
+		assert record_alone['est_e_n'] == record_batch['est_e_n']
+
+	else:
+
+		assert error in record_alone['error']
+		assert record_alone == record_batch
+
+def test_nan_is_returned_as_null(portfolio):
+
+	list_spec = _to_list_spec(*portfolio)
+
+	async def _post(list_spec):
+
+		estimation_service = EstimationService(max_batch_size=8, max_wait=0.01, max_workers=1, load_geocoder=False)
+		port               = await estimation_service.serve(port=0)
+
+		try:
+
+			reader, writer = await asyncio.open_connection('127.0.0.1', port)
+			body           = json.dumps(list_spec).encode('utf-8')
+
+			writer.write('POST /estimate HTTP/1.1\r\nContent-Length: {}\r\nConnection: close\r\n\r\n'.format(len(body)).encode('latin-1') + body)
+			await writer.drain()
+
+			response = await reader.read()
+			writer.close()
+
+		finally:
+
+			await estimation_service.stop()
+
+		return response
+
+	response = asyncio.run(_post(list_spec))
+	header, content = response.split(b'\r\n\r\n', 1)
+
+	assert header.startswith(b'HTTP/1.1 200')
+
+	# Strict JSON: NaN and Infinity are rejected
+	def _reject(constant): raise ValueError(constant)
+
+	list_record = json.loads(content, parse_constant=_reject)
+
+	assert [i['building_id'] for i in list_record] == ['b0', 'b1', 'b2', 'b3']
+	assert list_record[1]['est_score'] is None
+	assert 0.0 < list_record[0]['est_score'] < 50.0
+
+def test_stop_answers_batches_in_flight(portfolio):
+
+	list_spec = _to_list_spec(*portfolio) * 3
+
+	async def _estimate_and_stop():
+
+		estimation_service = EstimationService(max_batch_size=2, max_wait=0.0, max_workers=1, load_geocoder=False)
+		await estimation_service.start()
+
+		list_task = [asyncio.create_task(estimation_service.estimate(i)) for i in list_spec]
+
+		# Let the batcher hand some batches to the workers
+		while (estimation_service.n_batch == 0): await asyncio.sleep(0.001)
+
+		n_task = len(estimation_service._set_task)
+		await estimation_service.stop()
+
+		return n_task, estimation_service, await asyncio.gather(*list_task, return_exceptions=True)
+
+	n_task, estimation_service, list_record = asyncio.run(_estimate_and_stop())
+
+	# Batches in flight were referenced by the service and answered before it stopped
+	assert n_task > 0
+	assert len(estimation_service._set_task) == 0
+	assert all(isinstance(i, (dict, RuntimeError)) for i in list_record)
+	assert sum(isinstance(i, dict) and ('est_eui_m' in i) for i in list_record) >= 2
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dependency.algorithm_bers.uncertainty import estimate_uncertainty, estimate_uncertainty_portfolio, LIST_OUTPUT
+
+from conftest import to_building
+
+QUANTILES = (0.05, 0.5, 0.95)
+
+def test_seed_is_reproducible(portfolio):
+
+	building = to_building(*portfolio, 'b0')
+	building.estimate()
+
+	kwargs = dict(n_sample=20000, quantiles=QUANTILES, noise_area=0.1, noise_usage=0.2, chunksize=4096)
+
+	df_result = estimate_uncertainty(building, seed=1, **kwargs)
+
+	pd.testing.assert_frame_equal(estimate_uncertainty(building, seed=1, **kwargs), df_result)
+
+	# Another seed draws other samples
+	assert not estimate_uncertainty(building, seed=2, **kwargs).equals(df_result)
+
+	df_building, df_es, _, _ = portfolio
+	kwargs = dict(n_sample=5000, quantiles=QUANTILES, noise_area=0.1, noise_usage=0.2)
+
+	pd.testing.assert_frame_equal(estimate_uncertainty_portfolio(df_building, df_es, seed=1, **kwargs), estimate_uncertainty_portfolio(df_building, df_es, seed=1, **kwargs))
+
+@pytest.mark.parametrize('building_id', ['b0', 'b1', 'b2', 'b3'])
+def test_quantiles_within_scale(portfolio, building_id):
+
+	building = to_building(*portfolio, building_id)
+	building.estimate()
+
+	df_result = estimate_uncertainty(building, n_sample=20000, quantiles=QUANTILES, seed=0)
+	column_q  = ['q{:g}'.format(q) for q in QUANTILES]
+
+	assert df_result.index.tolist() == LIST_OUTPUT
+
+	# Quantiles are ordered and within the sampled range
+	for output, row in df_result.iterrows():
+
+		values = row[['min'] + column_q + ['max']].to_numpy(dtype=float)
+
+		assert (np.diff(values) >= 0).all(), output
+
+	# Sampled EUIs lie on the EUI scale of the building, and the other outputs have no input noise
+	for output, eui_min, eui_max in (('est_aeui', building.est_aeui_min, building.est_aeui_max), ('est_leui', building.est_leui_min, building.est_leui_max)):
+
+		assert eui_min <= df_result.loc[output, 'min'] <= df_result.loc[output, 'q0.5'] <= df_result.loc[output, 'max'] <= eui_max, output
+
+	assert np.allclose(df_result.loc['est_aeui', 'mean'], (building.est_aeui_min + building.est_aeui_m + building.est_aeui_max) / 3, rtol=0.01)
+
+	for output, value in (('est_a_es_comm', building.est_a_es_comm), ('est_eeui', building.est_eeui_m), ('est_e_n', building.est_e_n)):
+
+		assert np.allclose(df_result.loc[output, ['min', 'max'] + column_q].to_numpy(dtype=float), value, rtol=1e-9, atol=1e-9), output
+
+def test_portfolio_matches_building(portfolio):
+
+	df_building, df_es, _, _ = portfolio
+	df_result = estimate_uncertainty_portfolio(df_building, df_es, n_sample=5000, quantiles=QUANTILES, seed=0)
+
+	for building_id in df_building['building_id']:
+
+		building = to_building(*portfolio, building_id)
+		building.estimate()
+
+		assert building.est_aeui_min <= df_result.loc[building_id, 'est_aeui_q0.05'] <= df_result.loc[building_id, 'est_aeui_q0.95'] <= building.est_aeui_max
+		assert np.isclose(df_result.loc[building_id, 'est_e_n_q0.5'], building.est_e_n, rtol=1e-9, atol=1e-9)